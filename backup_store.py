@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import span
+
+# Форматы, которые уже сжаты: повторное сжатие только тратит время
+COMPRESSED_EXTENSIONS = frozenset((".jpg", ".jpeg", ".png", ".gif", ".webp", ".zip", ".gz", ".pdf"))
+FULL_SNAPSHOT_EVERY = 10  # Полная копия древа после стольких разностных
+CHUNK_SIZE = 1024 * 1024
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _tree_records(tree):
+    # Персоны древа как {id: строка JSON} — единица сравнения для разностных копий
+    return {
+        person_id: json.dumps(dict(person, parents=list(person["parents"]), children=list(person["children"])),
+                              ensure_ascii=False, sort_keys=True)
+        for person_id, person in tree.people.items()
+    }
+
+
+class BackupStore:
+    # Хранилище архивных копий с адресацией по содержимому: каталог objects/ с файлами по SHA-256
+    # (каждое изображение хранится один раз на все копии) и snapshots/ с описаниями копий.
+    # Древо сохраняется разностью с предыдущей копией (изменённые и удалённые персоны),
+    # полностью — каждые FULL_SNAPSHOT_EVERY копий.
+    def __init__(self, root, images_dir="images", workers=None):
+        self.root = root
+        self.images_dir = images_dir
+        self.workers = workers or os.cpu_count() or 2
+        self.objects_dir = os.path.join(root, "objects")
+        self.snapshots_dir = os.path.join(root, "snapshots")
+
+    def list_snapshots(self):
+        # Имена копий от старых к новым
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.snapshots_dir) if name.endswith(".json"))
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _write_object(self, digest, blocks, compress):
+        # Объект: первый байт — способ хранения (Z — zlib, R — как есть), затем данные.
+        # blocks — итератор блоков содержимого, поэтому большие файлы не читаются в память целиком.
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}_{threading.get_ident()}.tmp"
+        compressor = zlib.compressobj(6) if compress else None
+        with open(temp_path, "wb") as f:
+            f.write(b"Z" if compress else b"R")
+            for block in blocks:
+                f.write(compressor.compress(block) if compressor else block)
+            if compressor:
+                f.write(compressor.flush())
+            size = f.tell()
+        os.replace(temp_path, path)
+        return size
+
+    def _read_object(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            payload = f.read()
+        data = zlib.decompress(payload[1:]) if payload[:1] == b"Z" else payload[1:]
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Объект {digest} повреждён")
+        return data
+
+    def _put_bytes(self, data, compress=True):
+        digest = hashlib.sha256(data).hexdigest()
+        return digest, self._write_object(digest, [data], compress)
+
+    def _put_file(self, path):
+        # Сохранение файла изображения; возвращает (хэш, записано байт)
+        digest = _file_hash(path)
+        if os.path.exists(self._object_path(digest)):
+            return digest, 0
+        compress = os.path.splitext(path)[1].lower() not in COMPRESSED_EXTENSIONS
+        with open(path, "rb") as f:
+            return digest, self._write_object(digest, iter(lambda: f.read(CHUNK_SIZE), b""), compress)
+
+    def _load_manifest(self, name):
+        with open(os.path.join(self.snapshots_dir, name + ".json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _load_records(self, name):
+        # Персоны копии: полная копия и разности по цепочке base
+        chain = []
+        while name:
+            manifest = self._load_manifest(name)
+            chain.append(manifest["tree"])
+            name = manifest["tree"].get("base")
+        records = {}
+        for tree_entry in reversed(chain):
+            part = json.loads(self._read_object(tree_entry["object"]))
+            for person_id in part.get("removed", []):
+                records.pop(person_id, None)
+            records.update(part["records"])
+        return records, len(chain)
+
+    def create(self, tree, progress=None):
+        # Новая копия древа и изображений; возвращает (имя копии, сводка).
+        # progress(обработано изображений, всего).
+        with span("backup.create", persons=len(tree.people)) as info:
+            os.makedirs(self.snapshots_dir, exist_ok=True)
+            snapshots = self.list_snapshots()
+            previous = snapshots[-1] if snapshots else None
+            previous_images = self._load_manifest(previous)["images"] if previous else {}
+
+            # Изображения: файлы с прежним размером и временем изменения не перечитываются
+            files = []
+            if os.path.isdir(self.images_dir):
+                for entry in os.scandir(self.images_dir):
+                    if entry.is_file():
+                        files.append((entry.name, entry.stat()))
+            images = {}
+            to_store = []
+            for name, stat in files:
+                known = previous_images.get(name)
+                if known and known[1] == stat.st_size and known[2] == stat.st_mtime_ns:
+                    images[name] = known
+                else:
+                    to_store.append((name, stat))
+            written = 0
+            with ThreadPoolExecutor(self.workers) as pool:
+                # SHA-256 и zlib отпускают GIL на больших буферах, поэтому потоки работают параллельно
+                futures = [(name, stat, pool.submit(self._put_file, os.path.join(self.images_dir, name)))
+                           for name, stat in to_store]
+                for done, (name, stat, future) in enumerate(futures, 1):
+                    digest, size = future.result()
+                    images[name] = [digest, stat.st_size, stat.st_mtime_ns]
+                    written += size
+                    if progress:
+                        progress(done, len(futures))
+
+            # Древо: разность с предыдущей копией или полная копия
+            records = _tree_records(tree)
+            tree_entry = {"base": None}
+            part = {"records": records}
+            if previous:
+                previous_records, chain_length = self._load_records(previous)
+                if chain_length < FULL_SNAPSHOT_EVERY:
+                    changed = {pid: record for pid, record in records.items() if previous_records.get(pid) != record}
+                    removed = [pid for pid in previous_records if pid not in records]
+                    if len(changed) + len(removed) < len(records) // 2:
+                        tree_entry["base"] = previous
+                        part = {"records": changed, "removed": removed}
+            digest, size = self._put_bytes(json.dumps(part, ensure_ascii=False).encode("utf-8"))
+            tree_entry["object"] = digest
+            written += size
+
+            name = time.strftime("%Y-%m-%dT%H-%M-%S")
+            while name in snapshots:
+                name += "_"
+            manifest = {"created": time.time(), "persons": len(records), "tree": tree_entry, "images": images}
+            temp_path = os.path.join(self.snapshots_dir, name + ".tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(temp_path, os.path.join(self.snapshots_dir, name + ".json"))
+            summary = {"new_images": len(to_store), "reused_images": len(files) - len(to_store),
+                       "delta": tree_entry["base"] is not None, "written_bytes": written}
+            info.update(summary)
+            return name, summary
+
+    def restore(self, name=None, progress=None):
+        # Восстановление копии (по умолчанию последней): изображения записываются в images_dir,
+        # совпадающие по содержимому файлы не перезаписываются. Возвращает персоны в формате
+        # FamilyTree.to_dict для load_people.
+        with span("backup.restore") as info:
+            snapshots = self.list_snapshots()
+            if not snapshots:
+                raise ValueError("В каталоге нет архивных копий")
+            name = name or snapshots[-1]
+            manifest = self._load_manifest(name)
+            records, _ = self._load_records(name)
+            os.makedirs(self.images_dir, exist_ok=True)
+
+            def restore_image(item):
+                file_name, (digest, size, _) = item
+                path = os.path.join(self.images_dir, file_name)
+                if os.path.exists(path) and os.path.getsize(path) == size and _file_hash(path) == digest:
+                    return
+                data = self._read_object(digest)
+                with open(path + ".tmp", "wb") as f:
+                    f.write(data)
+                os.replace(path + ".tmp", path)
+
+            items = list(manifest["images"].items())
+            info.update(persons=len(records), images=len(items))
+            with ThreadPoolExecutor(self.workers) as pool:
+                for done, _ in enumerate(pool.map(restore_image, items), 1):
+                    if progress:
+                        progress(done, len(items))
+            return {person_id: json.loads(record) for person_id, record in records.items()}
\ No newline at end of file
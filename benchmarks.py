@@ -0,0 +1,612 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from synthetic import write_gedcom, write_images
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Разовые замеры с пиковой памятью: каждый замер — в отдельном процессе. Замеры времени
+# с базовыми значениями и порогом регрессии — в tests/benchmarks (pytest-benchmark):
+#   python -m pytest tests/benchmarks --bench-compare
+
+CASES = {}  # {имя: функция замера}
+GROUPS = {}  # {группа: [имена замеров]}
+
+
+def case(name, group):
+    # Регистрация замера в группе
+    def decorator(func):
+        CASES[name] = func
+        GROUPS.setdefault(group, []).append(name)
+        return func
+    return decorator
+
+
+def peak_rss_mb():
+    # Пиковое потребление памяти процессом (МБ)
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+@case("import_streaming", "import")
+def bench_import_streaming(args):
+    from tree_logic import FamilyTree
+    from gedcom_handler import GedcomHandler
+    tree = FamilyTree()
+    GedcomHandler(tree).import_gedcom(args.file)
+    return {"persons": len(tree.people)}
+
+
+@case("import_python_gedcom", "import")
+def bench_import_python_gedcom(args):
+    # Прежний путь импорта через дерево элементов python-gedcom (только разбор)
+    from gedcom.element.individual import IndividualElement
+    from gedcom.parser import Parser
+    parser = Parser()
+    parser.parse_file(args.file)
+    individuals = [elem for elem in parser.get_element_list() if isinstance(elem, IndividualElement)]
+    links = 0
+    for element in individuals:
+        element.get_name()
+        for family in element.get_families():
+            links += len(family.get_children())
+    return {"persons": len(individuals), "links": links}
+
+
+@case("link_unlink", "relations")
+def bench_link_unlink(args):
+    # Связывание и разрыв args.edges пар родитель -> ребёнок
+    from tree_logic import FamilyTree
+    tree = FamilyTree()
+    ids = [tree.add_person({"name": str(i)}) for i in range(args.persons)]
+    rng = random.Random(args.seed)
+    edges = []
+    for _ in range(args.edges):
+        child = rng.randrange(1, len(ids))
+        edges.append((ids[rng.randrange(child)], ids[child]))
+    start = time.perf_counter()
+    linked = sum(tree.link_parent_child(parent_id, child_id) for parent_id, child_id in edges)
+    link_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for parent_id, child_id in edges:
+        tree.unlink(parent_id, child_id)
+    unlink_seconds = time.perf_counter() - start
+    return {"edges": linked, "link_seconds": round(link_seconds, 3), "unlink_seconds": round(unlink_seconds, 3)}
+
+
+def bench_memory(args, compact):
+    # Прирост пиковой памяти при загрузке args.persons персон, в пересчёте на 100 тыс.
+    from tree_logic import FamilyTree
+    from gedcom_handler import iter_gedcom_records, GedcomHandler
+    handler = GedcomHandler(None)
+    handler.source = "MatsDrevo"  # Файл замеров пишет экспорт MatsDrevo (synthetic.write_gedcom)
+    records = [handler._person_data(record) for record in iter_gedcom_records(args.file) if record.tag == "INDI"]
+    baseline = peak_rss_mb()
+    tree = FamilyTree(compact=compact, copy_images=False)
+    for data in records:
+        tree.add_person(data)
+    del records
+    grown = peak_rss_mb() - baseline
+    return {"persons": len(tree.people), "rss_per_100k_mb": round(grown * 100000 / max(len(tree.people), 1), 1)}
+
+
+@case("memory_dict", "memory")
+def bench_memory_dict(args):
+    return bench_memory(args, compact=False)
+
+
+@case("memory_compact", "memory")
+def bench_memory_compact(args):
+    return bench_memory(args, compact=True)
+
+
+def load_tree(args):
+    # Древо из входного GEDCOM-файла для замеров, не связанных с импортом
+    from tree_logic import FamilyTree
+    from gedcom_handler import GedcomHandler
+    tree = FamilyTree()
+    GedcomHandler(tree).import_gedcom(args.file)
+    return tree
+
+
+def bench_export(args, compress):
+    # Потоковый экспорт всего древа: персон в секунду
+    from gedcom_handler import GedcomHandler
+    tree = load_tree(args)
+    path = os.path.join(os.path.dirname(args.file), "bench_export.ged" + (".gz" if compress else ""))
+    start = time.perf_counter()
+    GedcomHandler(tree).export_gedcom(path, compress=compress)
+    seconds = time.perf_counter() - start
+    return {"persons": len(tree.people), "export_seconds": round(seconds, 3),
+            "persons_per_second": int(len(tree.people) / seconds),
+            "file_mb": round(os.path.getsize(path) / 1024 / 1024, 1)}
+
+
+@case("export_plain", "export")
+def bench_export_plain(args):
+    return bench_export(args, compress=False)
+
+
+@case("export_gzip", "export")
+def bench_export_gzip(args):
+    return bench_export(args, compress=True)
+
+
+@case("layout_tidy", "layout")
+def bench_layout_tidy(args):
+    # Раскладка древа без Qt: первый расчёт и повторный запрос из кэша
+    from tree_layout import TreeLayout
+    tree = load_tree(args)
+    layout = TreeLayout(tree)
+    start = time.perf_counter()
+    positions = layout.get_positions()
+    layout_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    layout.get_positions()
+    cached_seconds = time.perf_counter() - start
+    return {"persons": len(positions), "layout_seconds": round(layout_seconds, 3),
+            "cached_seconds": round(cached_seconds, 6)}
+
+
+@case("date_queries", "dates")
+def bench_date_queries(args):
+    # Индекс дат: построение, 1000 запросов по диапазону лет и полный пересчёт статистики
+    from dates import DateIndex
+    from stats import FamilyStats
+    tree = load_tree(args)
+    index = DateIndex(tree)
+    start = time.perf_counter()
+    index.rebuild()
+    build_seconds = time.perf_counter() - start
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    found = 0
+    for _ in range(1000):
+        first = rng.randint(1700, 1990)
+        found += index.count_between(first, first + 20)
+    query_seconds = time.perf_counter() - start
+    stats = FamilyStats(tree)
+    start = time.perf_counter()
+    stats.recompute()
+    return {"persons": len(tree.people), "dated": len(tree.dates["birth_date"]),
+            "build_seconds": round(build_seconds, 3), "query_ms": round(query_seconds, 3),
+            "found_per_query": found // 1000, "stats_seconds": round(time.perf_counter() - start, 3)}
+
+
+@case("demographics", "stats")
+def bench_demographics(args):
+    # Расширенная статистика: проекция древа в массивы numpy и векторный расчёт
+    from demographics import TreeArrays, compute
+    from stats import FamilyStats
+    tree = load_tree(args)
+    stats = FamilyStats(tree)
+    start = time.perf_counter()
+    arrays = TreeArrays(tree, stats.levels())
+    project_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    result = compute(arrays)
+    return {"persons": len(tree.people), "project_seconds": round(project_seconds, 3),
+            "compute_seconds": round(time.perf_counter() - start, 3), "decades": len(result["lifespans"])}
+
+
+@case("kinship", "kinship")
+def bench_kinship(args):
+    # Родство: пары братьев и сестёр, случайные пары и матрица для 50 персон
+    from kinship import Kinship
+    tree = load_tree(args)
+    rng = random.Random(args.seed)
+    ids = list(tree.people)
+    siblings = []
+    for person_id in rng.sample(ids, min(2000, len(ids))):
+        for parent_id in tree.people[person_id]["parents"]:
+            other = next((child_id for child_id in tree.people[parent_id]["children"] if child_id != person_id), None)
+            if other:
+                siblings.append((person_id, other))
+            break
+    pairs = [(rng.choice(ids), rng.choice(ids)) for _ in range(1000)]
+    result = {"persons": len(tree.people)}
+    for name, sample in (("siblings", siblings), ("random", pairs)):
+        kinship = Kinship(tree)
+        start = time.perf_counter()
+        for first_id, second_id in sample:
+            kinship.relationship(first_id, second_id)
+        result[f"{name}_ms"] = round((time.perf_counter() - start) * 1000 / max(len(sample), 1), 4)
+    start = time.perf_counter()
+    Kinship(tree).matrix(rng.sample(ids, min(50, len(ids))))
+    result["matrix50_seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+@case("merge_import", "merge")
+def bench_merge_import(args):
+    # Добавление того же файла к древу: каждая импортированная персона — дубликат существующей
+    from tree_logic import FamilyTree
+    from gedcom_handler import GedcomHandler
+    from duplicates import find_duplicates, merge_duplicates
+    tree = FamilyTree(compact=True)
+    handler = GedcomHandler(tree)
+    handler.import_gedcom(args.file)
+    start = time.perf_counter()
+    new_ids = handler.import_gedcom(args.file, merge=True)
+    import_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    pairs = find_duplicates(tree, new_ids)
+    detect_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    merged = merge_duplicates(tree, pairs)
+    return {"persons": len(new_ids), "import_seconds": round(import_seconds, 3),
+            "detect_seconds": round(detect_seconds, 3), "duplicates": len(pairs), "merged": merged,
+            "merge_seconds": round(time.perf_counter() - start, 3), "persons_after": len(tree.people)}
+
+
+@case("save_json", "persistence")
+def bench_save_json(args):
+    # Прежний формат: весь словарь древа в JSON с отступами
+    tree = load_tree(args)
+    path = os.path.join(os.path.dirname(args.file), "bench_tree.json")
+    start = time.perf_counter()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(tree.to_dict(), f, ensure_ascii=False, indent=2)
+    return {"persons": len(tree.people), "save_seconds": round(time.perf_counter() - start, 3),
+            "file_mb": round(os.path.getsize(path) / 1024 / 1024, 1)}
+
+
+@case("load_json", "persistence")
+def bench_load_json(args):
+    from tree_logic import FamilyTree
+    path = os.path.join(os.path.dirname(args.file), "bench_tree.json")
+    if not os.path.exists(path):
+        bench_save_json(args)
+    tree = FamilyTree()
+    start = time.perf_counter()
+    with open(path, "r", encoding="utf-8") as f:
+        tree.load_people(json.load(f))
+    return {"persons": len(tree.people), "load_seconds": round(time.perf_counter() - start, 3)}
+
+
+@case("save_project", "persistence")
+def bench_save_project(args):
+    # Файл проекта: полное сохранение, затем сохранение после 100 правок
+    from project_store import ProjectStore
+    tree = load_tree(args)
+    path = os.path.join(os.path.dirname(args.file), "bench_tree.mdrevo")
+    if os.path.exists(path):
+        os.remove(path)
+    store = ProjectStore(path)
+    store.attach(tree)
+    start = time.perf_counter()
+    store.save()
+    full_seconds = time.perf_counter() - start
+    rng = random.Random(args.seed)
+    ids = list(tree.people)
+    for _ in range(100):
+        tree.edit_person(rng.choice(ids), {"notes": "Изменено"})
+    start = time.perf_counter()
+    written = store.save()
+    return {"persons": len(tree.people), "save_seconds": round(full_seconds, 3),
+            "incremental_rows": written, "incremental_seconds": round(time.perf_counter() - start, 4),
+            "file_mb": round(os.path.getsize(path) / 1024 / 1024, 1)}
+
+
+@case("load_project", "persistence")
+def bench_load_project(args):
+    from tree_logic import FamilyTree
+    from project_store import ProjectStore
+    path = os.path.join(os.path.dirname(args.file), "bench_tree.mdrevo")
+    if not os.path.exists(path):
+        bench_save_project(args)
+    tree = FamilyTree()
+    start = time.perf_counter()
+    ProjectStore(path).load(tree)
+    return {"persons": len(tree.people), "load_seconds": round(time.perf_counter() - start, 3)}
+
+
+def directory_size_mb(directory):
+    total = 0
+    for root, _, files in os.walk(directory):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return round(total / 1024 / 1024, 1)
+
+
+@case("backup_zip", "backup")
+def bench_backup_zip(args):
+    # Прежняя архивная копия: каждый раз полный ZIP древа и всех изображений
+    import zipfile
+    tree = load_tree(args)
+    with tempfile.TemporaryDirectory() as directory:
+        images_dir = os.path.join(directory, "images")
+        write_images(images_dir, args.images, args.seed)
+        times = []
+        for number in range(2):
+            path = os.path.join(directory, f"backup_{number}.zip")
+            start = time.perf_counter()
+            with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr("tree.json", json.dumps(tree.to_dict(), ensure_ascii=False))
+                for name in sorted(os.listdir(images_dir)):
+                    zf.write(os.path.join(images_dir, name), os.path.join("images", name))
+            times.append(time.perf_counter() - start)
+        return {"persons": len(tree.people), "images": args.images, "first_seconds": round(times[0], 3),
+                "repeat_seconds": round(times[1], 3),
+                "total_mb": round(sum(os.path.getsize(os.path.join(directory, f"backup_{number}.zip"))
+                                      for number in range(2)) / 1024 / 1024, 1)}
+
+
+@case("backup_store", "backup")
+def bench_backup_store(args):
+    # Хранилище копий: первая копия, повтор без изменений и копия после 100 правок
+    # и одного нового изображения
+    from backup_store import BackupStore
+    tree = load_tree(args)
+    with tempfile.TemporaryDirectory() as directory:
+        images_dir = os.path.join(directory, "images")
+        write_images(images_dir, args.images, args.seed)
+        store = BackupStore(os.path.join(directory, "store"), images_dir)
+        result = {"persons": len(tree.people), "images": args.images}
+        for stage in ("first", "repeat", "edited"):
+            if stage == "edited":
+                rng = random.Random(args.seed)
+                ids = list(tree.people)
+                for _ in range(100):
+                    tree.edit_person(rng.choice(ids), {"notes": "Изменено"})
+                with open(os.path.join(images_dir, "image_new.jpg"), "wb") as f:
+                    f.write(rng.randbytes(200 * 1024))
+            start = time.perf_counter()
+            _, summary = store.create(tree)
+            result[f"{stage}_seconds"] = round(time.perf_counter() - start, 3)
+            result[f"{stage}_written_kb"] = summary["written_bytes"] // 1024
+        start = time.perf_counter()
+        store.restore()
+        result["restore_seconds"] = round(time.perf_counter() - start, 3)
+        result["total_mb"] = directory_size_mb(store.root)
+        return result
+
+
+def qt_application():
+    # QApplication без дисплея (offscreen QPA) для замеров сцены
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@case("scene_edits", "scene")
+def bench_scene_edits(args):
+    # Задержка одной правки: изменение имени, добавление ребёнка, удаление персоны
+    from PyQt5.QtWidgets import QGraphicsScene
+    from tree_layout import TreeLayout
+    from tree_scene import TreeScene
+    app = qt_application()
+    tree = load_tree(args)
+    scene = QGraphicsScene()
+    tree_scene = TreeScene(scene, tree, TreeLayout(tree))
+    start = time.perf_counter()
+    tree_scene.sync()
+    build_seconds = time.perf_counter() - start
+
+    rng = random.Random(args.seed)
+    ids = list(tree.people)
+    timings = {"edit": [], "add_child": [], "remove": []}
+    for _ in range(20):
+        start = time.perf_counter()
+        tree.edit_person(rng.choice(ids), {"name": "Изменено"})
+        tree_scene.sync()
+        timings["edit"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        new_id = tree.add_person({"name": "Новый"}, rng.choice(ids))
+        tree_scene.sync()
+        timings["add_child"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        tree.remove_person(new_id)
+        tree_scene.sync()
+        timings["remove"].append(time.perf_counter() - start)
+    app.processEvents()
+    result = {"persons": len(tree.people), "items": len(scene.items()), "build_seconds": round(build_seconds, 3)}
+    for name, values in timings.items():
+        result[f"{name}_ms"] = round(1000 * sum(values) / len(values), 2)
+    return result
+
+
+@case("viewport_pan", "scene")
+def bench_viewport_pan(args):
+    # Время кадра при панорамировании на трёх уровнях масштаба (кластеры, прямоугольники, текст)
+    from PyQt5.QtWidgets import QGraphicsScene, QGraphicsView
+    from tree_layout import TreeLayout
+    from tree_scene import TreeScene
+    app = qt_application()
+    tree = load_tree(args)
+    scene = QGraphicsScene()
+    tree_scene = TreeScene(scene, tree, TreeLayout(tree))
+    tree_scene.sync()
+    view = QGraphicsView(scene)
+    view.resize(1200, 800)
+    view.setSceneRect(tree_scene.bounds())
+    view.show()
+    result = {"persons": len(tree.people)}
+    for scale in (0.05, 0.25, 1.0):
+        view.resetTransform()
+        view.scale(scale, scale)
+        frames = []
+        for step in range(30):
+            start = time.perf_counter()
+            view.horizontalScrollBar().setValue(step * 200)
+            rect = view.mapToScene(view.viewport().rect()).boundingRect()
+            tree_scene.set_viewport(rect, scale)
+            view.viewport().repaint()
+            app.processEvents()
+            frames.append(time.perf_counter() - start)
+        result[f"frame_ms_at_{scale}"] = round(1000 * sum(frames) / len(frames), 2)
+        result[f"items_at_{scale}"] = len(scene.items())
+    return result
+
+
+# Запуск программы до первой отрисовки окна: время отсчитывается от старта процесса
+FIRST_PAINT_SCRIPT = """
+import os, sys, time
+from PyQt5.QtCore import QEvent, QObject, QTimer
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+from tree_logic import FamilyTree
+from ui import GenealogyApp
+
+class PaintWatcher(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and not app.property("painted"):
+            app.setProperty("painted", True)
+            print(time.time() - float(os.environ["BENCH_START"]))
+            QTimer.singleShot(0, app.quit)
+        return False
+
+watcher = PaintWatcher()
+app.installEventFilter(watcher)
+window = GenealogyApp(FamilyTree())
+window.show()
+QTimer.singleShot(30000, app.quit)
+app.exec_()
+"""
+
+
+def import_times(stderr):
+    # Разбор вывода -X importtime: ({модуль: мс с вложенными импортами} для импортов скрипта и их
+    # прямых зависимостей, всего мс)
+    modules = {}
+    total = 0.0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Заголовок таблицы
+        depth = (len(name) - len(name.lstrip()) - 1) // 2  # Вложенные импорты сдвинуты на два пробела
+        if depth == 0:
+            total += int(cumulative) / 1000
+        if depth <= 1:
+            modules[name.strip()] = int(cumulative) / 1000
+    return modules, total
+
+
+def run_with_importtime(code, extra_env=None):
+    # Скрипт в отдельном интерпретаторе с -X importtime в пустом каталоге (без настроек и автосохранения)
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=here, QT_QPA_PLATFORM="offscreen", **(extra_env or {}))
+    with tempfile.TemporaryDirectory() as cwd:
+        start = time.time()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                              cwd=cwd, env=dict(env, BENCH_START=repr(start)))
+        seconds = time.time() - start
+    if proc.returncode != 0:
+        lines = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(lines[-1] if lines else "failed")
+    modules, total_ms = import_times(proc.stderr)
+    slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:8]
+    return proc.stdout, seconds, {"import_ms": round(total_ms, 1),
+                                  "slowest_imports_ms": {name: round(ms, 1) for name, ms in slowest}}
+
+
+@case("startup_cli", "startup")
+def bench_startup_cli(args):
+    # Запуск командной строки без Qt: импорт matsdrevo и всех модулей ядра
+    _, seconds, result = run_with_importtime("import matsdrevo")
+    result["process_seconds"] = round(seconds, 3)
+    return result
+
+
+@case("startup_first_paint", "startup")
+def bench_startup_first_paint(args):
+    # Время до первой отрисовки главного окна с пустым древом и импорты на этом пути
+    stdout, _, result = run_with_importtime(FIRST_PAINT_SCRIPT)
+    result["first_paint_seconds"] = round(float(stdout.strip().splitlines()[0]), 3)
+    return result
+
+
+@case("search", "search")
+def bench_search(args):
+    # Поиск по мере ввода: построение индекса и запросы по префиксу, с опечаткой и по годам
+    from dates import DateIndex
+    from search_index import SearchIndex
+    tree = load_tree(args)
+    index = SearchIndex(tree)
+    start = time.perf_counter()
+    index.rebuild()
+    build_seconds = time.perf_counter() - start
+    rng = random.Random(args.seed)
+    people = list(tree.people.values())
+    queries = []
+    for _ in range(300):
+        person = rng.choice(people)
+        surname = person["surname"] or "Иванов"
+        queries.append(surname[:3])  # Префикс по мере ввода
+        queries.append(f"{surname[:-2]}{surname[-1]}{surname[-2]} {person['name']}")  # Опечатка
+    start = time.perf_counter()
+    found = sum(len(index.search(query)) for query in queries)
+    search_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    dates = DateIndex(tree)
+    dates.rebuild()
+    start = time.perf_counter()
+    for _ in range(300):
+        first = rng.randint(1700, 1990)
+        dates.between(first, first + 20, limit=50)
+    return {"persons": len(tree.people), "build_seconds": round(build_seconds, 3), "search_ms": round(search_ms, 3),
+            "found_per_query": found // len(queries),
+            "years_ms": round((time.perf_counter() - start) * 1000 / 300, 4)}
+
+
+def run_case(name, args):
+    # Запуск одного замера в текущем процессе
+    start = time.perf_counter()
+    result = CASES[name](args)
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_isolated(name, argv):
+    # Запуск замера в отдельном процессе, чтобы пиковая память не смешивалась
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--case", name] + argv,
+                          capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности MatsDrevo")
+    parser.add_argument("group", nargs="?", choices=sorted(GROUPS), help="Группа замеров")
+    parser.add_argument("--case", choices=sorted(CASES), help="Запустить один замер в текущем процессе")
+    parser.add_argument("--persons", type=int, default=20000, help="Размер синтетического древа")
+    parser.add_argument("--edges", type=int, default=1000000, help="Число связей для замера relations")
+    parser.add_argument("--images", type=int, default=200, help="Число изображений для замеров backup")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--generations", type=int, default=10, help="Поколений в синтетическом древе")
+    parser.add_argument("--fertility", type=float, default=3.0, help="Детей в семье в среднем")
+    parser.add_argument("--collapse", type=float, default=0.02, help="Доля браков между родственниками")
+    parser.add_argument("--missing-dates", type=float, default=0.1, help="Доля пустых дат")
+    parser.add_argument("--file", help="Готовый входной файл вместо синтетического")
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args), ensure_ascii=False))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.file:
+            args.file = os.path.join(tmp, "synthetic.ged")
+            write_gedcom(args.file, args.persons, args.seed, generations=args.generations, fertility=args.fertility,
+                         collapse=args.collapse, missing_dates=args.missing_dates)
+        argv = ["--persons", str(args.persons), "--edges", str(args.edges), "--images", str(args.images), "--seed", str(args.seed),
+                "--file", args.file]
+        for group in ([args.group] if args.group else sorted(GROUPS)):
+            for name in GROUPS[group]:
+                print(f"{name}: {json.dumps(run_isolated(name, argv), ensure_ascii=False)}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
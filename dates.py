@@ -0,0 +1,252 @@
+import re
+from datetime import date as calendar_date
+from bisect import bisect_left, insort
+from collections import namedtuple
+from functools import lru_cache
+
+DATE_FIELDS = ("birth_date", "death_date")
+
+MIN_DAY = -10 ** 9  # Открытая граница диапазона: «до 1850», «после 1900»
+MAX_DAY = 10 ** 9
+DAYS_PER_YEAR = 365.2425
+
+MONTHS = {"JAN": 1, "FEB": 2, "MAR": 3, "APR": 4, "MAY": 5, "JUN": 6, "JUL": 7, "AUG": 8, "SEP": 9, "OCT": 10,
+          "NOV": 11, "DEC": 12,
+          # Русские названия по первым трём буквам: «марта», «мар.», «май»/«мая»
+          "ЯНВ": 1, "ФЕВ": 2, "МАР": 3, "АПР": 4, "МАЙ": 5, "МАЯ": 5, "ИЮН": 6, "ИЮЛ": 7, "АВГ": 8, "СЕН": 9,
+          "ОКТ": 10, "НОЯ": 11, "ДЕК": 12}
+APPROXIMATE = frozenset(("ABT", "CAL", "EST", "ОК", "ОКОЛО", "ПРИМЕРНО"))
+BEFORE = frozenset(("BEF", "ДО"))
+AFTER = frozenset(("AFT", "ПОСЛЕ"))
+CALENDAR_RE = re.compile(r"@#D([A-Z ]+)@")
+NUMERIC_RE = re.compile(r"^(\d{1,2})\.(\d{1,2})\.(\d{3,4})$|^(\d{3,4})-(\d{1,2})-(\d{1,2})$")
+YEAR_RE = re.compile(r"^(\d{1,4})(?:/(\d{2}))?$")
+TOKEN_RE = re.compile(r"@#D[A-Z ]+@|[^\s,]+")
+
+
+def gregorian_day(year, month, day):
+    # Номер юлианского дня для даты григорианского календаря (год астрономический: 1 г. до н. э. = 0)
+    a = (14 - month) // 12
+    y = year + 4800 - a
+    m = month + 12 * a - 3
+    return day + (153 * m + 2) // 5 + 365 * y + y // 4 - y // 100 + y // 400 - 32045
+
+
+def julian_day(year, month, day):
+    # Номер юлианского дня для даты юлианского календаря («старый стиль»)
+    a = (14 - month) // 12
+    y = year + 4800 - a
+    m = month + 12 * a - 3
+    return day + (153 * m + 2) // 5 + 365 * y + y // 4 - 32083
+
+
+def day_year(day):
+    # Григорианский год для номера юлианского дня
+    a = day + 32044
+    b = (4 * a + 3) // 146097
+    c = a - 146097 * b // 4
+    d = (4 * c + 3) // 1461
+    e = c - 1461 * d // 4
+    m = (5 * e + 2) // 153
+    return 100 * b + d - 4800 + m // 10
+
+
+class GenDate(namedtuple("GenDate", ("low", "high", "quality"))):
+    # Разобранная дата — диапазон номеров юлианских дней [low, high], не зависящий от календаря
+    # записи, и её характер: "exact", "about", "before", "after", "range".
+    # «1850» — весь 1850 год, «BET 1840 AND 1845» — 1840–1845, «BEF 1850» — всё до 1850 года.
+    __slots__ = ()
+
+    @property
+    def key(self):
+        # Точка для сортировки и подсчёта возрастов: середина диапазона или его известная граница
+        if self.low == MIN_DAY:
+            return self.high
+        if self.high == MAX_DAY:
+            return self.low
+        return (self.low + self.high) // 2
+
+    @property
+    def year(self):
+        return day_year(self.key)
+
+
+def _single_date(tokens, calendar):
+    # (первый день, последний день) для «[день] [месяц] год[/гг] [B.C.]» или None
+    bc = False
+    if tokens and tokens[-1] in ("B.C.", "BC", "BCE"):
+        bc = True
+        tokens = tokens[:-1]
+    if len(tokens) == 1:
+        numeric = NUMERIC_RE.match(tokens[0])
+        if numeric:
+            day, month, year = (numeric.group(1, 2, 3) if numeric.group(1)
+                                else numeric.group(6, 5, 4))
+            tokens = [day, month, year]
+    if not tokens or len(tokens) > 3:
+        return None
+    year_match = YEAR_RE.match(tokens[-1])
+    if not year_match:
+        return None
+    year = int(year_match.group(1))
+    dual = year_match.group(2) is not None
+    if dual:
+        # Двойной год «1850/51»: дата с 1 января по 24 марта, по старому счёту (год с 25 марта) —
+        # 1850, по новому — 1851 год. Вторая часть — только следующий год.
+        if int(year_match.group(2)) != (year + 1) % 100:
+            return None
+        year += 1
+    if bc:
+        year = 1 - year
+    month = None
+    day = None
+    if len(tokens) >= 2:
+        month_token = tokens[-2]
+        month = int(month_token) if month_token.isdigit() else MONTHS.get(month_token[:3])
+        if not month or not 1 <= month <= 12:
+            return None
+    if len(tokens) == 3:
+        if not tokens[0].isdigit():
+            return None
+        day = int(tokens[0])
+    to_day = julian_day if calendar == "JULIAN" else gregorian_day
+    last = to_day(year, 3, 24) if dual else MAX_DAY  # Последний день, допустимый для двойного года
+    if month is None:
+        return to_day(year, 1, 1), min(to_day(year + 1, 1, 1) - 1, last)
+    next_month = to_day(year + month // 12, month % 12 + 1, 1)
+    if day is None:
+        low = to_day(year, month, 1)
+        return (low, min(next_month - 1, last)) if low <= last else None
+    low = to_day(year, month, day)
+    if day < 1 or low >= next_month or low > last:
+        return None
+    return low, low
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_date(text):
+    # Разбор даты GEDCOM («12 MAR 1850», «ABT 1850», «BET 1840 AND 1845», «FROM 1850 TO 1860»,
+    # «1 JAN 1850/51», «@#DJULIAN@ 5 MAY 1801») и привычных русских записей («12.03.1850»,
+    # «около 1850», «12 марта 1850»). None для пустых и неразборчивых дат, фраз в скобках,
+    # еврейского и французского календарей. Даты в дереве сильно повторяются, поэтому разбор кэшируется.
+    text = text.strip().upper().replace("Ё", "Е")
+    if not text or text.startswith("("):
+        return None
+    calendar = "GREGORIAN"
+    tokens = []
+    for token in TOKEN_RE.findall(text.split("(")[0]):
+        escape = CALENDAR_RE.fullmatch(token)
+        if escape:
+            calendar = escape.group(1).strip()
+            if calendar not in ("GREGORIAN", "JULIAN"):
+                return None
+        else:
+            tokens.append(token)
+    if not tokens:
+        return None
+    head = tokens[0].rstrip(".")
+    if head == "INT":
+        tokens, head = tokens[1:], ""
+    if head in ("BET", "МЕЖДУ", "FROM"):
+        separator = "TO" if head == "FROM" else ("И" if head == "МЕЖДУ" else "AND")
+        if separator not in tokens:
+            if head != "FROM":
+                return None
+            span = _single_date(tokens[1:], calendar)  # «FROM 1850» — период без конца
+            return GenDate(span[0], MAX_DAY, "after") if span else None
+        split = tokens.index(separator)
+        first = _single_date(tokens[1:split], calendar)
+        second = _single_date(tokens[split + 1:], calendar)
+        if not first or not second or second[1] < first[0]:
+            return None
+        return GenDate(first[0], second[1], "range")
+    if head == "TO":
+        span = _single_date(tokens[1:], calendar)
+        return GenDate(MIN_DAY, span[1], "before") if span else None
+    if head in APPROXIMATE:
+        span = _single_date(tokens[1:], calendar)
+        return GenDate(span[0], span[1], "about") if span else None
+    if head in BEFORE:
+        span = _single_date(tokens[1:], calendar)
+        return GenDate(MIN_DAY, span[0] - 1, "before") if span else None
+    if head in AFTER:
+        span = _single_date(tokens[1:], calendar)
+        return GenDate(span[1] + 1, MAX_DAY, "after") if span else None
+    span = _single_date(tokens, calendar)
+    return GenDate(span[0], span[1], "exact") if span else None
+
+
+def today():
+    # Сегодняшняя дата как GenDate (для возраста живущих)
+    now = calendar_date.today()
+    day = gregorian_day(now.year, now.month, now.day)
+    return GenDate(day, day, "exact")
+
+
+def age_years(birth, death):
+    # Полных лет между двумя датами по их точкам сортировки
+    return int((death.key - birth.key) / DAYS_PER_YEAR)
+
+
+class DateIndex:
+    # Отсортированные списки (день, ID) по датам рождения и смерти для запросов по диапазону лет.
+    # Даты берутся из FamilyTree.dates, уже разобранными при добавлении персон; индекс
+    # обновляется по событиям древа, а после загрузки древа целиком строится при первом запросе.
+    def __init__(self, tree):
+        self.tree = tree
+        self._entries = {field: [] for field in DATE_FIELDS}
+        self._keys = {field: {} for field in DATE_FIELDS}  # ID -> день в списке
+        self._stale = True
+        tree.subscribe(self._on_tree_changed)
+
+    def rebuild(self):
+        self._stale = False
+        for field in DATE_FIELDS:
+            keys = {person_id: date.key for person_id, date in self.tree.dates[field].items()}
+            self._keys[field] = keys
+            self._entries[field] = sorted((key, person_id) for person_id, key in keys.items())
+
+    def _add(self, person_id):
+        for field in DATE_FIELDS:
+            date = self.tree.dates[field].get(person_id)
+            if date is not None:
+                self._keys[field][person_id] = date.key
+                insort(self._entries[field], (date.key, person_id))
+
+    def _remove(self, person_id):
+        for field in DATE_FIELDS:
+            key = self._keys[field].pop(person_id, None)
+            if key is not None:
+                entries = self._entries[field]
+                del entries[bisect_left(entries, (key, person_id))]
+
+    def _on_tree_changed(self, event, *args):
+        if event == "reset":
+            self._stale = True
+        elif self._stale:
+            return
+        elif event == "add":
+            self._add(args[0])
+        elif event == "edit":
+            self._remove(args[0])
+            self._add(args[0])
+        elif event == "remove":
+            self._remove(args[0])
+
+    def between(self, start_year, end_year, field="birth_date", limit=None):
+        # ID персон, чья дата field приходится на годы start_year–end_year включительно, по возрастанию даты
+        if self._stale:
+            self.rebuild()
+        entries = self._entries[field]
+        start = bisect_left(entries, (gregorian_day(start_year, 1, 1),))
+        end = bisect_left(entries, (gregorian_day(end_year + 1, 1, 1),))
+        if limit is not None:
+            end = min(end, start + limit)
+        return [person_id for _, person_id in entries[start:end]]
+
+    def count_between(self, start_year, end_year, field="birth_date"):
+        if self._stale:
+            self.rebuild()
+        entries = self._entries[field]
+        return (bisect_left(entries, (gregorian_day(end_year + 1, 1, 1),))
+                - bisect_left(entries, (gregorian_day(start_year, 1, 1),)))
\ No newline at end of file
@@ -0,0 +1,158 @@
+from collections import namedtuple
+from dates import DAYS_PER_YEAR, day_year
+
+try:
+    import numpy as np
+except ImportError:  # Расширенная статистика работает только с numpy
+    np = None
+
+MAX_LIFESPAN = 120
+CHILD_AGE = 5  # Смертность в детстве: умершие моложе стольких лет
+MIN_PARENT_AGE = 12  # Интервал поколений за пределами этих возрастов родителя считается ошибкой данных
+MAX_PARENT_AGE = 70
+MAX_CHILDREN_BIN = 10  # Семьи с большим числом детей считаются вместе
+
+
+def _codes(values):
+    # Коды строк для bincount: пустая строка — -1, остальные — номер в порядке появления
+    mapping = {}
+    codes = [mapping.setdefault(value, len(mapping)) if value else -1 for value in values]
+    names = [None] * len(mapping)
+    for value, code in mapping.items():
+        names[code] = value
+    return np.array(codes, dtype=np.int32), names
+
+
+# Неизменяемая копия данных древа для проекции: номер версии, кортежи
+# (id, день рождения, день смерти, id детей, фамилия, место рождения, место смерти) и копия уровней
+TreeSnapshot = namedtuple("TreeSnapshot", ("revision", "rows", "levels"))
+
+
+def _row(tree, person_id):
+    person = tree.people[person_id]
+    birth = tree.dates["birth_date"].get(person_id)
+    death = tree.dates["death_date"].get(person_id)
+    nan = float("nan")
+    return (person_id, birth.key if birth is not None else nan, death.key if death is not None else nan,
+            tuple(person["children"]), person["surname"], person["birth_place"], person["death_place"])
+
+
+def snapshot(tree, levels=None):
+    # Копия данных древа полным обходом (для разового расчёта)
+    return TreeSnapshot(tree.revision, tuple(_row(tree, pid) for pid in tree.people), dict(levels or {}))
+
+
+class TreeRows:
+    # Строки снимка, поддерживаемые по событиям древа: снимок для фонового расчёта — копия
+    # словаря строк и уровней на уровне C, без обхода персон в Python в потоке интерфейса.
+    # Полный обход — только при первом снимке и после замены древа целиком (reset).
+    def __init__(self, tree):
+        self.tree = tree
+        self._rows = None  # {id: строка} в порядке древа; None — строится при следующем снимке
+        tree.subscribe(self._on_tree_changed)
+
+    def _on_tree_changed(self, event, *args):
+        if self._rows is None:
+            return
+        if event == "reset":
+            self._rows = None
+        elif event == "remove":
+            self._rows.pop(args[0], None)
+        elif event == "add" or event == "edit":
+            self._rows[args[0]] = _row(self.tree, args[0])
+        elif event == "link" or event == "unlink":
+            if args[0] in self._rows:  # Меняется список детей родителя
+                self._rows[args[0]] = _row(self.tree, args[0])
+
+    def snapshot(self, levels=None):
+        if self._rows is None:
+            self._rows = {pid: _row(self.tree, pid) for pid in self.tree.people}
+        return TreeSnapshot(self.tree.revision, tuple(self._rows.values()), dict(levels or {}))
+
+
+class TreeArrays:
+    # Проекция древа в столбцы numpy: один проход по персонам, дальше вся статистика считается
+    # векторными операциями. Проекция соответствует tree.revision на момент построения.
+    # Принимает древо или готовый snapshot (для расчёта в фоновом потоке).
+    def __init__(self, tree, levels=None):
+        if np is None:
+            raise ValueError("Для расширенной статистики нужен пакет numpy")
+        data = tree if isinstance(tree, TreeSnapshot) else snapshot(tree, levels)
+        self.revision = data.revision
+        rows = data.rows
+        self.ids = [row[0] for row in rows]
+        index = {person_id: i for i, person_id in enumerate(self.ids)}
+        self.birth_day = np.array([row[1] for row in rows], dtype=float)
+        self.death_day = np.array([row[2] for row in rows], dtype=float)
+        self.birth_year = day_year(self.birth_day)  # Формула числа дня работает и для массивов, NaN сохраняется
+        self.child_count = np.array([len(row[3]) for row in rows], dtype=np.int64)
+        self.level = np.array([data.levels.get(person_id, 0) for person_id in self.ids], dtype=np.int32)
+        # Связи как два массива индексов: родитель[k] -> ребёнок[k]; дети идут подряд по родителям
+        self.child_index = np.array([index[child_id] for row in rows for child_id in row[3]], dtype=np.int64)
+        self.parent_index = np.repeat(np.arange(len(rows)), self.child_count)
+        self.surname, self.surnames = _codes([row[4] for row in rows])
+        self.birth_place, self.birth_places = _codes([row[5] for row in rows])
+        self.death_place, self.death_places = _codes([row[6] for row in rows])
+
+
+def _summary(values):
+    if not len(values):
+        return {"count": 0, "mean": 0.0, "median": 0.0}
+    return {"count": int(len(values)), "mean": float(values.mean()), "median": float(np.median(values))}
+
+
+def _top(codes, names, top):
+    # Самые частые значения: [(строка, число персон)]
+    counts = np.bincount(codes[codes >= 0], minlength=len(names))
+    order = np.argsort(counts, kind="stable")[::-1][:top]
+    return [(names[code], int(counts[code])) for code in order if counts[code]]
+
+
+def lifespans_by_decade(arrays):
+    # Продолжительность жизни по десятилетиям рождения: число, среднее, медиана, доля умерших в детстве
+    lifespan = (arrays.death_day - arrays.birth_day) / DAYS_PER_YEAR
+    valid = (lifespan >= 0) & (lifespan < MAX_LIFESPAN)  # NaN не проходит сравнения
+    lifespan = lifespan[valid]
+    decade = (arrays.birth_year[valid] // 10 * 10).astype(np.int64)
+    order = np.lexsort((lifespan, decade))
+    lifespan = lifespan[order]
+    decade = decade[order]
+    decades, starts, counts = np.unique(decade, return_index=True, return_counts=True)
+    sums = np.add.reduceat(lifespan, starts) if len(lifespan) else np.zeros(0)
+    children = np.add.reduceat((lifespan < CHILD_AGE).astype(np.int64), starts) if len(lifespan) else np.zeros(0)
+    # Медиана группы — середина её отсортированного отрезка
+    lower = lifespan[starts + (counts - 1) // 2]
+    upper = lifespan[starts + counts // 2]
+    return [{"decade": int(d), "count": int(n), "mean": float(s / n), "median": float((lo + up) / 2),
+             "child_deaths": float(c / n)}
+            for d, n, s, lo, up, c in zip(decades, counts, sums, lower, upper, children)]
+
+
+def fertility(arrays):
+    # Дети на одного родителя и распределение числа детей (последний столбец — MAX_CHILDREN_BIN и больше)
+    parents = arrays.child_count[arrays.child_count > 0]
+    histogram = np.bincount(np.minimum(arrays.child_count, MAX_CHILDREN_BIN), minlength=MAX_CHILDREN_BIN + 1)
+    return dict(_summary(parents), histogram=[int(count) for count in histogram])
+
+
+def generation_intervals(arrays):
+    # Возраст родителя при рождении ребёнка по всем связям с известными датами рождения
+    interval = (arrays.birth_day[arrays.child_index] - arrays.birth_day[arrays.parent_index]) / DAYS_PER_YEAR
+    interval = interval[(interval >= MIN_PARENT_AGE) & (interval <= MAX_PARENT_AGE)]
+    histogram = np.bincount((interval // 5).astype(np.int64), minlength=MAX_PARENT_AGE // 5 + 1)
+    return dict(_summary(interval), histogram=[(5 * i, int(count)) for i, count in enumerate(histogram) if count])
+
+
+def compute(arrays, top=20):
+    # Вся расширенная статистика по проекции; результат — обычные списки и числа (годится для JSON)
+    return {
+        "revision": arrays.revision,
+        "persons": len(arrays.ids),
+        "lifespans": lifespans_by_decade(arrays),
+        "fertility": fertility(arrays),
+        "generation_intervals": generation_intervals(arrays),
+        "generations": [int(count) for count in np.bincount(arrays.level)] if len(arrays.level) else [],
+        "surnames": _top(arrays.surname, arrays.surnames, top),
+        "birth_places": _top(arrays.birth_place, arrays.birth_places, top),
+        "death_places": _top(arrays.death_place, arrays.death_places, top),
+    }
\ No newline at end of file
@@ -0,0 +1,183 @@
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from search_index import normalize, edit_distance
+
+# Признаки: (название, номер в записи _record, вес). Признак, не заполненный у одной из персон,
+# не учитывается. Даты идут первыми: их сравнение дешевле и чаще всего сразу отсекает пару.
+FEATURES = (("birth", 4, 0.2), ("death", 5, 0.1), ("surname", 1, 0.3), ("name", 2, 0.25), ("patronymic", 3, 0.1),
+            ("place", 6, 0.05))
+MIN_EVIDENCE = 0.6  # Минимальный суммарный вес сравнённых признаков: одного ФИО мало
+DEFAULT_THRESHOLD = 0.85
+YEAR_BUCKET = 5  # Ширина корзины года рождения; сравниваются соседние корзины
+MAX_YEAR_GAP = 2 * 365  # Даты рождения дальше друг от друга — разные люди
+INLINE_COMPARISONS = 200000  # Меньше сравнений — без пула процессов
+# Близкие по звучанию согласные транслитерации сводятся к одной букве
+PHONETIC = str.maketrans({"b": "p", "v": "f", "w": "f", "g": "k", "q": "k", "d": "t", "z": "s", "c": "s"})
+
+
+def phonetic_key(text):
+    # Ключ блокировки: транслитерация, сведение похожих согласных, без гласных после первой буквы
+    # и без повторов — «Иванов», «Ivanoff» и «Иваноф» попадают в один блок
+    tokens = normalize(text)
+    if not tokens:
+        return ""
+    word = tokens[0].replace("kh", "k").replace("shch", "sh").replace("ch", "sh").replace("zh", "sh")
+    word = word.translate(PHONETIC)
+    key = word[0]
+    for letter in word[1:]:
+        if letter not in "aeiouy" and letter != key[-1]:
+            key += letter
+    return key
+
+
+def _record(tree, person_id):
+    # Сравниваемые признаки персоны в компактном виде для передачи в процессы пула
+    person = tree.people[person_id]
+    birth = tree.dates["birth_date"].get(person_id)
+    death = tree.dates["death_date"].get(person_id)
+    return (person_id,
+            " ".join(normalize(person["surname"])), " ".join(normalize(person["name"])),
+            " ".join(normalize(person["patronymic"])),
+            (birth.low, birth.high, birth.key) if birth else None,
+            (death.low, death.high, death.key) if death else None,
+            frozenset(normalize(person["birth_place"])))
+
+
+def _text_similarity(a, b):
+    if not a or not b:
+        return None
+    if a == b:
+        return 1.0
+    limit = 2 if max(len(a), len(b)) > 6 else 1
+    distance = edit_distance(a, b, limit)
+    return 0.0 if distance > limit else 1.0 - distance / max(len(a), len(b))
+
+
+def _date_similarity(a, b):
+    # 1 — совпадение, доли — пересечение или близость диапазонов; -1 — даты несовместимы
+    if a is None or b is None:
+        return None
+    if a[0] == a[1] and b[0] == b[1]:
+        gap = abs(a[0] - b[0])
+        if not gap:
+            return 1.0
+        return 0.5 if gap <= 31 else (0.2 if gap <= MAX_YEAR_GAP else -1)
+    if a[0] <= b[1] and b[0] <= a[1]:
+        return 0.8
+    gap = max(a[0], b[0]) - min(a[1], b[1])
+    return 0.4 if gap <= MAX_YEAR_GAP else -1
+
+
+def score(first, second):
+    # Сходство двух записей _record от 0 до 1
+    total = 0.0
+    evidence = 0.0
+    for field, index, weight in FEATURES:
+        a, b = first[index], second[index]
+        if field in ("birth", "death"):
+            similarity = _date_similarity(a, b)
+            if similarity == -1:
+                return 0.0
+        elif field == "place":
+            similarity = len(a & b) / len(a | b) if a and b else None
+        else:
+            similarity = _text_similarity(a, b)
+            if similarity == 0.0 and field != "patronymic":
+                return 0.0  # Совсем разные фамилии или имена
+        if similarity is not None:
+            total += weight * similarity
+            evidence += weight
+    return total / evidence if evidence >= MIN_EVIDENCE else 0.0
+
+
+def _bucket(record):
+    birth = record[4]
+    return None if birth is None else int(birth[2] / 365.2425) // YEAR_BUCKET
+
+
+def _compare_block(block, threshold):
+    # Пары (новая, существующая, оценка) внутри блока; датированные персоны сравниваются
+    # с соседними корзинами года рождения, недатированные — со всем блоком
+    new_records, existing_records = block
+    buckets = defaultdict(list)
+    for record in existing_records:
+        buckets[_bucket(record)].append(record)
+    pairs = []
+    for record in new_records:
+        bucket = _bucket(record)
+        if bucket is None:
+            candidates = existing_records
+        else:
+            candidates = buckets[bucket - 1] + buckets[bucket] + buckets[bucket + 1] + buckets[None]
+        for other in candidates:
+            value = score(record, other)
+            if value >= threshold:
+                pairs.append((record[0], other[0], value))
+    return pairs
+
+
+def _compare_blocks(blocks, threshold):
+    pairs = []
+    for block in blocks:
+        pairs.extend(_compare_block(block, threshold))
+    return pairs
+
+
+def find_duplicates(tree, new_ids, threshold=DEFAULT_THRESHOLD, workers=None, progress=None):
+    # Вероятные дубликаты: новые персоны new_ids (например, только что импортированные) против
+    # остальных персон древа. Блоки — по фонетическим ключам фамилии и имени; блоки сравниваются
+    # в пуле процессов. Возвращает пары (новая, существующая, оценка) один к одному, лучшие первыми.
+    # progress(обработано блоков, всего).
+    new_ids = set(new_ids)
+    groups = defaultdict(lambda: ([], []))
+    for person_id in tree.people:
+        record = _record(tree, person_id)
+        key = (phonetic_key(record[1]), phonetic_key(record[2]))
+        groups[key][0 if person_id in new_ids else 1].append(record)
+    blocks = [block for block in groups.values() if block[0] and block[1]]
+    comparisons = sum(len(new) * len(existing) for new, existing in blocks)
+    workers = workers or os.cpu_count() or 1
+    pairs = []
+    if workers == 1 or comparisons < INLINE_COMPARISONS:
+        for done, block in enumerate(blocks, 1):
+            pairs.extend(_compare_block(block, threshold))
+            if progress and done % 100 == 0:
+                progress(done, len(blocks))
+    else:
+        # Крупные блоки первыми, задания — пачками блоков примерно равного объёма
+        blocks.sort(key=lambda block: len(block[0]) * len(block[1]), reverse=True)
+        chunks = [blocks[i::workers * 4] for i in range(workers * 4)]
+        # spawn, а не fork: поиск запускается из рабочего потока приложения с Qt
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(_compare_blocks, chunk, threshold) for chunk in chunks if chunk]
+            for done, future in enumerate(futures, 1):
+                pairs.extend(future.result())
+                if progress:
+                    progress(done, len(futures))
+
+    # Жадное сопоставление один к одному: каждая персона участвует не больше чем в одной паре
+    pairs.sort(key=lambda pair: pair[2], reverse=True)
+    matched_new = set()
+    matched_existing = set()
+    result = []
+    for new_id, existing_id, value in pairs:
+        if new_id in matched_new or existing_id in matched_existing:
+            continue
+        matched_new.add(new_id)
+        matched_existing.add(existing_id)
+        result.append((new_id, existing_id, value))
+    return result
+
+
+def merge_duplicates(tree, pairs, progress=None):
+    # Объединение пар (новая, существующая, оценка): данные и связи новой персоны переносятся
+    # на существующую. Возвращает число объединённых персон.
+    merged = 0
+    for done, (new_id, existing_id, _) in enumerate(pairs, 1):
+        if tree.merge_persons(existing_id, new_id):
+            merged += 1
+        if progress and done % 1000 == 0:
+            progress(done, len(pairs))
+    return merged
\ No newline at end of file
@@ -1,121 +1,305 @@
-from gedcom.element.individual import IndividualElement
-from gedcom.parser import Parser
+import gzip
+import io
+import os
+from operator import itemgetter
+from instrumentation import span
+
+EXPORT_BUFFER_SIZE = 1024 * 1024
+MAX_LINE_VALUE = 240  # Длина значения в строке; вместе с уровнем и тегом не больше 255 символов GEDCOM
+PATRONYMIC_ENDINGS = ("вич", "вна", "ична", "инична")  # Русские отчества: Петрович, Петровна, Кузьминична
+
+
+def value_lines(level, tag, value):
+    # Строки GEDCOM для значения одной строкой текста: переводы строк — через CONT, длинные
+    # строки — через CONC. Разрыв CONC не ставится рядом с пробелом: некоторые программы
+    # обрезают пробелы по краям строк.
+    value = str(value)
+    if len(value) <= MAX_LINE_VALUE and "\n" not in value:
+        return f"{level} {tag} {value}\n"
+    lines = []
+    for index, text in enumerate(value.split("\n")):
+        line_tag = tag if index == 0 else "CONT"
+        line_level = level if index == 0 else level + 1
+        while len(text) > MAX_LINE_VALUE:
+            cut = MAX_LINE_VALUE
+            while cut > MAX_LINE_VALUE // 2 and (text[cut - 1] == " " or text[cut] == " "):
+                cut -= 1
+            lines.append(f"{line_level} {line_tag} {text[:cut]}\n")
+            text = text[cut:]
+            line_tag = "CONC"
+            line_level = level + 1
+        lines.append(f"{line_level} {line_tag} {text}\n" if text else f"{line_level} {line_tag}\n")
+    return "".join(lines)
+
+
+class GedcomRecord:
+    # Запись GEDCOM: уровень, указатель, тег, значение и вложенные подзаписи
+    __slots__ = ("level", "xref", "tag", "value", "children")
+
+    def __init__(self, level, xref, tag, value):
+        self.level = level
+        self.xref = xref
+        self.tag = tag
+        self.value = value
+        self.children = []
+
+    def find(self, tag):
+        # Первая подзапись с указанным тегом
+        for child in self.children:
+            if child.tag == tag:
+                return child
+        return None
+
+    def get_text(self):
+        # Значение с учётом продолжений CONC/CONT
+        parts = [self.value]
+        for child in self.children:
+            if child.tag == "CONC":
+                parts.append(child.value)
+            elif child.tag == "CONT":
+                parts.append("\n" + child.value)
+        return "".join(parts)
+
+
+def iter_gedcom_lines(file_path, progress=None):
+    # Построчное чтение GEDCOM: (уровень, указатель, тег, значение);
+    # progress(прочитано байт, размер файла) вызывается каждые 10000 строк
+    total = os.path.getsize(file_path)
+    if file_path.lower().endswith(".gz"):
+        f = gzip.open(file_path, "rt", encoding="utf-8-sig", errors="replace")
+        position = f.buffer.fileobj.tell  # Позиция в сжатом файле, чтобы сравнивать с его размером
+    else:
+        f = open(file_path, "r", encoding="utf-8-sig", errors="replace")
+        position = f.buffer.tell
+    with f:
+        for number, raw_line in enumerate(f):
+            if progress and number % 10000 == 0:
+                progress(position(), total)
+            line = raw_line.rstrip("\r\n").lstrip()
+            if not line:
+                continue
+            parts = line.split(" ", 2)
+            if len(parts) < 2 or not parts[0].isdigit():
+                continue  # Пропуск некорректных строк
+            level = int(parts[0])
+            if len(parts[1]) > 1 and parts[1][0] == "@" and parts[1][-1] == "@":
+                if len(parts) < 3:
+                    continue
+                xref = parts[1]
+                tag, _, value = parts[2].partition(" ")
+            else:
+                xref = None
+                tag = parts[1]
+                value = parts[2] if len(parts) > 2 else ""
+            yield level, xref, tag, value
+
+
+def iter_gedcom_records(file_path, progress=None):
+    # Потоковое чтение записей уровня 0: в памяти держится только текущая запись
+    record = None
+    stack = []
+    for level, xref, tag, value in iter_gedcom_lines(file_path, progress):
+        if level == 0:
+            if record is not None:
+                yield record
+            record = GedcomRecord(level, xref, tag, value)
+            stack = [record]
+            continue
+        if record is None:
+            continue
+        del stack[level:]
+        node = GedcomRecord(level, xref, tag, value)
+        stack[-1].children.append(node)
+        stack.append(node)
+    if record is not None:
+        yield record
+
 
 class GedcomHandler:
     def __init__(self, tree):
         self.tree = tree
+        self.source = ""  # Программа, создавшая импортируемый файл (HEAD.SOUR)
 
-    def import_gedcom(self, file_path):
-        # Импорт GEDCOM-файла
+    def import_gedcom(self, file_path, progress=None, merge=False):
+        # Импорт GEDCOM-файла за один проход; progress(прочитано байт, размер файла).
+        # merge — добавить персоны к текущему древу, не очищая его. Возвращает ID импортированных персон.
         try:
-            parser = Parser()
-            parser.parse_file(file_path)
-            root = parser.get_root_element()
-
-            # Очистка текущего дерева
-            self.tree.people.clear()
-
-            # Получение всех индивидуумов
-            individuals = [elem for elem in parser.get_element_list() if isinstance(elem, IndividualElement)]
-            for element in individuals:
-                person_id = element.get_pointer()
-                if not person_id or person_id in self.tree.people:
-                    continue
-                name_parts = element.get_name()
-                surname = name_parts[1].strip() if name_parts[1] else ""
-                name = name_parts[0].strip() if name_parts[0] else "Без имени"
-                data = {
-                    "surname": surname,
-                    "name": name,
-                    "patronymic": "",
-                    "birth_date": "",
-                    "death_date": "",
-                    "birth_place": "",
-                    "death_place": "",
-                    "notes": "",
-                    "image_path": ""
-                }
-                # Извлечение дополнительных данных
-                for child in element.get_child_elements():
-                    if child.get_tag() == "BIRT":
-                        for subchild in child.get_child_elements():
-                            if subchild.get_tag() == "DATE":
-                                data["birth_date"] = subchild.get_value()
-                            if subchild.get_tag() == "PLAC":
-                                data["birth_place"] = subchild.get_value()
-                    if child.get_tag() == "DEAT":
-                        for subchild in child.get_child_elements():
-                            if subchild.get_tag() == "DATE":
-                                data["death_date"] = subchild.get_value()
-                            if subchild.get_tag() == "PLAC":
-                                data["death_place"] = subchild.get_value()
-                    if child.get_tag() == "NOTE":
-                        data["notes"] = child.get_value()
-                    if child.get_tag() == "OBJE":
-                        for subchild in child.get_child_elements():
-                            if subchild.get_tag() == "FILE":
-                                data["image_path"] = subchild.get_value()
-                self.tree.add_person(data)
-
-            # Обработка семей
-            for element in individuals:
-                person_id = element.get_pointer()
-                if not person_id or person_id not in self.tree.people:
-                    continue
-                families = element.get_families()
-                for family in families:
-                    children = family.get_children()
-                    for child in children:
-                        child_id = child.get_pointer()
-                        if child_id and child_id in self.tree.people and child_id != person_id:
-                            if person_id not in self.tree.people[child_id]["parents"]:
-                                self.tree.people[child_id]["parents"].append(person_id)
-                            if child_id not in self.tree.people[person_id]["children"]:
-                                self.tree.people[person_id]["children"].append(child_id)
+            with span("gedcom.import", file=os.path.basename(file_path), merge=merge) as info:
+                if not merge:
+                    self.tree.clear()
+                self.source = ""
+
+                id_map = {}  # Указатель GEDCOM -> ID персоны
+                families = []  # (родители, дети) по записям FAM
+                links = 0
+                for record in iter_gedcom_records(file_path, progress):
+                    if record.tag == "HEAD":
+                        source_record = record.find("SOUR")
+                        self.source = source_record.value.strip() if source_record else ""
+                    elif record.tag == "INDI":
+                        if not record.xref or record.xref in id_map:
+                            continue
+                        id_map[record.xref] = self.tree.add_person(self._person_data(record))
+                    elif record.tag == "FAM":
+                        parents = [child.value for child in record.children if child.tag in ("HUSB", "WIFE")]
+                        children = [child.value for child in record.children if child.tag == "CHIL"]
+                        if parents and children:
+                            families.append((parents, children))
+
+                # Обработка семей: FAM-записи могут идти до или после INDI
+                for parents, children in families:
+                    for parent_xref in parents:
+                        parent_id = id_map.get(parent_xref)
+                        if not parent_id:
+                            continue
+                        for child_xref in children:
+                            child_id = id_map.get(child_xref)
+                            if child_id and self.tree.link_parent_child(parent_id, child_id):
+                                links += 1
+                info.update(persons=len(id_map), families=len(families), links=links)
+                return list(id_map.values())
         except Exception as e:
             raise ValueError(f"Ошибка при импорте GEDCOM: {str(e)}")
 
-    def export_gedcom(self, file_path):
-        # Экспорт данных в GEDCOM-файл
+    def _person_data(self, record):
+        # Извлечение данных персоны из записи INDI
+        data = {
+            "surname": "",
+            "name": "",
+            "patronymic": "",
+            "birth_date": "",
+            "death_date": "",
+            "birth_place": "",
+            "death_place": "",
+            "notes": "",
+            "image_path": ""
+        }
+        name_record = record.find("NAME")
+        if name_record:
+            given, _, rest = name_record.value.partition("/")
+            data["surname"] = rest.partition("/")[0].strip()
+            data["name"] = given.strip()
+            surname_record = name_record.find("SURN")
+            if surname_record and not data["surname"]:
+                data["surname"] = surname_record.value.strip()
+            # Экспорт MatsDrevo записывает отчество в GIVN. В файлах других программ GIVN — полное
+            # или иное написание имени; отчеством он считается, только если похож на русское отчество
+            # и имя в NAME им заканчивается
+            given_record = name_record.find("GIVN")
+            given_value = given_record.value.strip() if given_record else ""
+            if given_value and self.source == "MatsDrevo":
+                data["patronymic"] = given_value
+            elif given_value.casefold().endswith(PATRONYMIC_ENDINGS) and data["name"].endswith(" " + given_value):
+                data["name"] = data["name"][:-len(given_value)].strip()
+                data["patronymic"] = given_value
+        if not data["name"]:
+            data["name"] = "Без имени"
+
+        for child in record.children:
+            if child.tag == "BIRT" or child.tag == "DEAT":
+                prefix = "birth" if child.tag == "BIRT" else "death"
+                for subchild in child.children:
+                    if subchild.tag == "DATE":
+                        data[f"{prefix}_date"] = subchild.get_text()
+                    if subchild.tag == "PLAC":
+                        data[f"{prefix}_place"] = subchild.get_text()
+            elif child.tag == "NOTE":
+                data["notes"] = child.get_text()
+            elif child.tag == "OBJE":
+                file_record = child.find("FILE")
+                if file_record:
+                    data["image_path"] = file_record.get_text()
+        return data
+
+    def export_gedcom(self, file_path, person_ids=None, progress=None, compress=None):
+        # Потоковый экспорт в GEDCOM через буферизованную запись. person_ids — поднабор персон
+        # (поддерево, фильтр), связи за его пределы не выгружаются. compress — gzip; по умолчанию
+        # включается для имён *.gz. progress(выгружено персон, всего).
         try:
-            lines = [
-                "0 HEAD",
-                "1 GEDC",
-                "2 VERS 5.5.1",
-                "2 FORM LINEAGE-LINKED",
-                "1 CHAR UTF-8",
-            ]
-
-            # Добавление индивидуумов
-            for person_id, person in self.tree.people.items():
-                lines.append(f"0 {person_id} INDI")
-                name = person["name"]
-                surname = person["surname"]
-                lines.append(f"1 NAME {name} /{surname}/")
-                if person["patronymic"]:
-                    lines.append(f"2 GIVN {person['patronymic']}")
-                if person["birth_date"]:
-                    lines.append("1 BIRT")
-                    lines.append(f"2 DATE {person['birth_date']}")
-                    if person["birth_place"]:
-                        lines.append(f"2 PLAC {person['birth_place']}")
-                if person["death_date"]:
-                    lines.append("1 DEAT")
-                    lines.append(f"2 DATE {person['death_date']}")
-                    if person["death_place"]:
-                        lines.append(f"2 PLAC {person['death_place']}")
-                if person["notes"]:
-                    lines.append(f"1 NOTE {person['notes']}")
-                if person["image_path"]:
-                    lines.append("1 OBJE")
-                    lines.append(f"2 FILE {person['image_path']}")
-
-            # Завершение файла
-            lines.append("0 TRLR")
-
-            # Запись в файл
-            with open(file_path, "w", encoding="utf-8") as f:
-                for line in lines:
-                    f.write(line + "\n")
+            with span("gedcom.export", file=os.path.basename(file_path),
+                      persons=len(person_ids) if person_ids is not None else len(self.tree.people)) as info:
+                if compress is None:
+                    compress = file_path.lower().endswith(".gz")
+                if compress:
+                    raw = gzip.GzipFile(file_path, "wb", compresslevel=6)
+                else:
+                    raw = open(file_path, "wb")
+                with io.TextIOWrapper(io.BufferedWriter(raw, EXPORT_BUFFER_SIZE), encoding="utf-8", newline="\n") as f:
+                    batch = []
+                    lines = 0
+                    for line in self.iter_export_lines(person_ids, progress):
+                        lines += 1
+                        batch.append(line)
+                        if len(batch) >= 4096:
+                            f.write("".join(batch))
+                            batch.clear()
+                    f.write("".join(batch))
+                info["lines"] = lines
         except Exception as e:
-            raise ValueError(f"Ошибка при экспорте GEDCOM: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Ошибка при экспорте GEDCOM: {str(e)}")
+
+    def iter_export_lines(self, person_ids=None, progress=None):
+        # Строки GEDCOM (с переводом строки) для персон и семей. Семья — группа детей с одним
+        # набором родителей; пол в древе не хранится, поэтому первый родитель пишется как HUSB,
+        # второй — как WIFE (импорт читает их одинаково).
+        people = self.tree.people
+        ids = list(people) if person_ids is None else [pid for pid in person_ids if pid in people]
+        xrefs = {person_id: f"@I{number}@" for number, person_id in enumerate(ids, 1)}
+
+        families = {}  # Родители -> номер семьи
+        family_children = []  # Номер семьи - 1 -> дети
+        child_of = {}  # ID ребёнка -> номера семей
+        spouse_in = {}  # ID родителя -> номера семей
+        for person_id in ids:
+            parents = tuple(parent_id for parent_id in people[person_id]["parents"] if parent_id in xrefs)
+            if not parents:
+                continue
+            # Больше двух родителей в одну семью GEDCOM не поместить: каждый получает свою
+            for key in ([parents] if len(parents) <= 2 else [(parent_id,) for parent_id in parents]):
+                number = families.get(key)
+                if number is None:
+                    family_children.append([])
+                    number = families[key] = len(family_children)
+                    for parent_id in key:
+                        spouse_in.setdefault(parent_id, []).append(number)
+                family_children[number - 1].append(person_id)
+                child_of.setdefault(person_id, []).append(number)
+
+        yield "0 HEAD\n1 SOUR MatsDrevo\n1 GEDC\n2 VERS 5.5.1\n2 FORM LINEAGE-LINKED\n1 CHAR UTF-8\n"
+        fields = itemgetter("surname", "name", "patronymic", "birth_date", "death_date", "birth_place", "death_place",
+                            "notes", "image_path")
+        for done, person_id in enumerate(ids):
+            if progress and done % 10000 == 0:
+                progress(done, len(ids))
+            surname, name, patronymic, birth_date, death_date, birth_place, death_place, notes, image_path = \
+                fields(people[person_id])
+            parts = [f"0 {xrefs[person_id]} INDI\n", value_lines(1, "NAME", f"{name} /{surname}/")]
+            if patronymic:
+                parts.append(value_lines(2, "GIVN", patronymic))
+            for tag, date, place in (("BIRT", birth_date, birth_place), ("DEAT", death_date, death_place)):
+                if date or place:
+                    parts.append(f"1 {tag}\n")
+                    if date:
+                        parts.append(value_lines(2, "DATE", date))
+                    if place:
+                        parts.append(value_lines(2, "PLAC", place))
+            if notes:
+                parts.append(value_lines(1, "NOTE", notes))
+            if image_path:
+                parts.append("1 OBJE\n")
+                parts.append(value_lines(2, "FILE", image_path))
+            for number in child_of.get(person_id, ()):
+                parts.append(f"1 FAMC @F{number}@\n")
+            for number in spouse_in.get(person_id, ()):
+                parts.append(f"1 FAMS @F{number}@\n")
+            yield "".join(parts)
+
+        for (parents, number), children in zip(families.items(), family_children):
+            lines = [f"0 @F{number}@ FAM\n"]
+            for tag, parent_id in zip(("HUSB", "WIFE"), parents):
+                lines.append(f"1 {tag} {xrefs[parent_id]}\n")
+            lines += [f"1 CHIL {xrefs[child_id]}\n" for child_id in children]
+            yield "".join(lines)
+        yield "0 TRLR\n"
+        if progress:
+            progress(len(ids), len(ids))
\ No newline at end of file
@@ -0,0 +1,95 @@
+from collections import deque
+
+
+def find_back_edges(people, person_ids=None):
+    # Связи родитель -> ребёнок, замыкающие циклы (итеративный обход в глубину).
+    # Без этих связей граф становится ациклическим.
+    members = people if person_ids is None else set(person_ids)
+    state = {}  # 1 — персона в стеке обхода, 2 — обработана
+    back_edges = []
+    for start_id in (people if person_ids is None else person_ids):
+        if start_id in state:
+            continue
+        state[start_id] = 1
+        stack = [(start_id, iter(people[start_id]["children"]))]
+        while stack:
+            person_id, children = stack[-1]
+            for child_id in children:
+                if child_id not in members:
+                    continue
+                child_state = state.get(child_id)
+                if child_state is None:
+                    state[child_id] = 1
+                    stack.append((child_id, iter(people[child_id]["children"])))
+                    break
+                if child_state == 1:
+                    back_edges.append((person_id, child_id))
+            else:
+                state[person_id] = 2
+                stack.pop()
+    return back_edges
+
+
+def assign_levels(people):
+    # Уровни поколений за O(V+E) по алгоритму Кана: уровень — длина самой длинной цепочки предков,
+    # поэтому при пересечении линий (pedigree collapse) персона получает наибольший уровень.
+    # Возвращает (levels, cycle_links): cycle_links — связи, проигнорированные для разрыва циклов.
+    indegree = {}
+    queue = deque()
+    levels = {}
+    for person_id, person in people.items():
+        count = sum(1 for parent_id in person["parents"] if parent_id in people)
+        indegree[person_id] = count
+        if not count:
+            queue.append(person_id)
+            levels[person_id] = 0
+
+    ignored = set()
+
+    def process(queue):
+        resolved = 0
+        while queue:
+            person_id = queue.popleft()
+            resolved += 1
+            level = levels[person_id] + 1
+            for child_id in people[person_id]["children"]:
+                if child_id not in indegree or (ignored and (person_id, child_id) in ignored):
+                    continue
+                if levels.get(child_id, 0) < level:
+                    levels[child_id] = level
+                indegree[child_id] -= 1
+                if not indegree[child_id]:
+                    queue.append(child_id)
+        return resolved
+
+    cycle_links = []
+    if process(queue) < len(people):
+        # Оставшиеся персоны входят в циклы или происходят от них: разрываем циклы и продолжаем
+        remaining = [person_id for person_id, count in indegree.items() if count]
+        cycle_links = find_back_edges(people, remaining)
+        ignored.update(cycle_links)
+        for _, child_id in cycle_links:
+            indegree[child_id] -= 1
+            if not indegree[child_id]:
+                queue.append(child_id)
+                levels.setdefault(child_id, 0)
+        process(queue)
+    return levels, cycle_links
+
+
+def collect_relatives(people, person_id, descendants=True, ancestors=False):
+    # ID персоны и её потомков и/или предков (обход в ширину, циклы не мешают)
+    found = {person_id}
+    queue = deque([person_id])
+    while queue:
+        current = people[queue.popleft()]
+        related = []
+        if descendants:
+            related.extend(current["children"])
+        if ancestors:
+            related.extend(current["parents"])
+        for related_id in related:
+            if related_id not in found:
+                found.add(related_id)
+                queue.append(related_id)
+    return found
\ No newline at end of file
@@ -0,0 +1,207 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+SPAN_CAPACITY = 20000  # Хранятся последние интервалы; старые вытесняются
+
+
+class Tracer:
+    # Журнал интервалов времени (spans) и мгновенных событий горячих путей: импорт, экспорт,
+    # сохранение, раскладка, построение сцены, статистика. Интервал — имя, начало, длительность,
+    # поток, вложенность и счётчики обработанного (персоны, связи, элементы). Выгружается в
+    # JSON Lines или в формат Chrome trace (chrome://tracing, Perfetto). Без Qt: годится и для
+    # командной строки.
+    def __init__(self, capacity=SPAN_CAPACITY):
+        self.enabled = True
+        self.spans = deque(maxlen=capacity)
+        self._origin = time.perf_counter()
+        self._local = threading.local()  # Стек открытых интервалов потока
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **counters):
+        # with tracer.span("gedcom.import", file=path) as info: ...; info["persons"] = n
+        # Словарь info дополняется счётчиками по ходу работы и попадает в запись интервала.
+        info = dict(counters)
+        if not self.enabled:
+            yield info
+            return
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield info
+        except BaseException as e:
+            info["error"] = type(e).__name__
+            raise
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            record = {"name": name, "start": start - self._origin, "duration": end - start,
+                      "thread": threading.current_thread().name, "depth": len(stack), "args": info}
+            with self._lock:
+                self.spans.append(record)
+
+    def event(self, name, **args):
+        # Мгновенное событие (ошибка, отмена) в общей ленте
+        if self.enabled:
+            record = {"name": name, "start": time.perf_counter() - self._origin, "duration": None,
+                      "thread": threading.current_thread().name, "depth": 0, "args": args}
+            with self._lock:
+                self.spans.append(record)
+
+    def recent(self, limit=200):
+        # Последние записи, новые первыми
+        with self._lock:
+            records = list(self.spans)
+        return records[::-1][:limit]
+
+    def summary(self):
+        # Сводка по именам интервалов: {имя: {count, total, max, last}} в секундах
+        result = {}
+        with self._lock:
+            records = list(self.spans)
+        for record in records:
+            if record["duration"] is None:
+                continue
+            entry = result.setdefault(record["name"], {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+            entry["count"] += 1
+            entry["total"] += record["duration"]
+            entry["max"] = max(entry["max"], record["duration"])
+            entry["last"] = record["duration"]
+        return result
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+    def export_jsonl(self, file_path):
+        # Одна запись на строку, по времени начала
+        with self._lock:
+            records = sorted(self.spans, key=lambda record: record["start"])
+        with open(file_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        return len(records)
+
+    def export_chrome_trace(self, file_path):
+        # Формат Trace Event: интервалы — события "X" в микросекундах, мгновенные — "i"
+        with self._lock:
+            records = list(self.spans)
+        threads = {}
+        events = []
+        for record in records:
+            tid = threads.setdefault(record["thread"], len(threads) + 1)
+            event = {"name": record["name"], "ts": round(record["start"] * 1e6, 1), "pid": os.getpid(), "tid": tid,
+                     "args": record["args"]}
+            if record["duration"] is None:
+                event.update(ph="i", s="t")
+            else:
+                event.update(ph="X", dur=round(record["duration"] * 1e6, 1))
+            events.append(event)
+        events.extend({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                      for name, tid in threads.items())
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False, default=str)
+        return len(records)
+
+
+class Profiler:
+    # Снимок профиля по запросу: cProfile для GUI-потока и фоновых задач (каждый поток со своим
+    # профилировщиком, при остановке профили объединяются) и tracemalloc для памяти. Пока снимок
+    # не запущен, накладных расходов нет.
+    def __init__(self):
+        self.active = False
+        self._profiles = []
+        self._lock = threading.Lock()
+        self._main = None
+        self._memory = False
+
+    def start(self, cpu=True, memory=True):
+        if self.active:
+            return
+        self._profiles = []
+        if cpu:
+            import cProfile
+            self._main = cProfile.Profile()
+            self._profiles.append(self._main)
+            self._main.enable()
+        if memory:
+            import tracemalloc
+            tracemalloc.start(10)
+        self._memory = memory
+        self.active = True
+
+    @contextmanager
+    def thread_profile(self):
+        # Профилирование тела with в текущем (не GUI) потоке, если снимок запущен
+        if not self.active or self._main is None:
+            yield
+            return
+        import cProfile
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # Python 3.12+: одновременно активен только один профилировщик
+            yield
+            return
+        with self._lock:
+            self._profiles.append(profile)
+        try:
+            yield
+        finally:
+            profile.disable()
+
+    def stop(self, directory):
+        # Остановка и запись результатов в directory: profile.prof (для pstats, snakeviz),
+        # profile.txt (50 самых затратных функций) и memory.txt (50 мест с наибольшим выделением).
+        # Возвращает пути записанных файлов.
+        if not self.active:
+            return []
+        self.active = False
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y-%m-%dT%H-%M-%S")
+        paths = []
+        if self._main is not None:
+            import io
+            import pstats
+            self._main.disable()
+            self._main = None
+            with self._lock:
+                profiles = self._profiles
+                self._profiles = []
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            path = os.path.join(directory, f"profile_{stamp}.prof")
+            stats.dump_stats(path)
+            paths.append(path)
+            text = io.StringIO()
+            pstats.Stats(path, stream=text).sort_stats("cumulative").print_stats(50)
+            path = os.path.join(directory, f"profile_{stamp}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text.getvalue())
+            paths.append(path)
+        if self._memory:
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            path = os.path.join(directory, f"memory_{stamp}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"Выделено сейчас: {current / 1024 / 1024:.1f} МБ, пик: {peak / 1024 / 1024:.1f} МБ\n\n")
+                for stat in snapshot.statistics("lineno")[:50]:
+                    f.write(f"{stat}\n")
+            paths.append(path)
+        return paths
+
+
+# Общие экземпляры процесса: модули ядра и интерфейс пишут в один журнал
+tracer = Tracer()
+profiler = Profiler()
+span = tracer.span
\ No newline at end of file
@@ -0,0 +1,94 @@
+import threading
+import traceback
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from instrumentation import profiler, span, tracer
+
+
+class JobCancelled(BaseException):
+    # Отмена задачи; наследует BaseException, чтобы пройти сквозь обработчики except Exception,
+    # которые оборачивают ошибки в ValueError
+    pass
+
+
+class _JobSignals(QObject):
+    progress = pyqtSignal(int, int, str)  # выполнено, всего (0 — неизвестно), этап
+    finished = pyqtSignal(object)  # результат функции задачи
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class Job(QRunnable):
+    # Фоновая задача: func(job) выполняется в пуле потоков и сообщает о ходе работы через
+    # job.report(); сигналы Qt доставляют прогресс и результат в GUI-поток
+    def __init__(self, title, func):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.title = title
+        self.func = func
+        self.signals = _JobSignals()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        # Точка отмены внутри функции задачи
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def report(self, done, total=0, stage=""):
+        # Прогресс задачи; заодно точка отмены, поэтому годится как callback для долгих операций
+        self.check()
+        self.signals.progress.emit(int(done), int(total), stage)
+
+    def run(self):
+        try:
+            self.check()
+            with span("job", title=self.title), profiler.thread_profile():
+                result = self.func(self)
+            self.check()  # Отменённая во время работы задача не отдаёт результат
+        except JobCancelled:
+            tracer.event("job.cancelled", title=self.title)
+            self.signals.cancelled.emit()
+        except Exception as e:
+            traceback.print_exc()
+            tracer.event("job.failed", title=self.title, error=str(e))
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+
+
+class JobRunner(QObject):
+    # Очередь фоновых задач с файлами проекта: задачи выполняются по одной, в порядке запуска
+    def __init__(self):
+        super().__init__()
+        self._pool = QThreadPool()
+        self._pool.setMaxThreadCount(1)
+        self._jobs = set()  # Ссылки на задачи до их завершения
+
+    def submit(self, title, func, on_finished=None, on_failed=None, on_progress=None, on_cancelled=None):
+        job = Job(title, func)
+        for signal, slot in ((job.signals.finished, on_finished), (job.signals.failed, on_failed),
+                             (job.signals.progress, on_progress), (job.signals.cancelled, on_cancelled)):
+            if slot:
+                signal.connect(slot)
+        for signal in (job.signals.finished, job.signals.failed, job.signals.cancelled):
+            signal.connect(lambda *args, job=job: self._jobs.discard(job))
+        self._jobs.add(job)
+        self._pool.start(job)
+        return job
+
+    def is_busy(self):
+        return bool(self._jobs)
+
+    def cancel_all(self):
+        # Отмена выполняющейся и ожидающих задач
+        for job in list(self._jobs):
+            job.cancel()
+
+    def wait(self):
+        # Ожидание завершения всех задач (при закрытии окна)
+        self._pool.waitForDone()
\ No newline at end of file
@@ -0,0 +1,259 @@
+import json
+import os
+from contextlib import contextmanager
+from project_store import ProjectStore
+from tree_logic import PERSON_FIELDS, trash_path
+
+
+def make_entry(tree, event, args):
+    # Запись журнала для события древа: ["add", id, поля], ["edit", id, новые поля, старые поля],
+    # ["remove", id, поля], ["link"/"unlink", родитель, ребёнок]
+    if event == "add":
+        person = tree.people[args[0]]
+        return ["add", args[0], {field: person[field] for field in PERSON_FIELDS}]
+    if event == "edit":
+        person = tree.people[args[0]]
+        return ["edit", args[0], {field: person[field] for field in PERSON_FIELDS}, args[1]]
+    if event == "remove":
+        return ["remove", args[0], {field: args[1][field] for field in PERSON_FIELDS}]
+    return [event, args[0], args[1]]
+
+
+def invert_entry(entry):
+    # Запись, отменяющая entry
+    kind = entry[0]
+    if kind == "add":
+        return ["remove", entry[1], entry[2]]
+    if kind == "edit":
+        return ["edit", entry[1], entry[3], entry[2]]
+    if kind == "remove":
+        data = entry[2]
+        if data["image_path"] and not os.path.exists(data["image_path"]):
+            # При удалении изображение перенесено в корзину; add_person скопирует его обратно
+            trashed = trash_path(data["image_path"])
+            data = dict(data, image_path=trashed if os.path.exists(trashed) else "")
+        return ["add", entry[1], data]
+    return ["unlink" if kind == "link" else "link", entry[1], entry[2]]
+
+
+def apply_entry(tree, entry):
+    # Повтор записи журнала на древе (с обычными уведомлениями подписчиков)
+    kind = entry[0]
+    if kind == "add":
+        tree.add_person(entry[2], person_id=entry[1])
+    elif kind == "edit":
+        tree.edit_person(entry[1], entry[2])
+    elif kind == "remove":
+        tree.remove_person(entry[1])
+    elif kind == "link":
+        tree.link_parent_child(entry[1], entry[2])
+    elif kind == "unlink":
+        tree.unlink(entry[1], entry[2])
+
+
+class Journal:
+    # Автосохранение: каждое изменение древа дописывается строкой в journal.jsonl (O(изменения)),
+    # периодически журнал сворачивается в снимок — файл проекта SQLite, который сам пишет только
+    # изменённые строки. Номер последней записи в снимке позволяет повторить журнал после сбоя,
+    # даже если сбой случился между записью снимка и очисткой журнала.
+    def __init__(self, directory="autosave", compact_every=1000):
+        self.directory = directory
+        self.compact_every = compact_every
+        self.journal_path = os.path.join(directory, "journal.jsonl")
+        self.lock_path = os.path.join(directory, "session.lock")
+        self.snapshot = ProjectStore(os.path.join(directory, "snapshot.mdrevo"))
+        self.tree = None
+        self.seq = 0
+        self._file = None
+        self._pending = 0  # Записей после последнего снимка
+        self._recovered = False
+        # (путь, номер записи, id словаря персон) снимка для древа, которое заменит текущее;
+        # adopt переносит сам словарь, поэтому по нему видно, что заменило древо именно оно
+        self._prepared = None
+
+    def has_unfinished_session(self):
+        # Прошлый сеанс завершился без close(): в журнале и снимке могут быть несохранённые изменения
+        return os.path.exists(self.lock_path) and (
+            os.path.exists(self.snapshot.path) or os.path.exists(self.journal_path))
+
+    def recover(self, tree):
+        # Восстановление древа прошлого сеанса: снимок и повтор журнала после него.
+        # Возвращает число повторённых записей.
+        self.seq = 0
+        if os.path.exists(self.snapshot.path):
+            self.snapshot.load(tree)
+            self.seq = int(self.snapshot.meta.get("journal_seq", 0))
+        replayed = 0
+        self._recovered = True
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f, tree.batch():
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # Строка, не дописанная до конца в момент сбоя
+                    if record[0] <= self.seq:
+                        continue
+                    apply_entry(tree, record[1:])
+                    self.seq = record[0]
+                    replayed += 1
+        return replayed
+
+    def discard(self):
+        # Отказ от восстановления: файлы прошлого сеанса удаляются
+        self.snapshot.detach()
+        for path in (self.journal_path, self.snapshot.path, self.snapshot.path + "-wal",
+                     self.snapshot.path + "-shm", self.lock_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.seq = 0
+        self.snapshot.meta = {}
+
+    def start(self, tree):
+        # Начало записи изменений древа; после recover() продолжает ту же нумерацию,
+        # иначе файлы прошлого сеанса удаляются
+        if not self._recovered:
+            self.discard()
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, "w", encoding="utf-8") as f:
+            f.write(str(os.getpid()))
+        self.tree = tree
+        if self.snapshot.tree is not tree:
+            self.snapshot.attach(tree)
+        self._file = open(self.journal_path, "a", encoding="utf-8")
+        self._pending = self.seq - int(self.snapshot.meta.get("journal_seq", 0))
+        tree.subscribe(self._on_tree_changed)
+
+    def prepare_snapshot(self, tree):
+        # Снимок древа, которое заменит текущее через FamilyTree.adopt: пишется в фоновом потоке
+        # вместе с построением древа, поэтому сама замена не тратит время на полный снимок
+        path = self.snapshot.path + ".new"
+        if os.path.exists(path):
+            os.remove(path)
+        store = ProjectStore(path)
+        store.attach(tree)
+        store.save(meta={"journal_seq": self.seq})
+        store.detach()
+        self._prepared = (path, self.seq, id(tree.people))
+
+    def _on_tree_changed(self, event, *args):
+        if event == "reset":
+            # Древо заменено целиком: журнал не выражает это дешевле снимка
+            prepared, self._prepared = self._prepared, None
+            if prepared and prepared[1] == self.seq and prepared[2] == id(self.tree.people):
+                self._use_prepared(prepared[0])
+            else:
+                # Снимок древа, которое так и не заменило текущее (задача отменена или не удалась)
+                if prepared and os.path.exists(prepared[0]):
+                    os.remove(prepared[0])
+                self.compact()
+            return
+        self.seq += 1
+        self._file.write(json.dumps([self.seq] + make_entry(self.tree, event, args), ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._pending += 1
+        if self._pending >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        # Запись накопленных изменений в снимок и очистка журнала
+        self.snapshot.save(meta={"journal_seq": self.seq})
+        self._file.close()
+        self._file = open(self.journal_path, "w", encoding="utf-8")
+        self._pending = 0
+
+    def _use_prepared(self, path):
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(self.snapshot.path + suffix):
+                os.remove(self.snapshot.path + suffix)
+        os.replace(path, self.snapshot.path)
+        self.snapshot.meta = {"journal_seq": self.seq}
+        self.snapshot.mark_clean()
+        self._file.close()
+        self._file = open(self.journal_path, "w", encoding="utf-8")
+        self._pending = 0
+
+    def close(self):
+        # Штатное завершение: несохранённые пользователем изменения не восстанавливаются
+        if self.tree is not None:
+            self.tree.unsubscribe(self._on_tree_changed)
+            self.tree = None
+        if self._file:
+            self._file.close()
+            self._file = None
+        self.discard()
+
+
+class History:
+    # Отмена и повтор действий на записях того же формата, что и журнал. Действие — группа
+    # событий внутри action() (например, удаление персоны вместе с её связями) или одно событие.
+    def __init__(self, tree, limit=200):
+        self.tree = tree
+        self.limit = limit
+        self._undo = []
+        self._redo = []
+        self._current = None  # Записи открытого действия
+        self._depth = 0
+        self._replaying = None  # "undo" или "redo" во время повтора
+        tree.subscribe(self._on_tree_changed)
+
+    @contextmanager
+    def action(self):
+        self._depth += 1
+        if self._depth == 1:
+            self._current = []
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                if self._current:
+                    self._push(self._current)
+                self._current = None
+
+    def _on_tree_changed(self, event, *args):
+        if event == "reset":
+            self._undo.clear()
+            self._redo.clear()
+            return
+        entry = make_entry(self.tree, event, args)
+        if self._current is not None:
+            self._current.append(entry)
+        else:
+            self._push([entry])
+
+    def _push(self, entries):
+        if self._replaying == "undo":
+            self._redo.append(entries)
+            return
+        self._undo.append(entries)
+        if len(self._undo) > self.limit:
+            del self._undo[0]
+        if self._replaying is None:
+            self._redo.clear()
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo(self):
+        return self._replay(self._undo, "undo")
+
+    def redo(self):
+        return self._replay(self._redo, "redo")
+
+    def _replay(self, stack, mode):
+        # Обратные записи в обратном порядке; вызванные ими события образуют действие для другого стека
+        if not stack:
+            return False
+        entries = stack.pop()
+        self._replaying = mode
+        try:
+            with self.action(), self.tree.batch():
+                for entry in reversed(entries):
+                    apply_entry(self.tree, invert_entry(entry))
+        finally:
+            self._replaying = None
+        return True
\ No newline at end of file
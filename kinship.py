@@ -0,0 +1,244 @@
+from collections import OrderedDict
+
+# Корни степени родства: «двоюродный», «троюродный», … «десятиюродный»
+DEGREE_ROOTS = {2: "двою", 3: "трою", 4: "четверою", 5: "пятию", 6: "шестию", 7: "семию", 8: "восьмию",
+                9: "девятию", 10: "десятию"}
+# Слова родства: (мужской род, женский род)
+WORDS = {
+    "self": ("тот же человек", "тот же человек"),
+    "parent": ("отец", "мать"),
+    "child": ("сын", "дочь"),
+    "grandparent": ("дед", "бабушка"),
+    "grandchild": ("внук", "внучка"),
+    "sibling": ("брат", "сестра"),
+    "uncle": ("дядя", "тётя"),
+    "nephew": ("племянник", "племянница"),
+    "spouse": ("супруг", "супруга"),
+}
+MALE_PATRONYMIC_ENDINGS = ("вич", "ич", "оглы")
+FEMALE_PATRONYMIC_ENDINGS = ("вна", "чна", "шна", "кызы")
+MALE_SURNAME_ENDINGS = ("ов", "ев", "ёв", "ин", "ын", "ский", "цкий", "ой")
+FEMALE_SURNAME_ENDINGS = ("ова", "ева", "ёва", "ина", "ына", "ская", "цкая", "ая")
+
+
+def guess_sex(person):
+    # Пол для названия родства по отчеству, затем по фамилии: "M", "F" или None.
+    # Отдельного поля пола в древе нет, а русские отчества и фамилии его почти всегда выдают.
+    patronymic = person["patronymic"].strip().lower()
+    if patronymic.endswith(FEMALE_PATRONYMIC_ENDINGS):
+        return "F"
+    if patronymic.endswith(MALE_PATRONYMIC_ENDINGS):
+        return "M"
+    surname = person["surname"].strip().lower()
+    if surname.endswith(FEMALE_SURNAME_ENDINGS):
+        return "F"
+    if surname.endswith(MALE_SURNAME_ENDINGS):
+        return "M"
+    return None
+
+
+def _degree(n, sex):
+    # «двоюродный» для n = 2, «троюродный» для 3 и т. д.
+    ending = "ая" if sex == "F" else "ый"
+    root = DEGREE_ROOTS.get(n)
+    return f"{root}родн{ending}" if root else f"{n}-юродн{ending}"
+
+
+def _word(key, sex):
+    return WORDS[key][1 if sex == "F" else 0]
+
+
+SIBLING_KINDS = {"full": "родн", "paternal": "единокровн", "maternal": "единоутробн", "half": "неполнородн"}
+
+
+def kinship_name(up, down, sex=None, siblings=None):
+    # Название родства второй персоны для первой: up — поколений от первой персоны до общего
+    # предка, down — от второй. sex — пол второй персоны ("M", "F" или None — обе формы).
+    # siblings — для братьев и сестёр: "full" (оба родителя общие), "paternal"/"maternal"
+    # (общий только отец/мать), "half" (один общий родитель неизвестного пола) или None.
+    if sex is None:
+        male = kinship_name(up, down, "M", siblings)
+        female = kinship_name(up, down, "F", siblings)
+        return male if male == female else f"{male} или {female}"
+    pra = "пра" * max(0, abs(up - down) - 2)
+    if up == 0 and down == 0:
+        return _word("self", sex)
+    if up == 0:
+        if down == 1:
+            return _word("child", sex)
+        return "пра" * (down - 2) + _word("grandchild", sex)
+    if down == 0:
+        if up == 1:
+            return _word("parent", sex)
+        return "пра" * (up - 2) + _word("grandparent", sex)
+    n = min(up, down)
+    shift = down - up
+    cousin = f"{_degree(n, sex)} " if n >= 2 else ""
+    if shift == 0:
+        if n == 1:
+            if siblings not in SIBLING_KINDS:
+                return _word("sibling", sex)
+            ending = "ая" if sex == "F" else ("ой" if siblings == "full" else "ый")
+            return f"{SIBLING_KINDS[siblings]}{ending} {_word('sibling', sex)}"
+        return cousin + _word("sibling", sex)
+    if shift == 1:
+        return cousin + _word("nephew", sex)
+    if shift == -1:
+        return cousin + _word("uncle", sex)
+    if shift > 0:
+        # Внуки братьев и сестёр: внучатый, правнучатый племянник
+        grand = "внучатая" if sex == "F" else "внучатый"
+        return f"{cousin}{pra}{grand} {_word('nephew', sex)}"
+    # Братья и сёстры дедов: двоюродный дед, двоюродный прадед; для их двоюродных — троюродный
+    return f"{_degree(n + 1, sex)} {pra}{_word('grandparent', sex)}"
+
+
+class Kinship:
+    # Расчёт родства двух персон: двунаправленный поиск в ширину вверх по предкам обеих персон
+    # останавливается, как только более близкий общий предок невозможен, поэтому для близкой
+    # родни обходятся лишь несколько поколений даже в очень больших древах. Результаты и полные
+    # наборы предков (для матрицы родства) кэшируются до изменения связей древа.
+    def __init__(self, tree, cache_size=4096):
+        self.tree = tree
+        self.cache_size = cache_size
+        self._results = OrderedDict()  # (id, id) -> результат relationship
+        self._ancestors = OrderedDict()  # id -> {предок: поколений вверх}
+        tree.subscribe(self._on_tree_changed)
+
+    def _on_tree_changed(self, event, *args):
+        # Правка данных может изменить только пол (название), состав связей — всё остальное
+        if event != "add":
+            self._results.clear()
+        if event in ("link", "unlink", "remove", "reset"):
+            self._ancestors.clear()
+
+    def _remember(self, cache, key, value):
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return value
+
+    def ancestors(self, person_id):
+        # {предок: наименьшее число поколений вверх}, включая саму персону с 0. При пересечении
+        # линий (pedigree collapse) предок учитывается один раз по кратчайшему пути.
+        cached = self._ancestors.get(person_id)
+        if cached is not None:
+            self._ancestors.move_to_end(person_id)
+            return cached
+        people = self.tree.people
+        depths = {person_id: 0}
+        frontier = [person_id]
+        depth = 0
+        while frontier:
+            depth += 1
+            next_frontier = []
+            for current in frontier:
+                for parent_id in people[current]["parents"]:
+                    if parent_id not in depths:
+                        depths[parent_id] = depth
+                        next_frontier.append(parent_id)
+            frontier = next_frontier
+        return self._remember(self._ancestors, person_id, depths)
+
+    def _closest_common(self, first_id, second_id):
+        # Ближайшие общие предки: ({предок: (вверх от первой, вверх от второй)}, наименьшая сумма).
+        # Поиск идёт уровнями с той стороны, где фронт меньше; новый общий предок не может быть
+        # ближе, чем следующий уровень незавершённой стороны, и поиск останавливается.
+        people = self.tree.people
+        sides = [{first_id: 0}, {second_id: 0}]
+        frontiers = [[first_id], [second_id]]
+        levels = [0, 0]
+        found = {}
+        best = None
+        if first_id == second_id:
+            return {first_id: (0, 0)}, 0
+        while True:
+            bound = min((levels[side] + 1 for side in (0, 1) if frontiers[side]), default=None)
+            if bound is None or (best is not None and bound > best):
+                break
+            # Расширяется отстающая сторона (при равенстве — с меньшим фронтом): так растёт граница
+            side = min((side for side in (0, 1) if frontiers[side]),
+                       key=lambda side: (levels[side], len(frontiers[side])))
+            depths, other = sides[side], sides[1 - side]
+            levels[side] += 1
+            next_frontier = []
+            for current in frontiers[side]:
+                for parent_id in people[current]["parents"]:
+                    if parent_id in depths:
+                        continue
+                    depths[parent_id] = levels[side]
+                    next_frontier.append(parent_id)
+            frontiers[side] = next_frontier
+            # Встречи: новые предки этой стороны, уже известные другой
+            for person_id in next_frontier:
+                if person_id in other:
+                    pair = (sides[0][person_id], sides[1][person_id])
+                    total = pair[0] + pair[1]
+                    if best is None or total < best:
+                        best = total
+                        found = {}
+                    if total == best:
+                        found[person_id] = pair
+        return found, best
+
+    def _describe(self, first_id, second_id, common, total):
+        # Результат по найденным ближайшим общим предкам
+        people = self.tree.people
+        second = people[second_id]
+        if not common:
+            # Общих предков нет; общие дети — значит, супруги
+            name = "не родственники"
+            if not set(people[first_id]["children"]).isdisjoint(second["children"]):
+                sex = guess_sex(second)
+                name = _word("spouse", sex) if sex else "супруг или супруга"
+            return {"name": name, "ancestors": [], "up": None, "down": None}
+        # Из равноудалённых вариантов (при пересечении линий) выбирается более «прямой»
+        up, down = min(common.values(), key=lambda pair: abs(pair[0] - pair[1]))
+        ancestors = sorted(person_id for person_id, pair in common.items() if pair == (up, down))
+        siblings = None
+        if up == 1 and down == 1:
+            if len(ancestors) >= 2:
+                siblings = "full"
+            elif len(people[first_id]["parents"]) > 1 or len(second["parents"]) > 1:
+                # Один общий родитель при известном втором: неполнородные
+                siblings = {"M": "paternal", "F": "maternal"}.get(guess_sex(people[ancestors[0]]), "half")
+        return {"name": kinship_name(up, down, guess_sex(second), siblings), "ancestors": ancestors,
+                "up": up, "down": down}
+
+    def relationship(self, first_id, second_id):
+        # Кем вторая персона приходится первой: {"name": название, "ancestors": ближайшие общие
+        # предки, "up": поколений от первой до них, "down": от второй}
+        key = (first_id, second_id)
+        cached = self._results.get(key)
+        if cached is not None:
+            return cached
+        if first_id not in self.tree.people or second_id not in self.tree.people:
+            raise ValueError("Персона не найдена")
+        common, total = self._closest_common(first_id, second_id)
+        return self._remember(self._results, key, self._describe(first_id, second_id, common, total))
+
+    def matrix(self, person_ids):
+        # Матрица родства группы: matrix[i][j] — кем person_ids[j] приходится person_ids[i].
+        # Предки каждой персоны собираются один раз, пары сравниваются пересечением наборов.
+        maps = [self.ancestors(person_id) for person_id in person_ids]
+        rows = []
+        for i, first_id in enumerate(person_ids):
+            row = []
+            for j, second_id in enumerate(person_ids):
+                first, second = maps[i], maps[j]
+                small, large = (first, second) if len(first) <= len(second) else (second, first)
+                best = None
+                common = {}
+                for person_id, depth in small.items():
+                    other = large.get(person_id)
+                    if other is None:
+                        continue
+                    total = depth + other
+                    if best is None or total < best:
+                        best = total
+                        common = {}
+                    if total == best:
+                        common[person_id] = (first[person_id], second[person_id])
+                row.append(self._describe(first_id, second_id, common, best))
+            rows.append(row)
+        return rows
\ No newline at end of file
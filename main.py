@@ -1,9 +1,15 @@
 import sys
-from PyQt5.QtWidgets import QApplication
-from ui import GenealogyApp
-from tree_logic import FamilyTree
 
 if __name__ == "__main__":
+    # Команды командной строки (convert, stats, validate, export) выполняются без запуска GUI и PyQt5
+    if len(sys.argv) > 1 and not sys.argv[1].startswith("-"):
+        from matsdrevo import main
+        sys.exit(main())
+
+    from PyQt5.QtWidgets import QApplication
+    from ui import GenealogyApp
+    from tree_logic import FamilyTree
+
     app = QApplication(sys.argv)
 
     # Инициализация модели данных
@@ -0,0 +1,280 @@
+import argparse
+import json
+import os
+import sys
+from dates import DATE_FIELDS, DAYS_PER_YEAR, MAX_DAY, MIN_DAY
+from gedcom_handler import GedcomHandler
+from graph_analysis import collect_relatives, find_back_edges
+from project_store import ProjectStore, PROJECT_EXTENSION
+from stats import FamilyStats
+from tree_logic import FamilyTree
+
+# Командная строка MatsDrevo без графического интерфейса (PyQt5 не импортируется):
+#   python matsdrevo.py convert древо.ged -o древо.mdrevo
+#   python matsdrevo.py convert архив/ --to .ged.gz --output-dir выгрузка/ --jobs 8
+#   python matsdrevo.py stats архив/ > статистика.jsonl
+#   python matsdrevo.py validate древо.mdrevo
+#   python matsdrevo.py export древо.mdrevo <ID персоны> -o ветвь.ged --ancestors
+# Каталоги обрабатываются по файлам параллельно в пуле процессов; результат по каждому
+# файлу — строка JSON на stdout. Код выхода: 0 — успешно, 1 — найдены ошибки данных, 2 — сбой.
+
+FORMATS = {".ged": "gedcom", ".ged.gz": "gedcom", ".json": "json", PROJECT_EXTENSION: "project"}
+
+
+def file_format(path):
+    # Формат файла по расширению: "gedcom", "json" или "project"
+    lower = path.lower()
+    for extension in sorted(FORMATS, key=len, reverse=True):
+        if lower.endswith(extension):
+            return FORMATS[extension]
+    raise ValueError(f"Неизвестный формат файла: {path}")
+
+
+def strip_extension(path):
+    lower = path.lower()
+    for extension in sorted(FORMATS, key=len, reverse=True):
+        if lower.endswith(extension):
+            return path[:-len(extension)]
+    return os.path.splitext(path)[0]
+
+
+def load_tree(path, compact=False):
+    # Древо из файла GEDCOM, JSON или проекта; пути изображений остаются как в файле
+    tree = FamilyTree(compact=compact, copy_images=False)
+    kind = file_format(path)
+    if kind == "gedcom":
+        GedcomHandler(tree).import_gedcom(path)
+    elif kind == "json":
+        with open(path, "r", encoding="utf-8") as f:
+            tree.load_people(json.load(f))
+    else:
+        ProjectStore(path).read(tree)
+    return tree
+
+
+def save_tree(tree, path, person_ids=None):
+    # Запись древа (или набора персон person_ids) в файл формата по расширению
+    kind = file_format(path)
+    if kind == "gedcom":
+        GedcomHandler(tree).export_gedcom(path, person_ids)
+        return
+    people = tree.to_dict()
+    if person_ids is not None:
+        # Связи за пределы набора не сохраняются
+        people = {person_id: dict(people[person_id],
+                                  parents=[pid for pid in people[person_id]["parents"] if pid in person_ids],
+                                  children=[cid for cid in people[person_id]["children"] if cid in person_ids])
+                  for person_id in person_ids}
+    temp_path = path + ".tmp"
+    if kind == "json":
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(people, f, ensure_ascii=False)
+    else:
+        subset = FamilyTree(compact=tree.compact)
+        subset.load_people(people)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        store = ProjectStore(temp_path)
+        store.attach(subset)
+        store.save()
+        store.detach()
+    os.replace(temp_path, path)
+
+
+def tree_statistics(tree):
+    # Статистика древа для JSON: сводка вкладки «Статистика» и, при наличии numpy, демография
+    from demographics import TreeArrays, compute, np
+    stats = FamilyStats(tree)
+    result = stats.get_statistics()
+    if np is not None:
+        result["demographics"] = compute(TreeArrays(tree, stats.levels()))
+        del result["demographics"]["revision"]  # Внутренний счётчик правок, вне приложения не имеет смысла
+    return result
+
+
+def _dated(date):
+    # Дата с обеими известными границами годится для сравнения возрастов
+    return date is not None and date.low != MIN_DAY and date.high != MAX_DAY
+
+
+def validate_tree(tree):
+    # Ошибки данных: [{"person": ID, "problem": описание}] — неразборчивые даты, смерть раньше
+    # рождения, невероятные возраст и возраст родителя, больше двух родителей, циклы в связях
+    from demographics import MAX_LIFESPAN, MAX_PARENT_AGE, MIN_PARENT_AGE
+    people = tree.people
+    births = tree.dates["birth_date"]
+    deaths = tree.dates["death_date"]
+    issues = []
+    for person_id, person in people.items():
+        if not person["surname"] and not person["name"]:
+            issues.append({"person": person_id, "problem": "не указаны фамилия и имя"})
+        for field in DATE_FIELDS:
+            if person[field] and person_id not in tree.dates[field]:
+                issues.append({"person": person_id, "problem": f"неразборчивая дата {field}: {person[field]}"})
+        birth = births.get(person_id)
+        death = deaths.get(person_id)
+        if birth is not None and death is not None:
+            if death.high < birth.low:
+                issues.append({"person": person_id, "problem": "дата смерти раньше даты рождения"})
+            elif _dated(birth) and _dated(death) and (death.key - birth.key) / DAYS_PER_YEAR > MAX_LIFESPAN:
+                issues.append({"person": person_id, "problem": f"продолжительность жизни больше {MAX_LIFESPAN} лет"})
+        if len(person["parents"]) > 2:
+            issues.append({"person": person_id, "problem": f"родителей: {len(person['parents'])}"})
+        if _dated(birth):
+            for parent_id in person["parents"]:
+                parent_birth = births.get(parent_id)
+                if not _dated(parent_birth):
+                    continue
+                age = (birth.key - parent_birth.key) / DAYS_PER_YEAR
+                if not MIN_PARENT_AGE <= age <= MAX_PARENT_AGE:
+                    issues.append({"person": person_id,
+                                   "problem": f"возраст родителя {parent_id} при рождении: {int(age)}"})
+    for parent_id, child_id in find_back_edges(people):
+        issues.append({"person": child_id, "problem": f"связь с родителем {parent_id} замыкает цикл"})
+    return issues
+
+
+def _run_file(command, path, options):
+    # Обработка одного файла (в процессе пула); результат — словарь для строки JSON
+    result = {"file": path}
+    try:
+        tree = load_tree(path, options["compact"])
+        result["persons"] = len(tree.people)
+        if command == "convert":
+            target = options["output"] or os.path.join(
+                options["output_dir"] or os.path.dirname(path), os.path.basename(strip_extension(path)) + options["to"])
+            if os.path.abspath(target) == os.path.abspath(path):
+                raise ValueError("Файл результата совпадает с исходным")
+            save_tree(tree, target)
+            result["output"] = target
+        elif command == "stats":
+            result["statistics"] = tree_statistics(tree)
+        elif command == "validate":
+            issues = validate_tree(tree)
+            result["issue_count"] = len(issues)
+            result["issues"] = issues
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def expand_inputs(inputs):
+    # Файлы известных форматов: сами файлы и содержимое каталогов (без подкаталогов), по имени
+    paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                full_path = os.path.join(path, name)
+                if os.path.isfile(full_path):
+                    try:
+                        file_format(name)
+                    except ValueError:
+                        continue
+                    paths.append(full_path)
+        else:
+            paths.append(path)
+    return paths
+
+
+def run_batch(command, paths, options, workers=None):
+    # Результаты по файлам в порядке входных файлов; несколько файлов — в пуле процессов
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        for path in paths:
+            yield _run_file(command, path, options)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(_run_file, command, path, options) for path in paths]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            # Результаты больше не нужны (например, закрыт вывод): ожидающие файлы не обрабатываются
+            for future in futures:
+                future.cancel()
+
+
+def export_subtree(args):
+    # Выгрузка персоны с потомками и/или предками в отдельный файл
+    tree = load_tree(args.input, args.compact)
+    if args.person not in tree.people:
+        raise ValueError(f"Персона не найдена: {args.person}")
+    person_ids = collect_relatives(tree.people, args.person, descendants=not args.no_descendants,
+                                   ancestors=args.ancestors)
+    save_tree(tree, args.output, person_ids)
+    return {"file": args.input, "output": args.output, "persons": len(person_ids)}
+
+
+def _silence_stdout():
+    # Читатель вывода закрыл канал (например, `| head`): stdout перенаправляется в devnull,
+    # чтобы при выходе Python не сообщал об ошибке записи
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="matsdrevo", description="MatsDrevo без графического интерфейса")
+    parser.add_argument("--compact", action="store_true", help="Компактное хранение персон (большие древа)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser("convert", help="Преобразование между GEDCOM, JSON и проектом")
+    convert.add_argument("inputs", nargs="+", help="Файлы или каталоги")
+    target = convert.add_mutually_exclusive_group(required=True)
+    target.add_argument("-o", "--output", help="Файл результата (для одного входного файла)")
+    target.add_argument("--to", choices=sorted(FORMATS), help="Формат результатов для нескольких файлов")
+    convert.add_argument("--output-dir", help="Каталог результатов (по умолчанию — рядом с исходными)")
+    convert.add_argument("--jobs", type=int, help="Число процессов (по умолчанию — по числу ядер)")
+
+    for name, description in (("stats", "Статистика в JSON"), ("validate", "Проверка данных")):
+        command = commands.add_parser(name, help=description)
+        command.add_argument("inputs", nargs="+", help="Файлы или каталоги")
+        command.add_argument("--jobs", type=int, help="Число процессов (по умолчанию — по числу ядер)")
+
+    export = commands.add_parser("export", help="Выгрузка ветви древа")
+    export.add_argument("input", help="Исходный файл")
+    export.add_argument("person", help="ID персоны")
+    export.add_argument("-o", "--output", required=True, help="Файл результата")
+    export.add_argument("--ancestors", action="store_true", help="Включить предков")
+    export.add_argument("--no-descendants", action="store_true", help="Не включать потомков")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "export":
+            print(json.dumps(export_subtree(args), ensure_ascii=False), flush=True)
+            return 0
+        paths = expand_inputs(args.inputs)
+        if not paths:
+            raise ValueError("Нет входных файлов")
+        options = {"compact": args.compact, "output": None, "output_dir": None, "to": None}
+        if args.command == "convert":
+            if args.output:
+                if len(paths) > 1:
+                    raise ValueError("--output задаётся только для одного входного файла, для нескольких — --to")
+                file_format(args.output)
+            if args.output_dir:
+                os.makedirs(args.output_dir, exist_ok=True)
+            options.update(output=args.output, output_dir=args.output_dir, to=args.to)
+    except BrokenPipeError:
+        _silence_stdout()
+        return 0
+    except Exception as e:
+        print(f"matsdrevo: {e}", file=sys.stderr)
+        return 2
+
+    status = 0
+    results = run_batch(args.command, paths, options, args.jobs)
+    try:
+        for result in results:
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+            if "error" in result:
+                status = 2
+            elif result.get("issue_count") and status == 0:
+                status = 1
+    except BrokenPipeError:
+        results.close()
+        _silence_stdout()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,128 @@
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+from dates import DATE_FIELDS, MAX_DAY
+
+COLUMNS = (
+    ("ID", None),
+    ("Фамилия", "surname"),
+    ("Имя", "name"),
+    ("Отчество", "patronymic"),
+    ("Дата рождения", "birth_date"),
+    ("Дата смерти", "death_date"),
+    ("Место рождения", "birth_place"),
+    ("Место смерти", "death_place"),
+    ("Заметки", "notes"),
+)
+SORT_ROLE = Qt.UserRole  # Значение для сортировки: день для дат, иначе отображаемая строка
+BATCH_ROW_EVENTS = 100  # Больше изменений в пакете древа — вместо сигналов по строкам один сброс модели
+REBUILD_SHIFT = 1000  # После стольких удалений словарь строк строится заново
+
+
+class PersonsModel(QAbstractTableModel):
+    # Таблица персон поверх FamilyTree без копирования данных: строки читаются из древа
+    # по запросу представления, изменения древа превращаются в сигналы для одной строки
+    def __init__(self, tree):
+        super().__init__()
+        self.tree = tree
+        self._ids = []  # Строка -> ID персоны
+        self._rows = {}  # ID -> строка; после удалений строка могла сдвинуться вверх не больше чем на _shift
+        self._shift = 0
+        self._load()
+        self._batch_events = []  # События открытого пакета древа; None — модель будет сброшена
+        tree.subscribe(self._on_tree_changed)
+        tree.subscribe_batch(self._on_batch_finished)
+
+    def person_id(self, row):
+        return self._ids[row]
+
+    def _load(self):
+        self._ids = list(self.tree.people)
+        self._rows = dict(zip(self._ids, range(len(self._ids))))
+        self._shift = 0
+
+    def row_of(self, person_id):
+        row = self._rows[person_id]
+        if row >= len(self._ids) or self._ids[row] != person_id:
+            # Поиск только в пределах возможного сдвига, а не по всему списку
+            row = self._ids.index(person_id, max(row - self._shift, 0), row + 1)
+            self._rows[person_id] = row
+        return row
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._ids)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role not in (Qt.DisplayRole, SORT_ROLE) or not index.isValid():
+            return None
+        person_id = self._ids[index.row()]
+        field = COLUMNS[index.column()][1]
+        if role == SORT_ROLE and field in DATE_FIELDS:
+            # Неизвестные и неразборчивые даты — в конце списка
+            date = self.tree.dates[field].get(person_id)
+            return date.key if date is not None else MAX_DAY
+        return self.tree.people[person_id][field] if field else person_id
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return COLUMNS[section][0]
+        return section + 1
+
+    def _on_tree_changed(self, event, *args):
+        if self.tree.in_batch:
+            # Изменения пакета применяются в конце: тысячи вставок строк дороже одного сброса
+            if self._batch_events is not None:
+                self._batch_events.append((event, args))
+                if len(self._batch_events) > BATCH_ROW_EVENTS:
+                    self._batch_events = None
+            return
+        self._apply(event, args)
+
+    def _on_batch_finished(self):
+        events, self._batch_events = self._batch_events, []
+        if events is None:
+            self._apply("reset", ())
+            return
+        removed = []  # Подряд идущие удаления применяются вместе
+        for event, args in events:
+            if event == "remove":
+                removed.append(args[0])
+                continue
+            if removed:
+                self._remove_rows(removed)
+                removed = []
+            self._apply(event, args)
+        if removed:
+            self._remove_rows(removed)
+
+    def _remove_rows(self, person_ids):
+        # Строки удаляются с конца: номера, найденные до первого удаления, остаются верными
+        for row in sorted((self.row_of(person_id) for person_id in person_ids), reverse=True):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._rows[self._ids.pop(row)]
+            self._shift += 1
+            self.endRemoveRows()
+        if self._shift > REBUILD_SHIFT:
+            self._rows = dict(zip(self._ids, range(len(self._ids))))
+            self._shift = 0
+
+    def _apply(self, event, args):
+        if event == "add":
+            row = len(self._ids)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._ids.append(args[0])
+            self._rows[args[0]] = row
+            self.endInsertRows()
+        elif event == "remove":
+            self._remove_rows([args[0]])
+        elif event == "edit":
+            row = self.row_of(args[0])
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMNS) - 1))
+        elif event == "reset":
+            self.beginResetModel()
+            self._load()
+            self.endResetModel()
+        # Связи родитель-ребёнок в таблице не отображаются
\ No newline at end of file
@@ -0,0 +1,157 @@
+import os
+import sqlite3
+from instrumentation import span
+from tree_logic import PERSON_FIELDS
+
+PROJECT_EXTENSION = ".mdrevo"
+SCHEMA_VERSION = 1
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS persons (id TEXT PRIMARY KEY, {", ".join(f"{field} TEXT" for field in PERSON_FIELDS)})
+    WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS links (parent_id TEXT, child_id TEXT, PRIMARY KEY (parent_id, child_id)) WITHOUT ROWID;
+"""
+INSERT_PERSON = (f"INSERT OR REPLACE INTO persons (id, {', '.join(PERSON_FIELDS)}) "
+                 f"VALUES ({', '.join('?' * (len(PERSON_FIELDS) + 1))})")
+
+
+class ProjectStore:
+    # Файл проекта SQLite (WAL): персоны и связи — строки таблиц. После первого полного сохранения
+    # store следит за событиями древа и при следующем сохранении пишет только изменённые строки.
+    def __init__(self, path):
+        self.path = path
+        self.tree = None
+        self.meta = {}  # Служебные значения из таблицы meta
+        self._full = True  # Файл ещё не соответствует древу целиком
+        self._dirty = set()  # Добавленные или изменённые персоны
+        self._removed = set()
+        self._linked = set()  # (родитель, ребёнок)
+        self._unlinked = set()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA cache_size=-65536")  # 64 МБ страничного кэша для массовой записи
+        connection.executescript(SCHEMA)
+        return connection
+
+    def attach(self, tree):
+        # Отслеживание изменений древа для инкрементного сохранения
+        if self.tree is not None:
+            self.tree.unsubscribe(self._on_tree_changed)
+        self.tree = tree
+        tree.subscribe(self._on_tree_changed)
+
+    def detach(self):
+        if self.tree is not None:
+            self.tree.unsubscribe(self._on_tree_changed)
+            self.tree = None
+
+    def _on_tree_changed(self, event, *args):
+        if event == "add" or event == "edit":
+            self._dirty.add(args[0])
+            self._removed.discard(args[0])
+        elif event == "remove":
+            self._dirty.discard(args[0])
+            self._removed.add(args[0])
+        elif event == "link":
+            self._linked.add(args)
+            self._unlinked.discard(args)
+        elif event == "unlink":
+            self._unlinked.add(args)
+            self._linked.discard(args)
+        elif event == "reset":
+            self._full = True
+
+    def mark_clean(self):
+        # Файл соответствует древу: следующее сохранение пишет только новые изменения
+        self._full = False
+        self._dirty.clear()
+        self._removed.clear()
+        self._linked.clear()
+        self._unlinked.clear()
+
+    def is_modified(self):
+        return self._full or bool(self._dirty or self._removed or self._linked or self._unlinked)
+
+    def mark_modified(self):
+        # Запись не удалась или отменена: следующее сохранение будет полным
+        self._full = True
+
+    def changes(self, meta=None):
+        # Копия изменений для записи: снимается там, где меняется древо (в потоке интерфейса),
+        # write() затем не обращается к древу. Отслеживание изменений начинается заново.
+        people = self.tree.people
+        self.meta.update(meta or {}, schema_version=SCHEMA_VERSION)
+        if self._full:
+            rows = [(person_id,) + tuple(person[field] for field in PERSON_FIELDS)
+                    for person_id, person in people.items()]
+            linked = [(parent_id, child_id) for parent_id, person in people.items() for child_id in person["children"]]
+            changes = {"full": True, "rows": rows, "linked": linked, "removed": [], "unlinked": []}
+        else:
+            rows = [(person_id,) + tuple(people[person_id][field] for field in PERSON_FIELDS)
+                    for person_id in self._dirty if person_id in people]
+            changes = {"full": False, "rows": rows, "linked": list(self._linked),
+                       "removed": [(person_id,) for person_id in self._removed], "unlinked": list(self._unlinked)}
+        changes["meta"] = [(key, str(value)) for key, value in self.meta.items()]
+        self.mark_clean()
+        return changes
+
+    def write(self, changes):
+        # Запись копии изменений в одной транзакции; возвращает число записанных строк
+        with span("project.save", file=os.path.basename(self.path), full=changes["full"]) as info:
+            connection = self._connect()
+            try:
+                with connection:
+                    if changes["full"]:
+                        connection.execute("DELETE FROM persons")
+                        connection.execute("DELETE FROM links")
+                        # Строки по возрастанию ключа: вставка в конец B-дерева вместо случайных мест
+                        connection.executemany(INSERT_PERSON, sorted(changes["rows"]))
+                        connection.executemany("INSERT INTO links VALUES (?, ?)", sorted(changes["linked"]))
+                    else:
+                        connection.executemany(INSERT_PERSON, changes["rows"])
+                        connection.executemany("DELETE FROM persons WHERE id = ?", changes["removed"])
+                        connection.executemany("DELETE FROM links WHERE parent_id = ? AND child_id = ?",
+                                               changes["unlinked"])
+                        connection.executemany("INSERT OR IGNORE INTO links VALUES (?, ?)", changes["linked"])
+                    connection.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", changes["meta"])
+            finally:
+                connection.close()
+            info["rows"] = written = sum(len(changes[key]) for key in ("rows", "linked", "removed", "unlinked"))
+        return written
+
+    def save(self, meta=None):
+        # Запись изменений (и служебных значений meta) в одной транзакции; возвращает число записанных строк
+        changes = self.changes(meta)
+        try:
+            return self.write(changes)
+        except BaseException:
+            self.mark_modified()
+            raise
+
+    def load(self, tree):
+        # Загрузка проекта в древо; затем store следит за древом
+        self.read(tree)
+        self.attach(tree)
+        self.mark_clean()
+
+    def read(self, tree):
+        # Чтение проекта в древо одним проходом по таблицам, без подписки на изменения
+        # (древо может строиться в фоновом потоке и затем заменить содержимое другого древа)
+        if not os.path.exists(self.path):
+            raise ValueError(f"Файл проекта не найден: {self.path}")
+        with span("project.read", file=os.path.basename(self.path)) as info:
+            connection = self._connect()
+            try:
+                self.meta = dict(connection.execute("SELECT key, value FROM meta"))
+                version = int(self.meta.get("schema_version", SCHEMA_VERSION))
+                if version > SCHEMA_VERSION:
+                    raise ValueError(f"Файл создан более новой версией программы (схема {version})")
+                tree.load_rows(connection.execute(f"SELECT id, {', '.join(PERSON_FIELDS)} FROM persons"),
+                               connection.execute("SELECT parent_id, child_id FROM links"))
+            finally:
+                connection.close()
+            info["persons"] = len(tree.people)
\ No newline at end of file
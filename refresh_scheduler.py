@@ -0,0 +1,51 @@
+from PyQt5.QtCore import QTimer
+
+
+class RefreshScheduler:
+    # Отложенное обновление представлений: изменения древа и настроек только помечают
+    # представления устаревшими, а обновление выполняется одно на такт цикла событий, сколько бы
+    # изменений ни пришло до него. Скрытые представления (неактивные вкладки) остаются
+    # помеченными и обновляются при показе; внутри пакета древа (FamilyTree.batch) обновлений нет.
+    def __init__(self, tree):
+        self.tree = tree
+        self._views = []  # [(имя, функция обновления, видимо ли представление)] в порядке обновления
+        self._tree_views = []  # Представления, зависящие от содержимого древа
+        self._dirty = set()
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+        tree.subscribe(self._on_tree_changed)
+        tree.subscribe_batch(self._on_batch_finished)
+
+    def register(self, name, refresh, visible=None, tree_view=True):
+        # visible() — показано ли представление; None — всегда; tree_view — обновлять при изменении древа
+        self._views.append((name, refresh, visible))
+        if tree_view:
+            self._tree_views.append(name)
+
+    def mark(self, *names, delay=0):
+        # Пометка представлений устаревшими. delay (мс) откладывает обновление, и каждый
+        # следующий вызов с delay сдвигает его снова: серия шагов счётчика даёт одну перерисовку.
+        self._dirty.update(names)
+        if self.tree.in_batch:
+            return
+        if delay or not self._timer.isActive():
+            self._timer.start(delay)
+
+    def is_dirty(self, name):
+        return name in self._dirty
+
+    def _on_tree_changed(self, event, *args):
+        self.mark(*self._tree_views)
+
+    def _on_batch_finished(self):
+        if self._dirty and not self._timer.isActive():
+            self._timer.start(0)
+
+    def flush(self):
+        # Обновление помеченных видимых представлений; вызывается таймером и при смене вкладки
+        self._timer.stop()
+        for name, refresh, visible in self._views:
+            if name in self._dirty and (visible is None or visible()):
+                self._dirty.discard(name)
+                refresh()
\ No newline at end of file
@@ -0,0 +1,228 @@
+import heapq
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+SEARCH_FIELDS = ("surname", "name", "patronymic", "birth_place", "death_place", "notes")
+NAME_FIELDS = ("surname", "name", "patronymic")
+
+TRANSLIT = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh", "з": "z",
+    "и": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh",
+    "щ": "shch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "iu", "я": "ia",
+    "і": "i", "ї": "i", "є": "e", "ґ": "g", "ѣ": "e", "ѳ": "f", "ѵ": "i",
+})
+# Латинские написания одних и тех же звуков, которые встречаются в запросах и документах
+LATIN_FOLDS = (("ya", "ia"), ("yu", "iu"), ("yo", "e"), ("j", "i"), ("w", "v"), ("x", "ks"))
+WORD_RE = re.compile(r"\w+")
+
+EXACT_WEIGHT = 1.0
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.6  # За одну правку; каждая следующая снижает вес на 0.2
+
+
+def normalize(text):
+    # Ключи поиска для текста: регистр и ё/е сводятся, кириллица транслитерируется,
+    # поэтому «Ёлкин», «елкин» и «Yolkin» дают один и тот же ключ
+    text = text.casefold().replace("ё", "е").translate(TRANSLIT)
+    for source, target in LATIN_FOLDS:
+        text = text.replace(source, target)
+    return WORD_RE.findall(text)
+
+
+def trigrams(token):
+    # Триграммы слова с границами, чтобы начало и конец весили больше середины
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    # Расстояние Дамерау–Левенштейна (с перестановкой соседних букв) или limit + 1,
+    # если оно больше limit: строки матрицы, где все значения больше limit, обрывают расчёт
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def max_edits(term):
+    # Допустимое число опечаток в слове запроса
+    if len(term) < 4:
+        return 0
+    return 1 if len(term) <= 6 else 2
+
+
+class SearchIndex:
+    # Инвертированный индекс персон: ключ слова -> ID персон, триграмма -> ключи слов.
+    # Обновляется по событиям древа, поэтому правка одной персоны затрагивает только её слова;
+    # после загрузки древа целиком индекс строится при первом запросе.
+    def __init__(self, tree):
+        self.tree = tree
+        self._tokens = {}  # ID -> кортеж ключей персоны
+        self._postings = defaultdict(set)  # ключ -> ID персон
+        self._trigrams = defaultdict(set)  # триграмма -> ключи
+        self._vocabulary = []  # Отсортированные ключи для поиска по префиксу
+        self._stale = True
+        tree.subscribe(self._on_tree_changed)
+
+    def rebuild(self):
+        # Полное построение индекса
+        self._stale = False
+        self._tokens = {}
+        self._postings = defaultdict(set)
+        for person_id, person in self.tree.people.items():
+            tokens = self._person_tokens(person)
+            self._tokens[person_id] = tokens
+            for token in tokens:
+                self._postings[token].add(person_id)
+        self._trigrams = defaultdict(set)
+        for token in self._postings:
+            for gram in trigrams(token):
+                self._trigrams[gram].add(token)
+        self._vocabulary = sorted(self._postings)
+
+    def _person_tokens(self, person):
+        tokens = set()
+        for field in SEARCH_FIELDS:
+            value = person.get(field)
+            if value:
+                tokens.update(normalize(value))
+        return tuple(tokens)
+
+    def _add(self, person_id):
+        tokens = self._person_tokens(self.tree.people[person_id])
+        self._tokens[person_id] = tokens
+        for token in tokens:
+            postings = self._postings[token]
+            if not postings:
+                insort(self._vocabulary, token)
+                for gram in trigrams(token):
+                    self._trigrams[gram].add(token)
+            postings.add(person_id)
+
+    def _remove(self, person_id):
+        for token in self._tokens.pop(person_id, ()):
+            postings = self._postings[token]
+            postings.discard(person_id)
+            if not postings:
+                # Слово больше не встречается: убирается из словаря и триграмм
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+                for gram in trigrams(token):
+                    self._trigrams[gram].discard(token)
+                    if not self._trigrams[gram]:
+                        del self._trigrams[gram]
+
+    def _on_tree_changed(self, event, *args):
+        if event == "reset":
+            self._stale = True
+        elif self._stale:
+            return  # Изменение попадёт в индекс при полном построении
+        elif event == "add":
+            self._add(args[0])
+        elif event == "edit":
+            self._remove(args[0])
+            self._add(args[0])
+        elif event == "remove":
+            self._remove(args[0])
+
+    def _prefixed(self, term):
+        # Ключи словаря, начинающиеся с term
+        start = bisect_left(self._vocabulary, term)
+        for token in self._vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            yield token
+
+    def _fuzzy(self, term):
+        # {ключ: вес} для слов словаря в пределах max_edits(term) правок от term. Кандидаты —
+        # по триграммам: правка (включая перестановку букв) портит не больше 4 триграмм, поэтому
+        # похожее слово обязательно содержит одну из 4k + 1 самых редких триграмм запроса.
+        edits = max_edits(term)
+        if not edits:
+            return {}
+        term_grams = sorted(trigrams(term), key=lambda gram: len(self._trigrams.get(gram, ())))
+        candidates = set()
+        for gram in term_grams[:4 * edits + 1]:
+            candidates.update(self._trigrams.get(gram, ()))
+        matches = {}
+        for token in candidates:
+            distance = edit_distance(term, token, edits)
+            if 0 < distance <= edits:
+                matches[token] = FUZZY_WEIGHT - 0.2 * (distance - 1)
+        return matches
+
+    def _term_matches(self, term, prefix):
+        # {ключ: вес} для одного слова запроса: точное совпадение и продолжения при наборе
+        matches = {}
+        if prefix:
+            for token in self._prefixed(term):
+                matches[token] = PREFIX_WEIGHT
+        if term in self._postings:
+            matches[term] = EXACT_WEIGHT
+        return matches
+
+    def _matching(self, groups, limit=None):
+        # Персоны, у которых для каждого слова запроса есть ключ из его группы. Перебираются
+        # персоны самой редкой группы, остальные группы проверяются по ключам самой персоны.
+        groups = sorted(groups, key=lambda group: sum(len(self._postings[token]) for token in group))
+        found = {}
+        for token in groups[0]:
+            for person_id in self._postings[token]:
+                if person_id in found:
+                    continue
+                tokens = self._tokens[person_id]
+                if all(not group.isdisjoint(tokens) for group in groups[1:]):
+                    found[person_id] = None
+                    if limit is not None and len(found) >= limit:
+                        return list(found)
+        return list(found)
+
+    def search(self, query, limit=50):
+        # ID персон, содержащих все слова запроса (последнее слово — как префикс при наборе),
+        # по убыванию релевантности
+        if self._stale:
+            self.rebuild()
+        terms = normalize(query)
+        per_term = [self._term_matches(term, prefix=i == len(terms) - 1) for i, term in enumerate(terms)]
+        if per_term and all(per_term):
+            # Если персон с наибольшим весом по каждому слову хватает, лучше результата не будет
+            best = []
+            for matches in per_term:
+                top = max(matches.values())
+                best.append({token for token, weight in matches.items() if weight == top})
+            found = self._matching(best, limit)
+            if len(found) >= limit:
+                return found
+
+        # Точных совпадений мало: добавляются написания с опечатками
+        for term, matches in zip(terms, per_term):
+            for token, weight in self._fuzzy(term).items():
+                matches.setdefault(token, weight)
+        if not per_term or not all(per_term):
+            return []
+        scores = {}
+        for person_id in self._matching([set(matches) for matches in per_term]):
+            tokens = self._tokens[person_id]
+            scores[person_id] = sum(max(matches.get(token, 0.0) for token in tokens) for matches in per_term)
+        return heapq.nlargest(limit, scores, key=scores.__getitem__)
+
+    def describe(self, person_id):
+        # Строка для списка результатов: ФИО, годы жизни и места
+        person = self.tree.people[person_id]
+        title = " ".join(person[field] for field in NAME_FIELDS if person[field]) or person_id
+        years = " – ".join(value for value in (person["birth_date"], person["death_date"]) if value)
+        places = ", ".join(value for value in (person["birth_place"], person["death_place"]) if value)
+        return " · ".join(part for part in (title, years, places) if part)
\ No newline at end of file
@@ -1,58 +1,157 @@
 from datetime import datetime
+from dates import age_years, today
+from graph_analysis import assign_levels
+from instrumentation import span
 
 class FamilyStats:
     def __init__(self, tree):
         self.tree = tree
+        self.tree.subscribe(self._on_tree_changed)
+        self.recompute()
 
-    def get_statistics(self):
-        # Подсчёт статистики семьи
-        total_people = len(self.tree.people)
-        total_families = 0
-        generations = 0
-        ages = []
-
-        # Подсчёт семей (родители с детьми)
-        for person_id, person in self.tree.people.items():
-            if person.get("children"):
-                total_families += 1
-
-        # Подсчёт поколений
-        visited = set()
-        def get_depth(person_id, depth=0):
-            if person_id in visited or person_id not in self.tree.people:
-                return depth
-            visited.add(person_id)
-            person = self.tree.people[person_id]
-            max_child_depth = depth
-            for child_id in person.get("children", []):
-                child_depth = get_depth(child_id, depth + 1)
-                max_child_depth = max(max_child_depth, child_depth)
-            return max_child_depth
-
-        for person_id in self.tree.people:
-            if not self.tree.people[person_id].get("parents"):
-                generations = max(generations, get_depth(person_id))
-
-        # Подсчёт среднего возраста
-        current_year = datetime.now().year
-        for person in self.tree.people.values():
-            birth_date = person.get("birth_date", "")
-            death_date = person.get("death_date", "")
-            try:
-                birth_year = int(birth_date.split()[-1]) if birth_date else None
-                death_year = int(death_date.split()[-1]) if death_date else current_year
-                if birth_year:
-                    age = death_year - birth_year
-                    if 0 < age < 120:  # Фильтрация нереальных возрастов
-                        ages.append(age)
-            except (ValueError, IndexError):
+    def recompute(self):
+        # Полный пересчёт счётчиков по всему древу
+        with span("stats.recompute", persons=len(self.tree.people)):
+            self._year = datetime.now().year
+            self._today = today()
+            self._families = 0
+            self._ages = {}  # {id: возраст} только для персон с корректным возрастом
+            self._age_sum = 0
+
+            # Подсчёт семей (родители с детьми) и возрастов
+            for person_id, person in self.tree.people.items():
+                if person.get("children"):
+                    self._families += 1
+                self._add_age(person_id)
+
+            # Подсчёт поколений: уровень персоны — длина самой длинной цепочки предков
+            self._levels = {}
+            self._level_counts = {}
+            levels, self.cycle_links = assign_levels(self.tree.people)
+            for person_id, level in levels.items():
+                self._set_level(person_id, level)
+
+    def _person_age(self, person_id):
+        # Возраст по датам, разобранным древом при добавлении персоны («ABT 1850», «1850/51»,
+        # юлианские даты); None для неизвестных, неразборчивых и нереальных значений
+        birth = self.tree.dates["birth_date"].get(person_id)
+        if birth is None:
+            return None
+        death = self.tree.dates["death_date"].get(person_id)
+        if death is None:
+            if self.tree.people[person_id]["death_date"]:
+                return None  # Дата смерти указана, но не разобрана
+            death = self._today
+        age = age_years(birth, death)
+        if 0 < age < 120:  # Фильтрация нереальных возрастов
+            return age
+        return None
+
+    def _add_age(self, person_id):
+        age = self._person_age(person_id)
+        if age is not None:
+            self._ages[person_id] = age
+            self._age_sum += age
+
+    def _remove_age(self, person_id):
+        self._age_sum -= self._ages.pop(person_id, 0)
+
+    def _set_level(self, person_id, level):
+        old_level = self._levels.get(person_id)
+        if old_level is not None:
+            self._level_counts[old_level] -= 1
+            if not self._level_counts[old_level]:
+                del self._level_counts[old_level]
+        self._levels[person_id] = level
+        self._level_counts[level] = self._level_counts.get(level, 0) + 1
+
+    def _drop_level(self, person_id):
+        level = self._levels.pop(person_id, None)
+        if level is not None:
+            self._level_counts[level] -= 1
+            if not self._level_counts[level]:
+                del self._level_counts[level]
+
+    def _raise_levels(self, parent_id, child_id):
+        # Повышение уровня ребёнка и его потомков после новой связи
+        limit = len(self.tree.people)
+        pending = [(child_id, self._levels[parent_id] + 1)]
+        while pending:
+            person_id, level = pending.pop()
+            if level <= self._levels.get(person_id, 0):
+                continue
+            if person_id == parent_id or level >= limit:
+                # Связь замкнула цикл родитель-ребёнок: уровни пересчитываются с его разрывом
+                self.recompute()
+                return
+            self._set_level(person_id, level)
+            for child_id in self.tree.people[person_id]["children"]:
+                pending.append((child_id, level + 1))
+
+    def _lower_levels(self, person_id):
+        # Понижение уровня персоны и её потомков после разрыва связи
+        pending = [person_id]
+        while pending:
+            person_id = pending.pop()
+            person = self.tree.people.get(person_id)
+            if not person:
+                continue
+            level = max((self._levels[parent_id] + 1 for parent_id in person["parents"]
+                         if parent_id in self._levels), default=0)
+            if level >= self._levels[person_id]:
                 continue
+            self._set_level(person_id, level)
+            pending.extend(person["children"])
 
-        average_age = sum(ages) / len(ages) if ages else 0
+    def _on_tree_changed(self, event, *args):
+        # Обновление счётчиков по одному изменению древа
+        if event == "add":
+            person_id = args[0]
+            self._add_age(person_id)
+            self._set_level(person_id, 0)
+        elif event == "remove":
+            person_id = args[0]
+            self._remove_age(person_id)
+            self._drop_level(person_id)
+        elif event == "edit":
+            person_id = args[0]
+            self._remove_age(person_id)
+            self._add_age(person_id)
+        elif event == "link":
+            parent_id, child_id = args
+            if len(self.tree.people[parent_id]["children"]) == 1:
+                self._families += 1
+            if self.cycle_links:
+                # Разрыв циклов зависит от порядка обхода: при их наличии уровни только пересчитываются
+                self.recompute()
+            else:
+                self._raise_levels(parent_id, child_id)
+        elif event == "unlink":
+            parent_id, child_id = args
+            if parent_id in self.tree.people and not self.tree.people[parent_id]["children"]:
+                self._families -= 1
+            if self.cycle_links:
+                self.recompute()  # Связь могла входить в цикл
+            else:
+                self._lower_levels(child_id)
+        else:
+            self.recompute()
+
+    def levels(self):
+        # Уровни поколений {id: уровень}, поддерживаемые по событиям древа
+        return self._levels
+
+    def get_statistics(self):
+        # Статистика семьи по накопленным счётчикам
+        with span("stats.get_statistics", persons=len(self.tree.people)):
+            if datetime.now().year != self._year:
+                self.recompute()  # Возраст живущих зависит от текущего года
+            average_age = self._age_sum / len(self._ages) if self._ages else 0
 
         return {
-            "total_people": total_people,
-            "total_families": total_families,
-            "generations": generations,
-            "average_age": average_age
+            "total_people": len(self.tree.people),
+            "total_families": self._families,
+            "generations": max(self._level_counts, default=0),
+            "average_age": average_age,
+            "cycle_links": len(self.cycle_links)
         }
\ No newline at end of file
@@ -0,0 +1,190 @@
+import json
+import os
+import random
+from gedcom_handler import GedcomHandler
+from tree_logic import FamilyTree
+
+# Воспроизводимые синтетические древа для замеров и проверки на больших данных: одинаковые
+# параметры и seed дают одинаковых персон, даты и связи. Поколения строятся от основателей:
+# супружеские пары внутри поколения, дети — следующее поколение.
+
+MALE_NAMES = ("Иван", "Пётр", "Николай", "Алексей", "Василий", "Михаил", "Фёдор", "Григорий", "Степан", "Андрей")
+FEMALE_NAMES = ("Мария", "Анна", "Елена", "Ольга", "Екатерина", "Татьяна", "Наталья", "Евдокия", "Ирина", "Агафья")
+PATRONYMIC_STEMS = {"Иван": "Иванов", "Пётр": "Петров", "Николай": "Николаев", "Алексей": "Алексеев",
+                    "Василий": "Васильев", "Михаил": "Михайлов", "Фёдор": "Фёдоров", "Григорий": "Григорьев",
+                    "Степан": "Степанов", "Андрей": "Андреев"}
+SURNAMES = ("Иванов", "Петров", "Смирнов", "Кузнецов", "Попов", "Соколов", "Лебедев", "Новиков", "Морозов",
+            "Волков", "Зайцев", "Павлов", "Семёнов", "Голубев", "Виноградов", "Богданов", "Воробьёв", "Фёдоров",
+            "Михайлов", "Беляев", "Тарасов", "Белов", "Комаров", "Орлов", "Киселёв", "Макаров", "Андреев",
+            "Ковалёв", "Ильин", "Гусев", "Титов", "Кузьмин")
+MONTHS = ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC")
+PRESENT_YEAR = 2020  # Позже этого года смерти не генерируются
+
+
+def _female_surname(surname):
+    return surname + "а" if surname.endswith(("ов", "ев", "ёв", "ин")) else surname
+
+
+def _date_text(random, year, missing_dates, earliest=None):
+    # Дата в одной из форм, встречающихся в метрических книгах: точная, только год, «около»;
+    # возвращает (текст, (месяц, день) точной даты или None). earliest — (месяц, день), раньше
+    # которых дата быть не может (смерть в год рождения); с ним дата всегда точная.
+    if random() < missing_dates:
+        return "", None
+    kind = random()
+    if kind < 0.75:
+        day = 1 + int(random() * 28)
+        point = (int(random() * 12), day)
+        if earliest and point < earliest:
+            point = earliest
+    elif earliest:
+        point = earliest
+    elif kind < 0.95:
+        return str(year), None
+    else:
+        return f"ABT {year}", None
+    return f"{point[1]} {MONTHS[point[0]]} {year}", point
+
+
+def generate_people(persons, seed=0, generations=10, fertility=3.0, collapse=0.02, missing_dates=0.1,
+                    images=0.0, places=500, start_year=1700):
+    # Персоны в формате FamilyTree.to_dict с ID "I1", "I2", …:
+    # generations — число поколений, за которое древо вырастает до persons: поколение k планируется
+    # размером основатели * (fertility / 2) ** k, недостающих до плана (рождается меньше, чем в
+    # плане, из-за детской смертности и холостых) добавляют новые семьи без предков в древе;
+    # fertility — среднее число детей в семье; collapse — доля браков между потомками общего
+    # деда или бабушки (пересечение линий); missing_dates — доля пустых дат;
+    # images — доля персон со ссылкой на изображение images/<ID>.jpg (файлы не создаются).
+    rng = random.Random(seed)
+    # В add — rng.random() вместо randint и choice: на миллионах вызовов они заметно медленнее
+    uniform = rng.random
+    growth = max(fertility / 2, 1.01)
+    founders = max(2, int(persons * (growth - 1) / (growth ** generations - 1)))
+    people = {}
+    born = {}  # ID -> год рождения (дата в записи может быть пустой)
+
+    def add(sex, surname, patronymic, birth_year, parents):
+        person_id = f"I{len(people) + 1}"
+        female = sex == "F"
+        if uniform() < 0.2:
+            death_year = birth_year + int(uniform() * 6)  # Детская смертность
+        else:
+            death_year = birth_year + 20 + int(uniform() * 76)
+        names = FEMALE_NAMES if female else MALE_NAMES
+        name = names[int(uniform() * len(names))]
+        birth_date, birth_point = _date_text(uniform, birth_year, missing_dates)
+        death_date = ""
+        if death_year <= PRESENT_YEAR:
+            same_year = death_year == birth_year
+            death_date, _ = _date_text(uniform, death_year, missing_dates, birth_point if same_year else None)
+            if same_year and death_date and birth_date and birth_point is None:
+                death_date = birth_date  # Смерть в год рождения, известный без дня: не раньше рождения
+        person = {
+            "surname": _female_surname(surname) if female else surname,
+            "name": name,
+            "patronymic": (patronymic + ("на" if female else "ич")) if patronymic else "",
+            "birth_date": birth_date,
+            "death_date": death_date,
+            "birth_place": f"Деревня {1 + int(uniform() * places)}",
+            "death_place": f"Деревня {1 + int(uniform() * places)}" if death_year <= PRESENT_YEAR else "",
+            "notes": "Запись из метрической книги" if uniform() < 0.1 else "",
+            "image_path": f"images/{person_id}.jpg" if uniform() < images else "",
+            "parents": list(parents),
+            "children": [],
+        }
+        people[person_id] = person
+        born[person_id] = birth_year
+        for parent_id in parents:
+            people[parent_id]["children"].append(person_id)
+        return person_id, (sex, birth_year, death_year - birth_year)
+
+    def add_founders(count, year):
+        return [add(rng.choice("MF"), rng.choice(SURNAMES), None, year + rng.randint(0, 10), ())
+                for _ in range(count)]
+
+    generation = add_founders(min(founders, persons), start_year)
+    year = start_year
+    planned = founders
+    while len(people) < persons:
+        # Пары поколения: дожившие до 16 лет, мужчины с женщинами; часть браков — между
+        # потомками общего деда или бабушки
+        adults = [(person_id, info) for person_id, info in generation if info[2] >= 16]
+        men = [person_id for person_id, info in adults if info[0] == "M"]
+        women = [person_id for person_id, info in adults if info[0] == "F"]
+        rng.shuffle(men)
+        rng.shuffle(women)
+        by_grandparent = {}
+        if collapse:
+            for woman in women:
+                for parent_id in people[woman]["parents"]:
+                    for grandparent_id in people[parent_id]["parents"]:
+                        by_grandparent.setdefault(grandparent_id, []).append(woman)
+        free = set(women)
+        couples = []
+        for man in men:
+            wife = None
+            if collapse and rng.random() < collapse:
+                for parent_id in people[man]["parents"]:
+                    for grandparent_id in people[parent_id]["parents"]:
+                        wife = next((woman for woman in by_grandparent.get(grandparent_id, ())
+                                     if woman in free and set(people[woman]["parents"]).isdisjoint(
+                                         people[man]["parents"])), None)
+                        if wife:
+                            break
+                    if wife:
+                        break
+            while wife is None and women:
+                candidate = women.pop()
+                if candidate in free:
+                    wife = candidate
+            if wife is None:
+                break
+            free.discard(wife)
+            couples.append((man, wife))
+
+        year += 30
+        next_generation = []
+        for man, wife in couples:
+            child_year = max(born[man], born[wife]) + rng.randint(18, 28)
+            for _ in range(rng.randint(0, int(2 * fertility))):
+                if len(people) >= persons or child_year - born[wife] > 45:
+                    break
+                next_generation.append(add("M" if uniform() < 0.5 else "F", people[man]["surname"],
+                                           PATRONYMIC_STEMS.get(people[man]["name"]), child_year, (man, wife)))
+                child_year += 1 + int(uniform() * 4)
+        planned *= growth
+        if len(next_generation) < planned and len(people) < persons:
+            next_generation += add_founders(min(int(planned) - len(next_generation), persons - len(people)), year)
+        generation = next_generation
+    return people
+
+
+def build_tree(persons, seed=0, compact=False, **options):
+    # Синтетическое древо в памяти; options — параметры generate_people
+    tree = FamilyTree(compact=compact)
+    tree.load_people(generate_people(persons, seed, **options))
+    return tree
+
+
+def write_gedcom(file_path, persons, seed=0, **options):
+    # Синтетическое древо в GEDCOM (*.ged.gz — сжатый) штатным экспортом
+    tree = build_tree(persons, seed, compact=True, **options)
+    GedcomHandler(tree).export_gedcom(file_path)
+    return len(tree.people)
+
+
+def write_json(file_path, persons, seed=0, **options):
+    # Синтетическое древо в формате JSON-файла древа
+    people = generate_people(persons, seed, **options)
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(people, f, ensure_ascii=False)
+    return len(people)
+
+
+def write_images(directory, count, seed=0, min_kb=100, max_kb=300):
+    # Каталог с изображениями-заглушками: случайные байты размером как у JPEG-сканов
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    for i in range(count):
+        with open(os.path.join(directory, f"image_{i}.jpg"), "wb") as f:
+            f.write(rng.randbytes(rng.randint(min_kb, max_kb) * 1024))
\ No newline at end of file
@@ -0,0 +1,93 @@
+import json
+import os
+import pytest
+from synthetic import write_gedcom
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+NOISE_SECONDS = 0.02  # Разницы меньше этой считаются шумом измерения
+_results = {}  # {имя теста: лучший раунд, с} для --bench-save-baseline
+
+
+def _parameters(config):
+    # Параметры синтетического древа: базовые замеры сравнимы только при тех же значениях
+    return {"persons": config.getoption("--bench-persons"), "seed": config.getoption("--bench-seed")}
+
+
+def _baseline_path(config, option):
+    path = config.getoption(option)
+    return path if path is None or os.path.isabs(path) else os.path.join(ROOT, path)
+
+
+@pytest.fixture(scope="session")
+def bench_parameters(request):
+    return _parameters(request.config)
+
+
+@pytest.fixture(scope="session")
+def gedcom_file(tmp_path_factory, bench_parameters):
+    # Синтетическое древо в GEDCOM, одно на сеанс
+    path = str(tmp_path_factory.mktemp("bench") / "synthetic.ged")
+    write_gedcom(path, bench_parameters["persons"], bench_parameters["seed"])
+    return path
+
+
+@pytest.fixture
+def load_tree(gedcom_file):
+    # Новое древо из синтетического файла (каждый вызов — отдельная копия)
+    def load(compact=False):
+        from gedcom_handler import GedcomHandler
+        from tree_logic import FamilyTree
+        tree = FamilyTree(compact=compact, copy_images=False)
+        GedcomHandler(tree).import_gedcom(gedcom_file)
+        return tree
+    return load
+
+
+@pytest.fixture(scope="session")
+def baseline(request):
+    path = _baseline_path(request.config, "--bench-compare")
+    if path is None:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data["parameters"] != _parameters(request.config):
+        pytest.exit(f"Базовые замеры сняты с другими параметрами: {data['parameters']}", returncode=2)
+    return data["benchmarks"]
+
+
+@pytest.fixture
+def measure(benchmark, baseline, request):
+    # measure(func, *args, setup=None, rounds=5): замер pytest-benchmark и проверка лучшего раунда
+    # по базовым замерам (--bench-compare). С setup каждый раунд получает свежий аргумент:
+    # func(setup()), подготовка в замер не входит.
+    def run(func, *args, setup=None, rounds=5):
+        if setup is None:
+            result = benchmark.pedantic(func, args, rounds=rounds, warmup_rounds=1)
+        else:
+            result = benchmark.pedantic(func, setup=lambda: ((setup(),), {}), rounds=rounds)
+        if benchmark.stats is None:
+            return result  # --benchmark-disable
+        name = request.node.name
+        best = benchmark.stats.stats.min
+        _results[name] = best
+        before = baseline.get(name) if baseline else None
+        threshold = request.config.getoption("--bench-threshold")
+        if before is not None and best > before * (1 + threshold) and best - before > NOISE_SECONDS:
+            pytest.fail(f"Регрессия {name}: лучший раунд {before:.4f} с -> {best:.4f} с")
+        return result
+    return run
+
+
+def pytest_sessionfinish(session):
+    path = _baseline_path(session.config, "--bench-save-baseline")
+    if path is None or not _results:
+        return
+    data = {"parameters": _parameters(session.config), "benchmarks": {}}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("parameters") == data["parameters"] and "benchmarks" in saved:
+            data = saved
+    data["benchmarks"].update((name, round(best, 6)) for name, best in _results.items())
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
\ No newline at end of file
@@ -0,0 +1,86 @@
+import random
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.fixture
+def tree(load_tree):
+    return load_tree()
+
+
+def test_layout(measure, tree):
+    from tree_layout import TreeLayout
+    positions = measure(TreeLayout(tree).compute)
+    assert len(positions) == len(tree.people)
+
+
+def test_stats_recompute(measure, tree):
+    from stats import FamilyStats
+    measure(FamilyStats(tree).recompute)
+
+
+def test_demographics(measure, tree):
+    demographics = pytest.importorskip("demographics")
+    if demographics.np is None:
+        pytest.skip("numpy не установлен")
+    from stats import FamilyStats
+    levels = FamilyStats(tree).levels()
+    measure(lambda: demographics.compute(demographics.TreeArrays(tree, levels)))
+
+
+def test_date_queries(measure, tree, bench_parameters):
+    # 1000 запросов по диапазону лет
+    from dates import DateIndex
+    index = DateIndex(tree)
+    index.rebuild()
+    rng = random.Random(bench_parameters["seed"])
+    ranges = [(first, first + 20) for first in (rng.randint(1700, 1990) for _ in range(1000))]
+    measure(lambda: [index.count_between(first, last) for first, last in ranges])
+
+
+def test_search(measure, tree, bench_parameters):
+    # 600 запросов по мере ввода: префиксы и фамилии с опечаткой
+    from search_index import SearchIndex
+    index = SearchIndex(tree)
+    index.rebuild()
+    rng = random.Random(bench_parameters["seed"])
+    queries = []
+    for person in rng.sample(list(tree.people.values()), 300):
+        surname = person["surname"] or "Иванов"
+        queries.append(surname[:3])
+        queries.append(f"{surname[:-2]}{surname[-1]}{surname[-2]} {person['name']}")
+    measure(lambda: [index.search(query) for query in queries])
+
+
+def test_kinship(measure, tree, bench_parameters):
+    # 1000 случайных пар без кэша результатов
+    from kinship import Kinship
+    rng = random.Random(bench_parameters["seed"])
+    ids = list(tree.people)
+    pairs = [(rng.choice(ids), rng.choice(ids)) for _ in range(1000)]
+
+    def relate(kinship):
+        for first_id, second_id in pairs:
+            kinship.relationship(first_id, second_id)
+    measure(relate, setup=lambda: Kinship(tree))
+
+
+def test_find_duplicates(measure, load_tree, gedcom_file):
+    # Повторный импорт того же файла: каждая новая персона — дубликат существующей
+    from duplicates import find_duplicates
+    from gedcom_handler import GedcomHandler
+    tree = load_tree(compact=True)
+    new_ids = GedcomHandler(tree).import_gedcom(gedcom_file, merge=True)
+    pairs = measure(find_duplicates, tree, new_ids, rounds=3)
+    assert len(pairs) > len(new_ids) * 0.9
+
+
+def test_backup_create(measure, tree, tmp_path):
+    from backup_store import BackupStore
+    from synthetic import write_images
+    images_dir = str(tmp_path / "images")
+    write_images(images_dir, 50)
+    counter = iter(range(1000))
+    measure(lambda store: store.create(tree), setup=lambda: BackupStore(str(tmp_path / f"store{next(counter)}"), images_dir),
+            rounds=3)
\ No newline at end of file
@@ -0,0 +1,84 @@
+import json
+import os
+import random
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+
+def test_import_gedcom(measure, gedcom_file):
+    from gedcom_handler import GedcomHandler
+    from tree_logic import FamilyTree
+    measure(lambda tree: GedcomHandler(tree).import_gedcom(gedcom_file), setup=FamilyTree)
+
+
+@pytest.mark.parametrize("compress", [False, True], ids=["plain", "gzip"])
+def test_export_gedcom(measure, load_tree, tmp_path, compress):
+    from gedcom_handler import GedcomHandler
+    path = str(tmp_path / ("export.ged" + (".gz" if compress else "")))
+    measure(GedcomHandler(load_tree()).export_gedcom, path, None, None, compress)
+
+
+def test_save_json(measure, load_tree, tmp_path):
+    tree = load_tree()
+    path = tmp_path / "tree.json"
+
+    def save():
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(tree.to_dict(), f, ensure_ascii=False)
+    measure(save)
+
+
+def test_load_json(measure, load_tree, tmp_path):
+    from tree_logic import FamilyTree
+    path = tmp_path / "tree.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(load_tree().to_dict(), f, ensure_ascii=False)
+
+    def load():
+        with open(path, "r", encoding="utf-8") as f:
+            FamilyTree().load_people(json.load(f))
+    measure(load)
+
+
+def test_save_project_full(measure, load_tree, tmp_path):
+    from project_store import ProjectStore
+    tree = load_tree()
+    path = str(tmp_path / "tree.mdrevo")
+
+    def fresh_store():
+        if os.path.exists(path):
+            os.remove(path)
+        store = ProjectStore(path)
+        store.attach(tree)
+        return store
+    measure(lambda store: store.save(), setup=lambda: fresh_store())
+
+
+def test_save_project_incremental(measure, load_tree, tmp_path, bench_parameters):
+    # Сохранение после 100 правок уже сохранённого проекта
+    from project_store import ProjectStore
+    tree = load_tree()
+    store = ProjectStore(str(tmp_path / "tree.mdrevo"))
+    store.attach(tree)
+    store.save()
+    rng = random.Random(bench_parameters["seed"])
+    ids = list(tree.people)
+
+    def edit():
+        for _ in range(100):
+            tree.edit_person(rng.choice(ids), {"notes": f"Изменено {rng.random()}"})
+        return store
+    written = measure(lambda store: store.save(), setup=edit)
+    assert written >= 1
+
+
+def test_load_project(measure, load_tree, tmp_path):
+    from project_store import ProjectStore
+    from tree_logic import FamilyTree
+    path = str(tmp_path / "tree.mdrevo")
+    store = ProjectStore(path)
+    store.attach(load_tree())
+    store.save()
+    store.detach()
+    measure(lambda: ProjectStore(path).read(FamilyTree()))
\ No newline at end of file
@@ -0,0 +1,79 @@
+import os
+import random
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("PyQt5", reason="замеры сцены требуют PyQt5")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture(scope="module")
+def app():
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def scene(app, load_tree):
+    # Сцена древа с видимой областью в начале раскладки
+    from PyQt5.QtCore import QRectF
+    from PyQt5.QtWidgets import QGraphicsScene
+    from tree_layout import TreeLayout
+    from tree_scene import TreeScene
+    tree = load_tree()
+    tree_scene = TreeScene(QGraphicsScene(), tree, TreeLayout(tree))
+    tree_scene.sync()
+    tree_scene.set_viewport(QRectF(0, 0, 3000, 2000), 1.0)
+    return tree, tree_scene
+
+
+def test_scene_build(measure, app, load_tree):
+    from PyQt5.QtWidgets import QGraphicsScene
+    from tree_layout import TreeLayout
+    from tree_scene import TreeScene
+    tree = load_tree()
+    measure(lambda tree_scene: tree_scene.sync(), setup=lambda: TreeScene(QGraphicsScene(), tree, TreeLayout(tree)))
+
+
+@pytest.mark.parametrize("edit", ["rename", "add_child", "remove"])
+def test_scene_edit(measure, scene, bench_parameters, edit):
+    # Задержка одной правки до обновлённой сцены (правка данных или структуры с новой раскладкой)
+    tree, tree_scene = scene
+    rng = random.Random(bench_parameters["seed"])
+    ids = list(tree.people)
+
+    def prepare():
+        if edit == "remove":
+            return tree.add_person({"name": "Новый"}, rng.choice(ids))
+        return rng.choice(ids)
+
+    def apply(person_id):
+        if edit == "rename":
+            tree.edit_person(person_id, {"name": "Изменено"})
+        elif edit == "add_child":
+            tree.add_person({"name": "Новый"}, person_id)
+        else:
+            tree.remove_person(person_id)
+        tree_scene.sync()
+    measure(apply, setup=prepare, rounds=10)
+
+
+@pytest.mark.parametrize("scale", [0.05, 0.25, 1.0])
+def test_viewport_pan(measure, app, scene, scale):
+    # Кадр панорамирования: элементы для новой видимой области (кластеры, прямоугольники, текст)
+    from PyQt5.QtWidgets import QGraphicsView
+    tree, tree_scene = scene
+    view = QGraphicsView(tree_scene.scene)
+    view.resize(1200, 800)
+    view.setSceneRect(tree_scene.bounds())
+    view.scale(scale, scale)
+    view.show()
+    steps = iter(range(10 ** 6))
+
+    def pan():
+        view.horizontalScrollBar().setValue(next(steps) * 200 % max(view.horizontalScrollBar().maximum(), 1))
+        tree_scene.set_viewport(view.mapToScene(view.viewport().rect()).boundingRect(), scale)
+        view.viewport().repaint()
+        app.processEvents()
+    measure(pan, rounds=30)
+    assert tree_scene.nodes or tree_scene.clusters
\ No newline at end of file
@@ -0,0 +1,17 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+
+def test_startup_cli(measure):
+    # Процесс с импортом командной строки (без Qt)
+    from benchmarks import run_with_importtime
+    measure(run_with_importtime, "import matsdrevo", rounds=3)
+
+
+def test_startup_first_paint(measure):
+    # Процесс до первой отрисовки главного окна с пустым древом
+    pytest.importorskip("PyQt5", reason="замер окна требует PyQt5")
+    from benchmarks import FIRST_PAINT_SCRIPT, run_with_importtime
+    stdout, _, _ = measure(run_with_importtime, FIRST_PAINT_SCRIPT, rounds=3)
+    assert float(stdout.strip().splitlines()[0]) > 0
\ No newline at end of file
@@ -0,0 +1,18 @@
+import os
+import sys
+
+# Модули программы лежат в корне репозитория
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def pytest_addoption(parser):
+    # Параметры замеров tests/benchmarks (pytest-benchmark)
+    group = parser.getgroup("matsdrevo", "Замеры MatsDrevo")
+    group.addoption("--bench-persons", type=int, default=5000, help="Размер синтетического древа")
+    group.addoption("--bench-seed", type=int, default=0, help="seed синтетического древа")
+    group.addoption("--bench-compare", nargs="?", const="benchmarks_baseline.json", default=None,
+                    help="Сравнить лучшие раунды с базовыми замерами; замедление больше порога — провал теста")
+    group.addoption("--bench-save-baseline", nargs="?", const="benchmarks_baseline.json", default=None,
+                    help="Записать лучшие раунды как базовые замеры")
+    group.addoption("--bench-threshold", type=float, default=0.25, help="Допустимое замедление (доля)")
\ No newline at end of file
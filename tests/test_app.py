@@ -0,0 +1,80 @@
+import json
+import os
+import pytest
+
+pytest.importorskip("PyQt5", reason="окно программы требует PyQt5")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QEventLoop, QTimer  # noqa: E402
+from PyQt5.QtWidgets import QApplication, QMessageBox  # noqa: E402
+from tree_logic import FamilyTree  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def window(app, tmp_path, monkeypatch):
+    # Окно в пустом каталоге: настройки, журнал и изображения — во временной папке
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(QMessageBox, "information", lambda *args: QMessageBox.Ok)
+    monkeypatch.setattr(QMessageBox, "critical", lambda *args: pytest.fail(str(args[2])))
+
+    def create():
+        from ui import GenealogyApp
+        created = GenealogyApp(FamilyTree())
+        windows.append(created)
+        return created
+    windows = []
+    yield create
+    for created in windows:
+        created.close()
+
+
+def spin(milliseconds=100):
+    loop = QEventLoop()
+    QTimer.singleShot(milliseconds, loop.quit)
+    loop.exec_()
+
+
+def wait_for(condition, timeout=5000):
+    for _ in range(timeout // 50):
+        if condition():
+            return
+        spin(50)
+    assert condition()
+
+
+def test_tabs_are_built_on_first_open(window):
+    main = window()
+    assert main.tree_scene is None and main.stats_text is None
+    main.tabs.setCurrentWidget(main.tree_tab)
+    assert main.tree_scene is not None and main.stats_text is None
+    main.tabs.setCurrentWidget(main.stats_tab)
+    assert main.stats_text is not None
+
+
+def test_hidden_tree_tab_is_refreshed_on_show(window):
+    main = window()
+    main.tabs.setCurrentWidget(main.tree_tab)
+    main.tabs.setCurrentWidget(main.persons_tab)
+    person_id = main.tree.add_person({"surname": "Иванов", "name": "Пётр"})
+    spin()
+    assert main.refresh_scheduler.is_dirty("tree") and person_id not in main.tree_scene.nodes
+    assert main.persons_model.rowCount() == 1
+    main.tabs.setCurrentWidget(main.tree_tab)
+    assert not main.refresh_scheduler.is_dirty("tree")
+    assert person_id in main.tree_scene.nodes
+
+
+def test_last_project_opens_in_background(window):
+    with open("tree.json", "w", encoding="utf-8") as f:
+        json.dump({"p1": {"surname": "Иванов", "name": "Пётр", "parents": [], "children": []}}, f)
+    with open("settings.json", "w", encoding="utf-8") as f:
+        json.dump({"last_project": os.path.abspath("tree.json")}, f)
+    main = window()
+    assert not main.tree.people  # Окно создаётся без ожидания загрузки
+    wait_for(lambda: "p1" in main.tree.people)
+    wait_for(lambda: main.persons_model.rowCount() == 1)
\ No newline at end of file
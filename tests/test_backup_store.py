@@ -0,0 +1,142 @@
+import json
+import os
+
+import pytest
+import backup_store
+from backup_store import FULL_SNAPSHOT_EVERY, BackupStore
+from tree_logic import FamilyTree
+
+
+def build_tree(size=20):
+    tree = FamilyTree()
+    parent_id = None
+    for i in range(size):
+        parent_id = tree.add_person({"surname": "Иванов", "name": f"Иван {i}", "birth_date": str(1800 + i)},
+                                    parent_id)
+    return tree
+
+
+def as_loaded(tree):
+    return json.loads(json.dumps(tree.to_dict()))
+
+
+@pytest.fixture
+def store(tmp_path):
+    os.makedirs(tmp_path / "images")
+    return BackupStore(str(tmp_path / "store"), str(tmp_path / "images"), workers=2)
+
+
+def write_image(store, name, data):
+    with open(os.path.join(store.images_dir, name), "wb") as f:
+        f.write(data)
+
+
+def count_objects(store):
+    return sum(len(files) for _, _, files in os.walk(store.objects_dir))
+
+
+def test_delta_chain(store):
+    # Разности копятся до FULL_SNAPSHOT_EVERY копий, затем снова полная копия; удалённые персоны
+    # не возвращаются из предыдущих звеньев цепочки
+    tree = build_tree()
+    expected = {}
+    for step in range(FULL_SNAPSHOT_EVERY + 3):
+        person_id = list(tree.people)[step % len(tree.people)]
+        tree.edit_person(person_id, {"notes": f"правка {step}"})
+        if step % 3 == 1:
+            tree.remove_person(list(tree.people)[-1])
+        if step % 4 == 2:
+            tree.add_person({"surname": "Петров", "name": f"Пётр {step}"}, person_id)
+        name, summary = store.create(tree)
+        expected[name] = as_loaded(tree)
+        assert summary["delta"] == (step % FULL_SNAPSHOT_EVERY != 0)
+    names = store.list_snapshots()
+    assert names == sorted(expected) and len(names) == FULL_SNAPSHOT_EVERY + 3
+    assert [store._load_records(name)[1] for name in names] == \
+        list(range(1, FULL_SNAPSHOT_EVERY + 1)) + [1, 2, 3]
+    for name in names:
+        records, _ = store._load_records(name)
+        assert {person_id: json.loads(record) for person_id, record in records.items()} == expected[name]
+
+
+def test_large_change_writes_full_snapshot(store):
+    tree = build_tree()
+    store.create(tree)
+    for person_id in list(tree.people)[:10]:
+        tree.edit_person(person_id, {"notes": "правка"})
+    assert store.create(tree)[1]["delta"] is False
+
+
+def test_images_are_deduplicated_and_reused(store, monkeypatch):
+    hashed = []
+    file_hash = backup_store._file_hash
+
+    def counting_hash(path):
+        hashed.append(os.path.basename(path))
+        return file_hash(path)
+    monkeypatch.setattr(backup_store, "_file_hash", counting_hash)
+    write_image(store, "a.png", b"png" * 1000)
+    write_image(store, "copy.png", b"png" * 1000)
+    write_image(store, "b.txt", b"text" * 1000)
+    tree = build_tree(3)
+    _, summary = store.create(tree)
+    assert (summary["new_images"], summary["reused_images"]) == (3, 0)
+    assert count_objects(store) == 3  # Два разных изображения и древо
+    assert sorted(hashed) == ["a.png", "b.txt", "copy.png"]
+
+    # Файлы с прежним размером и временем изменения не перечитываются
+    hashed.clear()
+    _, summary = store.create(tree)
+    assert (summary["new_images"], summary["reused_images"]) == (0, 3)
+    assert hashed == []
+
+    write_image(store, "b.txt", b"other text")
+    _, summary = store.create(tree)
+    assert (summary["new_images"], summary["reused_images"]) == (1, 2)
+    assert hashed == ["b.txt"]
+    assert count_objects(store) == 5  # И пустая разность древа, общая для второй и третьей копий
+
+
+def test_corrupted_object(store):
+    write_image(store, "a.txt", b"text" * 1000)
+    name, _ = store.create(build_tree(3))
+    digest = store._load_manifest(name)["images"]["a.txt"][0]
+    os.remove(os.path.join(store.images_dir, "a.txt"))
+    path = store._object_path(digest)
+    with open(path, "rb") as f:
+        payload = f.read()
+    with open(path, "wb") as f:
+        f.write(b"R" + payload[1:])  # Сжатые данные выдаются за несжатые
+    with pytest.raises(ValueError, match="повреждён"):
+        store.restore(name)
+
+
+def test_restore_without_snapshots(store):
+    with pytest.raises(ValueError):
+        store.restore()
+
+
+def test_round_trip(store):
+    write_image(store, "a.png", b"first")
+    tree = build_tree()
+    first, _ = store.create(tree)
+    first_people = as_loaded(tree)
+
+    tree.edit_person(next(iter(tree.people)), {"notes": "правка"})
+    tree.remove_person(list(tree.people)[-1])
+    write_image(store, "a.png", b"second image")
+    write_image(store, "b.png", b"new")
+    second, _ = store.create(tree)
+    assert store._load_manifest(second)["tree"]["base"] == first
+
+    progress = []
+    assert store.restore(progress=lambda done, total: progress.append((done, total))) == as_loaded(tree)
+    assert progress[-1] == (2, 2)
+    assert store.restore(first) == first_people
+    assert sorted(os.listdir(store.images_dir)) == ["a.png", "b.png"]
+    with open(os.path.join(store.images_dir, "a.png"), "rb") as f:
+        assert f.read() == b"first"
+
+    restored = FamilyTree()
+    restored.load_people(store.restore(second))
+    assert as_loaded(restored) == as_loaded(tree)
\ No newline at end of file
@@ -0,0 +1,90 @@
+import pytest
+from dates import MAX_DAY, MIN_DAY, DateIndex, GenDate, gregorian_day, julian_day, parse_date
+from tree_logic import FamilyTree
+
+
+def days(first, last=None):
+    # Диапазон григорианских дат (год, месяц, день) как номера дней
+    return gregorian_day(*first), gregorian_day(*(last or first))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1850", days((1850, 1, 1), (1850, 12, 31))),
+    ("MAR 1850", days((1850, 3, 1), (1850, 3, 31))),
+    ("12 MAR 1850", days((1850, 3, 12))),
+    ("12.03.1850", days((1850, 3, 12))),
+    ("1850-03-12", days((1850, 3, 12))),
+    ("12 марта 1850", days((1850, 3, 12))),
+    ("29 FEB 1900", None),
+    ("31 APR 1850", None),
+    ("13.13.1850", None),
+])
+def test_exact_dates(text, expected):
+    date = parse_date(text)
+    assert (date[:2] if date else None) == expected
+
+
+@pytest.mark.parametrize("text, quality, low, high", [
+    ("ABT 1850", "about", gregorian_day(1850, 1, 1), gregorian_day(1850, 12, 31)),
+    ("около 1850", "about", gregorian_day(1850, 1, 1), gregorian_day(1850, 12, 31)),
+    ("BEF 1850", "before", MIN_DAY, gregorian_day(1849, 12, 31)),
+    ("AFT 1850", "after", gregorian_day(1851, 1, 1), MAX_DAY),
+    ("BET 1840 AND 1845", "range", gregorian_day(1840, 1, 1), gregorian_day(1845, 12, 31)),
+    ("FROM 1850 TO 1860", "range", gregorian_day(1850, 1, 1), gregorian_day(1860, 12, 31)),
+    ("FROM 1850", "after", gregorian_day(1850, 1, 1), MAX_DAY),
+    ("TO 1850", "before", MIN_DAY, gregorian_day(1850, 12, 31)),
+])
+def test_qualified_dates(text, quality, low, high):
+    assert parse_date(text) == GenDate(low, high, quality)
+
+
+def test_julian_calendar():
+    assert parse_date("@#DJULIAN@ 5 MAY 1801")[:2] == (julian_day(1801, 5, 5),) * 2
+    assert parse_date("@#DJULIAN@ 5 MAY 1801").low == gregorian_day(1801, 5, 17)
+
+
+@pytest.mark.parametrize("text", ["", "непонятно", "(в детстве)", "BET 1850", "BET 1860 AND 1850",
+                                  "@#DHEBREW@ 1 TSH 5600", "1 2 3 1850"])
+def test_unreadable_dates(text):
+    assert parse_date(text) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1850/51", days((1851, 1, 1), (1851, 3, 24))),
+    ("FEB 1850/51", days((1851, 2, 1), (1851, 2, 28))),
+    ("MAR 1850/51", days((1851, 3, 1), (1851, 3, 24))),
+    ("1 JAN 1850/51", days((1851, 1, 1))),
+    ("24 MAR 1850/51", days((1851, 3, 24))),
+    ("1899/00", days((1900, 1, 1), (1900, 3, 24))),
+])
+def test_dual_year(text, expected):
+    # Двойной год — дата с 1 января по 24 марта следующего года
+    assert parse_date(text)[:2] == expected
+
+
+@pytest.mark.parametrize("text", ["1850/99", "1850/50", "1850/52", "25 MAR 1850/51", "APR 1850/51",
+                                  "12 JUN 1850/51"])
+def test_dual_year_rejected(text):
+    assert parse_date(text) is None
+
+
+def test_key_and_year():
+    assert parse_date("12 MAR 1850").year == 1850
+    assert parse_date("BEF 1850").key == gregorian_day(1850, 1, 1) - 1
+    assert parse_date("AFT 1850").key == gregorian_day(1851, 1, 1)
+    assert parse_date("1850/51").year == 1851
+
+
+def test_date_index_follows_tree():
+    tree = FamilyTree()
+    index = DateIndex(tree)
+    first = tree.add_person({"birth_date": "1850"})
+    second = tree.add_person({"birth_date": "ABT 1849"})
+    tree.add_person({"birth_date": "непонятно"})
+    assert index.between(1845, 1855) == [second, first]
+    tree.edit_person(first, {"birth_date": "1 JAN 1860"})
+    assert index.between(1845, 1855) == [second]
+    assert index.count_between(1800, 1900) == 2
+    tree.remove_person(second)
+    assert index.between(1800, 1900) == [first]
+    assert index.between(1800, 1900, field="death_date") == []
\ No newline at end of file
@@ -0,0 +1,74 @@
+import pytest
+from stats import FamilyStats
+from tree_logic import FamilyTree
+
+demographics = pytest.importorskip("demographics")
+pytest.importorskip("numpy")
+
+
+def build_tree():
+    tree = FamilyTree()
+    grandfather = tree.add_person({"surname": "Иванов", "name": "Пётр", "birth_date": "1820",
+                                   "death_date": "1880", "birth_place": "Тверь"})
+    father = tree.add_person({"surname": "Иванов", "name": "Иван", "birth_date": "12 MAR 1850",
+                              "death_date": "1852"}, parent_id=grandfather)
+    tree.add_person({"surname": "Иванова", "name": "Мария", "birth_date": "ABT 1852"}, parent_id=grandfather)
+    tree.add_person({"name": "Анна"}, parent_id=father)
+    return tree
+
+
+def test_snapshot_matches_live_projection():
+    tree = build_tree()
+    levels = FamilyStats(tree).levels()
+    expected = demographics.compute(demographics.TreeArrays(tree, levels))
+    assert demographics.compute(demographics.TreeArrays(demographics.snapshot(tree, levels))) == expected
+
+
+def test_snapshot_is_independent_of_later_edits():
+    # Фоновый расчёт по копии не видит правок, сделанных после её снятия
+    tree = build_tree()
+    stats = FamilyStats(tree)
+    data = demographics.snapshot(tree, stats.levels())
+    expected = demographics.compute(demographics.TreeArrays(data))
+    person_id = next(iter(tree.people))
+    tree.add_person({"surname": "Петров", "birth_date": "1900"}, parent_id=person_id)
+    tree.remove_person(person_id)
+    result = demographics.compute(demographics.TreeArrays(data))
+    assert result == expected
+    assert result["revision"] != tree.revision
+
+@pytest.mark.parametrize("seed", range(5))
+def test_tree_rows_follow_tree_events(seed):
+    # Строки, поддерживаемые по событиям, совпадают с полным обходом древа
+    import random
+    rng = random.Random(seed)
+    tree = build_tree()
+    stats = FamilyStats(tree)
+    rows = demographics.TreeRows(tree)
+    rows.snapshot()
+    ids = list(tree.people)
+    for step in range(300):
+        operation = rng.random()
+        if operation < 0.3:
+            ids.append(tree.add_person({"surname": rng.choice(("Иванов", "Петров")), "birth_date": "1850"},
+                                       rng.choice(ids)))
+        elif operation < 0.45:
+            tree.link_parent_child(rng.choice(ids), rng.choice(ids))
+        elif operation < 0.6:
+            child_id = rng.choice(ids)
+            if tree.people[child_id]["parents"]:
+                tree.unlink(next(iter(tree.people[child_id]["parents"])), child_id)
+        elif operation < 0.8:
+            tree.edit_person(rng.choice(ids), {"death_date": rng.choice(("", "1900", "ABT 1910")),
+                                               "death_place": rng.choice(("", "Тверь"))})
+        elif operation < 0.95 and len(ids) > 2:
+            tree.remove_person(ids.pop(rng.randrange(len(ids))))
+        elif step % 50 == 0:
+            tree.adopt(build_tree())
+            ids = list(tree.people)
+        if step % 10 == 0:
+            levels = stats.levels()
+            data = rows.snapshot(levels)
+            assert repr(data) == repr(demographics.snapshot(tree, levels))
+            assert demographics.compute(demographics.TreeArrays(data)) == \
+                demographics.compute(demographics.TreeArrays(tree, levels))
@@ -0,0 +1,131 @@
+import pytest
+import duplicates
+from duplicates import find_duplicates, merge_duplicates, phonetic_key, score
+from tree_logic import FamilyTree
+
+
+def person(surname, name, patronymic="", birth="", place="", death=""):
+    return {"surname": surname, "name": name, "patronymic": patronymic, "birth_date": birth,
+            "death_date": death, "birth_place": place}
+
+
+def record(data):
+    tree = FamilyTree()
+    return duplicates._record(tree, tree.add_person(data))
+
+
+def test_phonetic_key():
+    assert phonetic_key("Иванов") == phonetic_key("Ivanoff") == phonetic_key("Иваноф") == phonetic_key("ИВАНОВ")
+    assert phonetic_key("Щукин") == phonetic_key("Shchukin") == phonetic_key("Chukin")
+    assert phonetic_key("Иванов") != phonetic_key("Петров")
+    assert phonetic_key("Иванов Пётр") == phonetic_key("Иванов")  # Только первое слово
+    assert phonetic_key("") == ""
+
+
+@pytest.mark.parametrize("first, second, expected", [
+    (person("Иванов", "Иван", "Петрович", "12 MAR 1850", "Тверь"),
+     person("Иванов", "Иван", "Петрович", "12 MAR 1850", "Тверь"), 1.0),
+    (person("Иванов", "Иван", "Петрович", "12 MAR 1850", "Тверь"),
+     person("Иванов", "Иван", "Петрович", "20 MAR 1850", "Тверь"), 0.8 / 0.9),
+    (person("Иванов", "Иван", "Петрович", "12 MAR 1850"),
+     person("Ivanoff", "Ivan", "Petrovich", "1850"), None),  # Опечатка и диапазон дат — меньше 1, но больше 0
+    # Одного совпадающего ФИО без отчества мало (вес 0.55 < MIN_EVIDENCE)
+    (person("Иванов", "Иван"), person("Иванов", "Иван"), 0.0),
+    (person("Иванов", "Иван", "Петрович"), person("Иванов", "Иван", "Петрович"), 1.0),
+    # Несовместимые даты отсекают пару при любом совпадении имён
+    (person("Иванов", "Иван", "Петрович", "12 MAR 1850"), person("Иванов", "Иван", "Петрович", "12 MAR 1855"), 0.0),
+    (person("Иванов", "Иван", "Петрович", "1850", death="1900"),
+     person("Иванов", "Иван", "Петрович", "1850", death="1870"), 0.0),
+    (person("Иванов", "Иван", "Петрович", "12 MAR 1850"), person("Петров", "Иван", "Петрович", "12 MAR 1850"), 0.0),
+])
+def test_score(first, second, expected):
+    value = score(record(first), record(second))
+    assert value == score(record(second), record(first))
+    if expected is None:
+        assert 0.0 < value < 1.0
+    else:
+        assert value == pytest.approx(expected)
+
+
+def test_find_duplicates_matches_one_to_one():
+    tree = FamilyTree()
+    first = tree.add_person(person("Иванов", "Иван", "Петрович", "12 MAR 1850", "Тверь"))
+    second = tree.add_person(person("Иванов", "Иван", "Петрович", "20 MAR 1850", "Тверь"))
+    tree.add_person(person("Петров", "Иван", "Петрович", "12 MAR 1850", "Тверь"))
+    new_second = tree.add_person(person("Иванов", "Иван", "Петрович", "20 MAR 1850", "Тверь"))
+    new_first = tree.add_person(person("Иванов", "Иван", "Петрович", "12 MAR 1850", "Тверь"))
+    extra = tree.add_person(person("Иванов", "Иван", "Петрович", "12 MAR 1850", "Тверь"))
+    tree.add_person(person("Сидоров", "Иван", "Петрович", "12 MAR 1850", "Тверь"))
+    pairs = find_duplicates(tree, [new_first, new_second, extra, tree.add_person(person("Иванов", "Анна"))])
+    # Каждая существующая персона — в одной паре, с лучшим из совпадений
+    assert sorted((existing_id, value) for _, existing_id, value in pairs) == sorted([(first, 1.0), (second, 1.0)])
+    assert dict((existing_id, new_id) for new_id, existing_id, _ in pairs)[second] == new_second
+    assert len({new_id for new_id, _, _ in pairs}) == 2
+    assert find_duplicates(tree, [new_first], threshold=1.01) == []
+
+
+def test_find_duplicates_compares_only_within_blocks(monkeypatch):
+    compared = []
+
+    def counting_score(first, second):
+        compared.append((first[0], second[0]))
+        return score(first, second)
+    monkeypatch.setattr(duplicates, "score", counting_score)
+    tree = FamilyTree()
+    existing = {
+        "same": tree.add_person(person("Иванов", "Иван", "Петрович", "12 MAR 1850")),
+        "undated": tree.add_person(person("Ivanoff", "Ivan", "Petrovich")),
+        "next_bucket": tree.add_person(person("Иванов", "Иван", "Петрович", "1857")),
+        "far_bucket": tree.add_person(person("Иванов", "Иван", "Петрович", "1880")),
+        "other_surname": tree.add_person(person("Петров", "Иван", "Петрович", "12 MAR 1850")),
+        "other_name": tree.add_person(person("Иванов", "Пётр", "Петрович", "12 MAR 1850")),
+    }
+    new_id = tree.add_person(person("Иванов", "Иван", "Петрович", "12 MAR 1850"))
+    assert [pair[:2] for pair in find_duplicates(tree, [new_id])] == [(new_id, existing["same"])]
+    assert sorted(compared) == sorted((new_id, existing[key]) for key in ("same", "undated", "next_bucket"))
+
+
+def build_tree(size):
+    # Существующие персоны и импортированные копии части из них, с опечатками и сдвигом дат
+    tree = FamilyTree()
+    surnames = ("Иванов", "Петров", "Смирнов", "Кузнецов")
+    names = ("Иван", "Пётр", "Алексей")
+    existing = []
+    for i in range(size):
+        existing.append(tree.add_person(person(surnames[i % 4], names[i % 3], "Петрович",
+                                               f"{1 + i % 28} MAR {1800 + i}", "Тверь")))
+    new_ids = []
+    for i in range(0, size, 2):
+        surname = surnames[i % 4] + ("а" if i % 6 == 0 else "")
+        new_ids.append(tree.add_person(person(surname, names[i % 3], "Петрович",
+                                              f"{1 + (i + i % 3) % 28} MAR {1800 + i}", "Тверь" if i % 4 else "")))
+    return tree, existing, new_ids
+
+
+def test_process_pool_matches_inline(monkeypatch):
+    tree, existing, new_ids = build_tree(40)
+    inline = find_duplicates(tree, new_ids, workers=1)
+    assert len(inline) == len(new_ids)
+    assert {existing_id for _, existing_id, _ in inline} == set(existing[::2])
+    monkeypatch.setattr(duplicates, "INLINE_COMPARISONS", 1)
+    progress = []
+    pooled = find_duplicates(tree, new_ids, workers=2, progress=lambda done, total: progress.append((done, total)))
+    assert sorted(pooled) == sorted(inline)
+    assert progress and progress[-1][0] == progress[-1][1]
+
+
+def test_merge_duplicates_rewires_links():
+    tree = FamilyTree()
+    existing = tree.add_person(person("Иванов", "Иван", "Петрович", "12 MAR 1850"))
+    father = tree.add_person(person("Иванов", "Пётр"))
+    new_id = tree.add_person(person("Иванов", "Иван", "Петрович", "12 MAR 1850", "Тверь"), parent_id=father)
+    child = tree.add_person(person("Иванов", "Сергей", "Иванович"), parent_id=new_id)
+    pairs = find_duplicates(tree, [new_id, father, child])
+    assert [pair[:2] for pair in pairs] == [(new_id, existing)]
+    assert merge_duplicates(tree, pairs + [(new_id, existing, 1.0)]) == 1  # Повторная пара уже не объединяется
+    assert new_id not in tree.people
+    assert tree.people[existing]["birth_place"] == "Тверь"
+    assert set(tree.people[existing]["parents"]) == {father}
+    assert set(tree.people[existing]["children"]) == {child}
+    assert set(tree.people[father]["children"]) == {existing}
+    assert set(tree.people[child]["parents"]) == {existing}
\ No newline at end of file
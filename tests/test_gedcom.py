@@ -0,0 +1,55 @@
+import pytest
+from gedcom_handler import GedcomHandler
+from tree_logic import FamilyTree
+
+HEADER = "0 HEAD\n1 SOUR {source}\n1 CHAR UTF-8\n"
+
+
+def import_text(tmp_path, text):
+    path = tmp_path / "tree.ged"
+    path.write_text(text + "0 TRLR\n", encoding="utf-8")
+    tree = FamilyTree(copy_images=False)
+    GedcomHandler(tree).import_gedcom(str(path))
+    return tree
+
+
+def names(tree):
+    return sorted((person["surname"], person["name"], person["patronymic"]) for person in tree.people.values())
+
+
+def test_export_import_round_trip(tmp_path):
+    tree = FamilyTree(copy_images=False)
+    parent_id = tree.add_person({"surname": "Иванов", "name": "Пётр", "patronymic": "Сергеевич",
+                                 "birth_date": "12 MAR 1850", "birth_place": "Тверь", "notes": "строка 1\nстрока 2"})
+    tree.add_person({"surname": "Иванова", "name": "Мария", "patronymic": "Петровна", "death_date": "ABT 1920"},
+                    parent_id)
+    path = str(tmp_path / "export.ged")
+    GedcomHandler(tree).export_gedcom(path)
+    restored = FamilyTree(copy_images=False)
+    GedcomHandler(restored).import_gedcom(path)
+    assert names(restored) == names(tree)
+    fields = ("birth_date", "birth_place", "death_date", "notes")
+    assert sorted(tuple(person[field] for field in fields) for person in restored.people.values()) == \
+        sorted(tuple(person[field] for field in fields) for person in tree.people.values())
+    assert sum(len(person["children"]) for person in restored.people.values()) == 1
+
+
+@pytest.mark.parametrize("name, given, expected", [
+    ("Иван /Иванов/", "Иван", ("Иванов", "Иван", "")),  # GIVN повторяет имя
+    ("Johnny /Smith/", "John", ("Smith", "Johnny", "")),  # Иное написание имени — не отчество
+    ("John Henry /Smith/", "John Henry", ("Smith", "John Henry", "")),
+    ("Иван Петрович /Иванов/", "Петрович", ("Иванов", "Иван", "Петрович")),  # Имя заканчивается отчеством
+    ("Анна Кузьминична /Иванова/", "Кузьминична", ("Иванова", "Анна", "Кузьминична")),
+    ("John Paul /Smith/", "Paul", ("Smith", "John Paul", "")),  # Второе имя — не отчество
+    ("Иван Пётр /Иванов/", "Пётр", ("Иванов", "Иван Пётр", "")),
+])
+def test_givn_from_other_programs(tmp_path, name, given, expected):
+    tree = import_text(tmp_path, HEADER.format(source="GRAMPS") +
+                       f"0 @I1@ INDI\n1 NAME {name}\n2 GIVN {given}\n")
+    assert names(tree) == [expected]
+
+
+def test_givn_from_matsdrevo_is_patronymic(tmp_path):
+    tree = import_text(tmp_path, HEADER.format(source="MatsDrevo") +
+                       "0 @I1@ INDI\n1 NAME Иван /Иванов/\n2 GIVN Петрович\n")
+    assert names(tree) == [("Иванов", "Иван", "Петрович")]
\ No newline at end of file
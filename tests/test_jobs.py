@@ -0,0 +1,76 @@
+import os
+import threading
+import pytest
+
+pytest.importorskip("PyQt5", reason="фоновые задачи требуют PyQt5")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+from jobs import Job, JobRunner  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def run(func):
+    # Выполнение задачи в текущем потоке; возвращает испущенные сигналы
+    job = Job("test", func)
+    events = []
+    job.signals.finished.connect(lambda result: events.append(("finished", result)))
+    job.signals.failed.connect(lambda error: events.append(("failed", error)))
+    job.signals.cancelled.connect(lambda: events.append(("cancelled",)))
+    job.signals.progress.connect(lambda done, total, stage: events.append(("progress", done, total, stage)))
+    job.run()
+    return events
+
+
+def test_finished(app):
+    assert run(lambda job: job.report(1, 2, "этап") or 42) == [("progress", 1, 2, "этап"), ("finished", 42)]
+
+
+def test_failed(app):
+    def fail(job):
+        raise ValueError("ошибка")
+    assert run(fail) == [("failed", "ошибка")]
+
+
+def test_cancelled_in_report(app):
+    def cancel(job):
+        job.cancel()
+        job.report(1)
+        return 42
+    assert run(cancel) == [("cancelled",)]
+
+
+def test_cancel_after_last_check_drops_result(app):
+    # Отмена после последней точки отмены внутри функции: результат уже не применяется
+    def cancel(job):
+        job.check()
+        job.cancel()
+        return 42
+    assert run(cancel) == [("cancelled",)]
+
+
+def test_runner_cancel_all(app):
+    runner = JobRunner()
+    started = threading.Event()
+    release = threading.Event()
+    events = []
+
+    def wait(job):
+        started.set()
+        release.wait(5)
+        return "первая"
+    runner.submit("first", wait, on_finished=events.append, on_cancelled=lambda: events.append("отменена"))
+    runner.submit("second", lambda job: "вторая", on_finished=events.append,
+                  on_cancelled=lambda: events.append("отменена"))
+    assert started.wait(5)
+    assert runner.is_busy()
+    runner.cancel_all()
+    release.set()
+    runner.wait()
+    app.processEvents()
+    assert events == ["отменена", "отменена"]
+    assert not runner.is_busy()
\ No newline at end of file
@@ -0,0 +1,148 @@
+import os
+import random
+import pytest
+from journal import History, Journal
+from tree_logic import FamilyTree
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # Журнал, изображения и корзина пишутся относительно текущего каталога
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def state(tree):
+    # Содержимое древа без учёта порядка связей
+    return {person_id: dict(person, parents=set(person["parents"]), children=set(person["children"]))
+            for person_id, person in tree.to_dict().items()}
+
+
+def random_action(tree, rng):
+    # Одно случайное изменение древа любого вида
+    ids = list(tree.people)
+    operation = rng.random()
+    if operation < 0.3 or len(ids) < 3:
+        tree.add_person({"surname": rng.choice(("Иванов", "Петрова")), "name": str(rng.random()),
+                         "birth_date": rng.choice(("", "1850", "ABT 1790"))},
+                        parent_id=rng.choice(ids) if ids and rng.random() < 0.5 else None)
+    elif operation < 0.55:
+        tree.link_parent_child(rng.choice(ids), rng.choice(ids))
+    elif operation < 0.7:
+        child_id = rng.choice(ids)
+        if tree.people[child_id]["parents"]:
+            tree.unlink(rng.choice(list(tree.people[child_id]["parents"])), child_id)
+    elif operation < 0.85:
+        tree.edit_person(rng.choice(ids), {"notes": str(rng.random()), "death_date": "1900"})
+    else:
+        tree.remove_person(rng.choice(ids))
+
+
+def recovered(directory="autosave"):
+    # Древо, восстановленное новым экземпляром журнала, как после аварийного завершения
+    journal = Journal(directory)
+    assert journal.has_unfinished_session()
+    tree = FamilyTree()
+    journal.recover(tree)
+    journal.snapshot.detach()
+    return tree
+
+
+@pytest.mark.parametrize("compact_every", [5, 1000])
+def test_replay_after_crash_restores_final_state(compact_every):
+    rng = random.Random(compact_every)
+    tree = FamilyTree()
+    journal = Journal(compact_every=compact_every)
+    journal.start(tree)
+    for _ in range(300):
+        random_action(tree, rng)
+    # Без close(): журнал и снимок остаются, как после сбоя
+    assert state(recovered()) == state(tree)
+
+
+def test_replay_ignores_truncated_last_line():
+    tree = FamilyTree()
+    journal = Journal()
+    journal.start(tree)
+    tree.add_person({"name": "Иван"})
+    expected = state(tree)
+    with open(journal.journal_path, "a", encoding="utf-8") as f:
+        f.write('[2, "add", "x", {"na')
+    assert state(recovered()) == expected
+
+
+def test_compact_and_prepared_snapshot_leave_readable_journal():
+    rng = random.Random(1)
+    tree = FamilyTree()
+    journal = Journal()
+    journal.start(tree)
+    for _ in range(50):
+        random_action(tree, rng)
+    journal.compact()
+    for _ in range(50):
+        random_action(tree, rng)
+    assert state(recovered()) == state(tree)
+
+    # Замена древа с заранее записанным снимком, затем новые правки поверх него
+    new_tree = FamilyTree()
+    for _ in range(80):
+        random_action(new_tree, rng)
+    journal.prepare_snapshot(new_tree)
+    tree.adopt(new_tree)
+    assert not os.path.exists(journal.snapshot.path + ".new")
+    for _ in range(30):
+        random_action(tree, rng)
+    assert state(recovered()) == state(tree)
+
+
+def test_undo_and_redo_are_exact():
+    rng = random.Random(2)
+    tree = FamilyTree()
+    history = History(tree, limit=1000)
+    states = [state(tree)]
+    for _ in range(200):
+        with history.action():
+            random_action(tree, rng)
+        if state(tree) != states[-1]:
+            states.append(state(tree))
+    for expected in reversed(states[:-1]):
+        assert history.undo()
+        assert state(tree) == expected
+    assert not history.can_undo()
+    for expected in states[1:]:
+        assert history.redo()
+        assert state(tree) == expected
+    assert not history.can_redo()
+
+
+def test_undo_remove_restores_image(workdir):
+    source = workdir / "photo.jpg"
+    source.write_bytes(b"jpeg")
+    tree = FamilyTree()
+    history = History(tree)
+    person_id = tree.add_person({"name": "Иван", "image_path": str(source)})
+    image_path = tree.people[person_id]["image_path"]
+    with history.action():
+        tree.remove_person(person_id)
+    assert not os.path.exists(image_path)
+
+    history.undo()
+    assert tree.people[person_id]["image_path"] == image_path
+    with open(image_path, "rb") as f:
+        assert f.read() == b"jpeg"
+    history.redo()
+    assert person_id not in tree.people and not os.path.exists(image_path)
+
+def test_prepared_snapshot_of_discarded_tree_is_not_used():
+    # Загрузка подготовила снимок, но была отменена; следующий reset — очистка текущего древа
+    tree = FamilyTree()
+    journal = Journal()
+    journal.start(tree)
+    tree.add_person({"name": "Иван"})
+    discarded = FamilyTree()
+    discarded.add_person({"name": "Чужой"})
+    journal.prepare_snapshot(discarded)
+    tree.clear()
+    tree.add_person({"name": "Пётр"})
+    assert state(recovered()) == state(tree)
+    assert not os.path.exists(journal.snapshot.path + ".new")
\ No newline at end of file
@@ -0,0 +1,128 @@
+import pytest
+from kinship import Kinship, kinship_name
+from tree_logic import FamilyTree
+
+
+@pytest.mark.parametrize("up, down, sex, expected", [
+    (0, 0, "M", "тот же человек"),
+    (1, 0, "F", "мать"),
+    (0, 1, "M", "сын"),
+    (2, 0, "M", "дед"),
+    (3, 0, "F", "прабабушка"),
+    (4, 0, "M", "прапрадед"),
+    (0, 2, "F", "внучка"),
+    (0, 4, "M", "праправнук"),
+    (1, 1, "F", "сестра"),
+    (2, 2, "M", "двоюродный брат"),
+    (3, 3, "F", "троюродная сестра"),
+    (4, 4, "M", "четвероюродный брат"),
+    (11, 11, "M", "11-юродный брат"),
+    (1, 2, "M", "племянник"),
+    (2, 1, "F", "тётя"),
+    (2, 3, "F", "двоюродная племянница"),
+    (3, 2, "M", "двоюродный дядя"),
+    (1, 3, "M", "внучатый племянник"),
+    (1, 4, "F", "правнучатая племянница"),
+    (2, 4, "M", "двоюродный внучатый племянник"),
+    (3, 1, "M", "двоюродный дед"),
+    (4, 1, "F", "двоюродная прабабушка"),
+    (4, 2, "M", "троюродный дед"),
+    (1, 1, None, "брат или сестра"),
+    (2, 0, None, "дед или бабушка"),
+])
+def test_kinship_name(up, down, sex, expected):
+    assert kinship_name(up, down, sex) == expected
+
+
+@pytest.mark.parametrize("kind, expected", [("full", "родной брат"), ("paternal", "единокровный брат"),
+                                            ("maternal", "единоутробный брат"), ("half", "неполнородный брат")])
+def test_sibling_kinds(kind, expected):
+    assert kinship_name(1, 1, "M", kind) == expected
+
+
+@pytest.fixture
+def family():
+    # Три поколения потомков Петра и Анны; Сергей женат на двоюродной сестре Елене
+    tree = FamilyTree()
+
+    def person(name, patronymic, *parents):
+        person_id = tree.add_person({"surname": "Смирнов", "name": name, "patronymic": patronymic})
+        for parent_id in parents:
+            tree.link_parent_child(parent_id, person_id)
+        return person_id
+    p = {}
+    p["Пётр"] = person("Пётр", "Иванович")
+    p["Анна"] = person("Анна", "Фёдоровна")
+    p["Варвара"] = person("Варвара", "Ильинична")  # Вторая жена Петра
+    p["Николай"] = person("Николай", "Павлович")  # Муж Марии, предков в древе нет
+    p["Иван"] = person("Иван", "Петрович", p["Пётр"], p["Анна"])
+    p["Мария"] = person("Мария", "Петровна", p["Пётр"], p["Анна"])
+    p["Кирилл"] = person("Кирилл", "Петрович", p["Пётр"], p["Варвара"])
+    p["Сергей"] = person("Сергей", "Иванович", p["Иван"])
+    p["Ольга"] = person("Ольга", "Ивановна", p["Иван"])
+    p["Дмитрий"] = person("Дмитрий", "Николаевич", p["Мария"], p["Николай"])
+    p["Елена"] = person("Елена", "Николаевна", p["Мария"], p["Николай"])
+    p["Алексей"] = person("Алексей", "Сергеевич", p["Сергей"], p["Елена"])  # Брак двоюродных
+    p["Никита"] = person("Никита", "Юрьевич", p["Ольга"])
+    p["Татьяна"] = person("Татьяна", "Дмитриевна", p["Дмитрий"])
+    return tree, p
+
+
+@pytest.mark.parametrize("first, second, expected", [
+    ("Алексей", "Пётр", "прадед"),
+    ("Пётр", "Алексей", "правнук"),
+    ("Алексей", "Мария", "бабушка"),  # Через мать; через отца — двоюродная бабушка
+    ("Алексей", "Ольга", "тётя"),
+    ("Ольга", "Алексей", "племянник"),
+    ("Алексей", "Никита", "двоюродный брат"),
+    ("Сергей", "Елена", "двоюродная сестра"),
+    ("Никита", "Татьяна", "троюродная сестра"),
+    ("Иван", "Дмитрий", "племянник"),
+    ("Дмитрий", "Иван", "дядя"),
+    ("Иван", "Татьяна", "внучатая племянница"),
+    ("Татьяна", "Иван", "двоюродный дед"),
+    ("Елена", "Никита", "двоюродный племянник"),
+    ("Иван", "Мария", "родная сестра"),
+    ("Иван", "Кирилл", "единокровный брат"),
+    ("Мария", "Николай", "супруг"),
+    ("Николай", "Пётр", "не родственники"),
+])
+def test_relationship(family, first, second, expected):
+    tree, p = family
+    assert Kinship(tree).relationship(p[first], p[second])["name"] == expected
+
+
+def test_pedigree_collapse_counts_ancestors_once(family):
+    tree, p = family
+    kinship = Kinship(tree)
+    ancestors = kinship.ancestors(p["Алексей"])
+    assert ancestors[p["Пётр"]] == 3 and ancestors[p["Анна"]] == 3
+    assert ancestors[p["Мария"]] == 2  # Кратчайший путь — через мать
+    result = kinship.relationship(p["Алексей"], p["Пётр"])
+    assert (result["up"], result["down"]) == (3, 0)
+    assert kinship.relationship(p["Сергей"], p["Елена"])["ancestors"] == sorted((p["Пётр"], p["Анна"]))
+
+
+def test_matrix_matches_pairwise_search(family):
+    tree, p = family
+    ids = list(p.values())
+    matrix = Kinship(tree).matrix(ids)
+    search = Kinship(tree)
+    for i, first_id in enumerate(ids):
+        for j, second_id in enumerate(ids):
+            assert matrix[i][j] == search.relationship(first_id, second_id), (first_id, second_id)
+
+
+def test_cache_follows_links(family):
+    tree, p = family
+    kinship = Kinship(tree)
+    assert kinship.relationship(p["Ольга"], p["Никита"])["name"] == "сын"
+    kinship.matrix([p["Никита"], p["Иван"]])
+    tree.unlink(p["Ольга"], p["Никита"])
+    assert kinship.relationship(p["Ольга"], p["Никита"])["name"] == "не родственники"
+    assert kinship.matrix([p["Никита"], p["Иван"]])[0][1]["name"] == "не родственники"
+    tree.link_parent_child(p["Ольга"], p["Никита"])
+    assert kinship.relationship(p["Ольга"], p["Никита"])["name"] == "сын"
+    assert kinship.matrix([p["Никита"], p["Иван"]])[0][1]["name"] == "дед"
+    tree.edit_person(p["Никита"], {"patronymic": "Юрьевна", "name": "Ника"})
+    assert kinship.relationship(p["Ольга"], p["Никита"])["name"] == "дочь"
\ No newline at end of file
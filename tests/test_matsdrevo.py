@@ -0,0 +1,49 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+import matsdrevo
+from matsdrevo import load_tree, main
+from synthetic import write_json
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def test_load_tree_does_not_copy_images(tmp_path):
+    # Команды только читают файл: папка images не создаётся, путь изображения остаётся прежним
+    photo = tmp_path / "photo.jpg"
+    photo.write_bytes(b"jpeg")
+    gedcom = tmp_path / "tree.ged"
+    gedcom.write_text("0 HEAD\n1 CHAR UTF-8\n0 @I1@ INDI\n1 NAME Иван /Иванов/\n1 OBJE\n2 FILE " + str(photo) +
+                      "\n0 TRLR\n", encoding="utf-8")
+    tree = load_tree(str(gedcom))
+    assert [person["image_path"] for person in tree.people.values()] == [str(photo)]
+    assert not os.path.exists("images")
+
+
+def test_stats_output_has_no_revision(tmp_path, capsys):
+    pytest.importorskip("numpy")
+    write_json(str(tmp_path / "tree.json"), 50)
+    assert main(["stats", str(tmp_path / "tree.json"), "--jobs", "1"]) == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result["persons"] == 50
+    assert "revision" not in result["statistics"]["demographics"]
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_closed_output_exits_quietly(tmp_path, jobs):
+    # Читатель закрыл вывод до первой строки, как `head`, получивший всё нужное
+    paths = [str(tmp_path / f"tree{i}.json") for i in range(4)]
+    for path in paths:
+        write_json(path, 20)
+    process = subprocess.Popen([sys.executable, matsdrevo.__file__, "validate", *paths, "--jobs", jobs],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    process.stdout.close()
+    stderr = process.stderr.read()
+    process.stderr.close()
+    assert process.wait(60) in (0, 1)
+    assert stderr == b""
@@ -0,0 +1,65 @@
+import os
+import random
+import pytest
+
+pytest.importorskip("PyQt5", reason="модель таблицы требует PyQt5")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtTest import QAbstractItemModelTester  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+from persons_model import BATCH_ROW_EVENTS, PersonsModel  # noqa: E402
+from tree_logic import FamilyTree  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def assert_rows_match(tree, model):
+    # Строки модели — персоны древа в порядке добавления, поиск строки по ID согласован
+    assert model.rowCount() == len(tree.people)
+    assert [model.person_id(row) for row in range(model.rowCount())] == list(tree.people)
+    assert all(model.row_of(person_id) == row for row, person_id in enumerate(tree.people))
+
+
+def random_edits(rng, tree, ids, count):
+    for _ in range(count):
+        operation = rng.random()
+        if operation < 0.4 or len(ids) < 2:
+            ids.append(tree.add_person({"name": "Новый"}))
+        elif operation < 0.6:
+            tree.edit_person(rng.choice(ids), {"surname": "Петров"})
+        else:
+            tree.remove_person(ids.pop(rng.randrange(len(ids))))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rows_follow_tree(app, seed):
+    rng = random.Random(seed)
+    tree = FamilyTree()
+    ids = [tree.add_person({"name": f"П{number}"}) for number in range(30)]
+    model = PersonsModel(tree)
+    QAbstractItemModelTester(model, QAbstractItemModelTester.FailureReportingMode.Fatal, model)
+    for _ in range(25):
+        if rng.random() < 0.5:
+            random_edits(rng, tree, ids, rng.randrange(1, 5))
+        else:
+            with tree.batch():  # Короткий пакет — сигналы по строкам, длинный — сброс модели
+                random_edits(rng, tree, ids, rng.choice((3, 10, BATCH_ROW_EVENTS + 5)))
+        assert_rows_match(tree, model)
+
+
+def test_bulk_removal_in_batch(app):
+    # Удаления пакета: строки удаляются с конца, каждая — своим сигналом
+    tree = FamilyTree()
+    ids = [tree.add_person({"name": f"П{number}"}) for number in range(1000)]
+    model = PersonsModel(tree)
+    assert_rows_match(tree, model)
+    removed_rows = []
+    model.rowsAboutToBeRemoved.connect(lambda parent, first, last: removed_rows.append((first, last)))
+    with tree.batch():
+        for person_id in ids[10:110:2]:
+            tree.remove_person(person_id)
+    assert removed_rows == [(row, row) for row in range(108, 9, -2)]
+    assert_rows_match(tree, model)
\ No newline at end of file
@@ -0,0 +1,51 @@
+import pytest
+from project_store import ProjectStore
+from tree_logic import FamilyTree
+
+
+def normalized(tree):
+    # Порядок связей в файле проекта — по ключам, поэтому сравниваются множества
+    return {person_id: dict(person, parents=set(person["parents"]), children=set(person["children"]))
+            for person_id, person in tree.to_dict().items()}
+
+
+def read(path):
+    tree = FamilyTree()
+    ProjectStore(path).read(tree)
+    return normalized(tree)
+
+
+@pytest.fixture
+def project(tmp_path):
+    tree = FamilyTree()
+    parent_id = tree.add_person({"surname": "Иванов", "name": "Пётр"})
+    tree.add_person({"name": "Иван"}, parent_id=parent_id)
+    store = ProjectStore(str(tmp_path / "tree.mdrevo"))
+    store.attach(tree)
+    store.save()
+    return tree, store
+
+
+def test_edits_after_snapshot_are_written_next_time(project):
+    # Изменения, сделанные пока копия пишется в фоне, не теряются
+    tree, store = project
+    person_id = next(iter(tree.people))
+    tree.edit_person(person_id, {"surname": "Петров"})
+    changes = store.changes()
+    tree.edit_person(person_id, {"surname": "Сидоров"})
+    new_id = tree.add_person({"name": "Анна"}, parent_id=person_id)
+    store.write(changes)
+    assert read(store.path)[person_id]["surname"] == "Петров"
+    assert store.is_modified()
+    store.save()
+    assert read(store.path) == normalized(tree)
+    assert new_id in read(store.path)
+
+
+def test_failed_write_forces_full_save(project):
+    tree, store = project
+    tree.remove_person(next(iter(tree.people)))
+    store.changes()  # Копия потеряна: запись не состоялась
+    store.mark_modified()
+    store.save()
+    assert read(store.path) == normalized(tree)
\ No newline at end of file
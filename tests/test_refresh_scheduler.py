@@ -0,0 +1,86 @@
+import os
+import pytest
+
+pytest.importorskip("PyQt5", reason="планировщик обновлений требует PyQt5")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QEventLoop, QTimer  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+from refresh_scheduler import RefreshScheduler  # noqa: E402
+from tree_logic import FamilyTree  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def spin(milliseconds=50):
+    # Прокрутка цикла событий, чтобы сработали таймеры планировщика
+    loop = QEventLoop()
+    QTimer.singleShot(milliseconds, loop.quit)
+    loop.exec_()
+
+
+@pytest.fixture
+def views(app):
+    tree = FamilyTree()
+    scheduler = RefreshScheduler(tree)
+    calls = {"tree": 0, "table": 0, "stats": 0, "scale": 0}
+    visible = {"stats": False}
+
+    def counter(name):
+        def refresh():
+            calls[name] += 1
+        return refresh
+
+    scheduler.register("tree", counter("tree"))
+    scheduler.register("table", counter("table"))
+    scheduler.register("stats", counter("stats"), lambda: visible["stats"])
+    scheduler.register("scale", counter("scale"), tree_view=False)
+    return tree, scheduler, calls, visible
+
+
+def test_batch_gives_one_flush_per_view(views):
+    tree, scheduler, calls, visible = views
+    with tree.batch():
+        parent_id = tree.add_person({"name": "Пётр"})
+        for number in range(20):
+            tree.add_person({"name": f"Ребёнок {number}"}, parent_id)
+        scheduler.mark("table", "scale")
+        spin()  # Внутри пакета обновлений нет, даже если цикл событий крутится
+        assert calls == {"tree": 0, "table": 0, "stats": 0, "scale": 0}
+    spin()
+    assert calls == {"tree": 1, "table": 1, "stats": 0, "scale": 1}
+
+
+def test_marks_between_ticks_are_coalesced(views):
+    tree, scheduler, calls, visible = views
+    for number in range(10):
+        tree.add_person({"name": f"П{number}"})
+        scheduler.mark("tree")
+    spin()
+    assert calls["tree"] == 1 and calls["table"] == 1
+    assert calls["scale"] == 0  # Не зависит от древа
+
+
+def test_hidden_view_is_refreshed_when_shown(views):
+    tree, scheduler, calls, visible = views
+    tree.add_person({"name": "Пётр"})
+    tree.add_person({"name": "Павел"})
+    spin()
+    assert calls["stats"] == 0 and scheduler.is_dirty("stats")
+    visible["stats"] = True
+    scheduler.flush()  # Вызывается при смене вкладки
+    scheduler.flush()
+    assert calls["stats"] == 1 and not scheduler.is_dirty("stats")
+
+
+def test_delayed_marks_settle_into_one_refresh(views):
+    tree, scheduler, calls, visible = views
+    for _ in range(5):
+        scheduler.mark("scale", delay=30)
+        spin(10)
+    assert calls["scale"] == 0
+    spin(100)
+    assert calls["scale"] == 1
\ No newline at end of file
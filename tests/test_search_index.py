@@ -0,0 +1,130 @@
+import random
+
+import pytest
+from search_index import FUZZY_WEIGHT, SearchIndex, edit_distance, max_edits, normalize
+from tree_logic import FamilyTree
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Ёлкин", ["elkin"]),
+    ("елкин", ["elkin"]),
+    ("Yolkin", ["elkin"]),
+    ("ЁЛКИН Пётр", ["elkin", "petr"]),
+    ("Щукина-Юрьевна", ["shchukina", "iurevna"]),
+    ("Yakovlev, Jurij", ["iakovlev", "iurii"]),
+    ("Яковлев Юрий", ["iakovlev", "iurii"]),
+    ("  ", []),
+])
+def test_normalize(text, expected):
+    assert normalize(text) == expected
+
+
+@pytest.mark.parametrize("a, b, limit, expected", [
+    ("ivanov", "ivanov", 2, 0),
+    ("ivanov", "ivonov", 2, 1),
+    ("ivanov", "ivnaov", 1, 1),  # Перестановка соседних букв — одна правка
+    ("ivanov", "ivanova", 1, 1),
+    ("kitten", "sitting", 5, 3),
+    ("kitten", "sitting", 2, 3),  # Больше предела — limit + 1
+    ("abc", "abcdef", 1, 2),
+])
+def test_edit_distance(a, b, limit, expected):
+    assert edit_distance(a, b, limit) == expected
+
+
+@pytest.mark.parametrize("term, expected", [("ivo", 0), ("ivan", 1), ("ivanov", 1), ("ivanova", 2)])
+def test_max_edits(term, expected):
+    assert max_edits(term) == expected
+
+
+def build_tree():
+    tree = FamilyTree()
+    ids = {}
+    for key, surname, name, place in (("ivanov", "Иванов", "Иван", "Тверь"),
+                                      ("ivanova", "Иванова", "Мария", ""),
+                                      ("ivonov", "Ивонов", "Пётр", ""),
+                                      ("elkin", "Ёлкин", "Пётр", "Москва"),
+                                      ("smirnova", "Смирнова", "Анна", "Тверь"),
+                                      ("petrov", "Петров", "Иван", "")):
+        ids[key] = tree.add_person({"surname": surname, "name": name, "birth_place": place})
+    return tree, ids
+
+
+def test_fuzzy():
+    tree, ids = build_tree()
+    index = SearchIndex(tree)
+    index.rebuild()
+    assert index._fuzzy("ivnaov") == {"ivanov": FUZZY_WEIGHT}  # До «ivonov» две правки
+    assert index._fuzzy("smrinovs") == {"smirnova": FUZZY_WEIGHT - 0.2}
+    assert index._fuzzy("ivanov") == {"ivanova": FUZZY_WEIGHT, "ivonov": FUZZY_WEIGHT}  # Точный ключ не входит
+    assert index._fuzzy("petr") == {}
+    assert index._fuzzy("ivn") == {}  # В коротких словах опечатки не ищутся
+
+
+def test_search_folds_spelling():
+    tree, ids = build_tree()
+    index = SearchIndex(tree)
+    for query in ("Ёлкин", "елкин", "Yolkin", "ELKIN"):
+        assert index.search(query) == [ids["elkin"]]
+    assert index.search("Москва") == [ids["elkin"]]
+
+
+def test_search_prefix_only_on_last_word():
+    tree, ids = build_tree()
+    index = SearchIndex(tree)
+    assert index.search("Иван Пет") == [ids["petrov"]]
+    assert index.search("Пет Иван") == []
+    assert set(index.search("Ив")) == {ids["ivanov"], ids["ivanova"], ids["ivonov"], ids["petrov"]}
+
+
+def test_search_ranks_exact_prefix_and_fuzzy():
+    tree, ids = build_tree()
+    index = SearchIndex(tree)
+    assert index.search("Иванов") == [ids["ivanov"], ids["ivanova"], ids["ivonov"]]
+    assert index.search("Иванов", limit=1) == [ids["ivanov"]]
+    assert index.search("Иванов Тверь") == [ids["ivanov"]]
+    assert index.search("Смринова") == [ids["smirnova"]]
+    assert index.search("") == []
+    assert index.search("Сидоров") == []
+
+
+def test_describe():
+    tree = FamilyTree()
+    person_id = tree.add_person({"surname": "Иванов", "name": "Иван", "birth_date": "1850",
+                                 "death_date": "1900", "birth_place": "Тверь"})
+    assert SearchIndex(tree).describe(person_id) == "Иванов Иван · 1850 – 1900 · Тверь"
+
+
+def index_state(index):
+    return (index._tokens, {token: ids for token, ids in index._postings.items() if ids},
+            {gram: tokens for gram, tokens in index._trigrams.items() if tokens}, index._vocabulary)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_updates_match_rebuild(seed):
+    # Индекс, обновляемый по событиям, совпадает с построенным заново
+    rng = random.Random(seed)
+    tree, ids = build_tree()
+    ids = list(ids.values())
+    index = SearchIndex(tree)
+    index.search("Иван")
+    surnames = ("Иванов", "Иванова", "Ёлкин", "Yolkin", "Смирнов", "Петров", "")
+    for step in range(300):
+        operation = rng.random()
+        if operation < 0.35:
+            ids.append(tree.add_person({"surname": rng.choice(surnames), "name": rng.choice(("Иван", "Анна"))},
+                                       rng.choice(ids) if ids else None))
+        elif operation < 0.7 and ids:
+            tree.edit_person(rng.choice(ids), {"surname": rng.choice(surnames),
+                                               "notes": rng.choice(("", "жил в Твери", "Тверь"))})
+        elif operation < 0.95 and ids:
+            tree.remove_person(ids.pop(rng.randrange(len(ids))))
+        elif step % 50 == 0:
+            tree.adopt(build_tree()[0])
+            ids = list(tree.people)
+        if step % 10 == 0:
+            query = rng.choice(("Иван", "Ёлкин", "Иваноф", "Анна Тве", "Смир"))
+            found = index.search(query)
+            fresh = SearchIndex(tree)
+            assert sorted(found) == sorted(fresh.search(query))
+            assert index_state(index) == index_state(fresh)
\ No newline at end of file
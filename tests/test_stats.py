@@ -0,0 +1,59 @@
+import random
+import pytest
+from stats import FamilyStats
+from tree_logic import FamilyTree
+
+DATES = ("", "1850", "ABT 1790", "12 MAR 1901", "1850/51", "BEF 1700", "непонятно")
+
+
+def random_person(rng):
+    return {"surname": rng.choice(("Иванов", "Петрова", "")), "name": rng.choice(("Иван", "Мария")),
+            "birth_date": rng.choice(DATES), "death_date": rng.choice(DATES)}
+
+
+def assert_same_as_recompute(tree, stats):
+    fresh = FamilyStats(tree)
+    tree.unsubscribe(fresh._on_tree_changed)
+    expected = fresh.get_statistics()
+    actual = stats.get_statistics()
+    assert actual == dict(expected, average_age=pytest.approx(expected["average_age"]))
+    assert stats.levels() == fresh.levels()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_statistics_match_recompute(seed):
+    # Случайная последовательность правок, в том числе связей, замыкающих циклы
+    rng = random.Random(seed)
+    tree = FamilyTree()
+    stats = FamilyStats(tree)
+    ids = []
+    for _ in range(600):
+        operation = rng.random()
+        if operation < 0.25 or len(ids) < 3:
+            ids.append(tree.add_person(random_person(rng)))
+        elif operation < 0.6:
+            tree.link_parent_child(rng.choice(ids), rng.choice(ids))
+        elif operation < 0.75:
+            child_id = rng.choice(ids)
+            parents = list(tree.people[child_id]["parents"])
+            if parents:
+                tree.unlink(rng.choice(parents), child_id)
+        elif operation < 0.9:
+            tree.edit_person(rng.choice(ids), random_person(rng))
+        else:
+            person_id = ids.pop(rng.randrange(len(ids)))
+            tree.remove_person(person_id)
+        assert_same_as_recompute(tree, stats)
+
+
+def test_cycle_link_is_counted_and_removed():
+    tree = FamilyTree()
+    stats = FamilyStats(tree)
+    first = tree.add_person({"name": "A"})
+    second = tree.add_person({"name": "B"}, parent_id=first)
+    tree.link_parent_child(second, first)
+    assert stats.get_statistics()["cycle_links"] == 1
+    assert_same_as_recompute(tree, stats)
+    tree.unlink(second, first)
+    assert stats.get_statistics()["cycle_links"] == 0
+    assert_same_as_recompute(tree, stats)
\ No newline at end of file
@@ -0,0 +1,17 @@
+import pytest
+from dates import parse_date
+from synthetic import generate_people
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_generate_people_is_consistent(seed):
+    people = generate_people(20000, seed=seed)
+    assert people == generate_people(20000, seed=seed)  # Воспроизводимость
+    for person_id, person in people.items():
+        for child_id in person["children"]:
+            assert person_id in people[child_id]["parents"]
+        birth = parse_date(person["birth_date"]) if person["birth_date"] else None
+        death = parse_date(person["death_date"]) if person["death_date"] else None
+        if birth and death:
+            # Смерть не раньше рождения, в том числе для умерших в год рождения
+            assert death.low >= birth.low and death.key >= birth.key, (person["birth_date"], person["death_date"])
\ No newline at end of file
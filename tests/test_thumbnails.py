@@ -0,0 +1,162 @@
+import json
+import os
+import pytest
+
+pytest.importorskip("PyQt5", reason="миниатюры требуют PyQt5")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtGui import QColor, QImage, QPixmapCache  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+import thumbnails  # noqa: E402
+from thumbnails import THUMBNAIL_SIZES, ThumbnailCache, content_hash  # noqa: E402
+from tree_logic import FamilyTree  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def calls(app, tmp_path, monkeypatch):
+    # Каталог миниатюр во временной папке; счётчики фоновых задач и вычислений хэша
+    monkeypatch.chdir(tmp_path)
+    QPixmapCache.clear()
+    counts = {"jobs": 0, "hashes": 0}
+
+    class CountingJob(thumbnails._ThumbnailJob):
+        def __init__(self, *args):
+            counts["jobs"] += 1
+            super().__init__(*args)
+
+    def counting_hash(path):
+        counts["hashes"] += 1
+        return content_hash(path)
+    monkeypatch.setattr(thumbnails, "_ThumbnailJob", CountingJob)
+    monkeypatch.setattr(thumbnails, "content_hash", counting_hash)
+    yield counts
+    QPixmapCache.clear()
+    QPixmapCache.setCacheLimit(64 * 1024)
+
+
+def image(path, color="red", width=400, height=300):
+    picture = QImage(width, height, QImage.Format_RGB32)
+    picture.fill(QColor(color))
+    assert picture.save(str(path))
+    return str(path)
+
+
+def wait(cache):
+    # Завершение фоновых задач и доставка их сигналов в поток интерфейса
+    cache._pool.waitForDone()
+    QApplication.processEvents()
+
+
+def test_thumbnail_is_loaded_in_background(calls, tmp_path):
+    cache = ThumbnailCache()
+    ready = []
+    cache.thumbnail_ready.connect(ready.append)
+    path = image(tmp_path / "a.png")
+    assert cache.get(path) is None
+    wait(cache)
+    assert ready == [path]
+    pixmap = cache.get(path)
+    assert max(pixmap.width(), pixmap.height()) == THUMBNAIL_SIZES[0]
+    assert calls == {"jobs": 1, "hashes": 1}
+    # Все размеры записаны на диск по хэшу содержимого
+    for size in THUMBNAIL_SIZES:
+        assert os.path.exists(os.path.join(cache.store_dir, f"{content_hash(path)}_{size}.png"))
+
+
+def test_same_content_is_stored_once(calls, tmp_path):
+    cache = ThumbnailCache()
+    first = image(tmp_path / "a.png", "blue")
+    second = str(tmp_path / "copy.png")
+    with open(first, "rb") as source, open(second, "wb") as copy:
+        copy.write(source.read())
+    cache.get(first)
+    cache.get(second)
+    wait(cache)
+    assert cache.get(first) is not None and cache.get(second) is not None
+    assert len([name for name in os.listdir(cache.store_dir) if name.endswith(".png")]) == len(THUMBNAIL_SIZES)
+
+
+def test_index_is_flushed_once_and_reused(calls, tmp_path):
+    cache = ThumbnailCache()
+    paths = [image(tmp_path / f"{number}.png", color) for number, color in enumerate(("red", "green", "blue"))]
+    for path in paths:
+        cache.get(path)
+    wait(cache)
+    assert not os.path.exists(cache.index_path)  # Запись отложена
+    assert cache._save_timer.isActive()
+    cache.flush()
+    with open(cache.index_path, encoding="utf-8") as f:
+        assert set(json.load(f)) == set(paths)
+    assert not cache._save_timer.isActive()
+    # Новый сеанс: хэш берётся из индекса, миниатюра — из файла без повторного хэширования
+    QPixmapCache.clear()
+    hashes = calls["hashes"]
+    restarted = ThumbnailCache()
+    restarted.get(paths[0])
+    wait(restarted)
+    assert restarted.get(paths[0]) is not None
+    assert calls["hashes"] == hashes
+
+
+def test_changed_file_is_hashed_again(calls, tmp_path):
+    cache = ThumbnailCache()
+    path = image(tmp_path / "a.png", "red")
+    cache.get(path)
+    wait(cache)
+    old_hash = cache._index[path][2]
+    image(tmp_path / "a.png", "yellow", 300, 300)
+    os.utime(path, ns=(1, 1))  # Другое время изменения при любой точности файловой системы
+    cache._checked.discard(path)
+    assert cache.get(path) is None
+    wait(cache)
+    assert cache._index[path][2] != old_hash
+    assert calls["hashes"] == 2
+
+
+def test_evicted_thumbnail_is_reloaded_from_disk(calls, tmp_path):
+    cache = ThumbnailCache(budget_bytes=24 * 1024)  # Около двух миниатюр 50×50
+    paths = [image(tmp_path / f"{number}.png", color)
+             for number, color in enumerate(("red", "green", "blue", "gray", "cyan"))]
+    for path in paths:
+        cache.get(path)
+        wait(cache)
+    assert cache.get(paths[-1]) is not None
+    assert cache.get(paths[0]) is None  # Вытеснена из памяти
+    wait(cache)
+    assert cache.get(paths[0]) is not None
+    assert calls["hashes"] == len(paths)
+
+
+def test_failed_decode_releases_pending_key(calls, tmp_path):
+    cache = ThumbnailCache()
+    path = str(tmp_path / "broken.png")
+    with open(path, "wb") as f:
+        f.write(b"not an image")
+    assert cache.get(path) is None
+    wait(cache)
+    assert not cache._pending
+    jobs = calls["jobs"]
+    assert cache.get(path) is None  # Тот же файл повторно не декодируется
+    assert calls["jobs"] == jobs
+    image(path)
+    os.utime(path, ns=(1, 1))
+    assert cache.get(path) is None  # Файл изменился — новая попытка
+    wait(cache)
+    assert cache.get(path) is not None
+
+
+def test_edit_without_new_image_does_not_reload(calls, tmp_path):
+    cache = ThumbnailCache()
+    tree = FamilyTree(copy_images=False)
+    cache.watch(tree)
+    person_id = tree.add_person({"name": "Иван", "image_path": image(tmp_path / "a.png")})
+    wait(cache)
+    assert calls == {"jobs": 1, "hashes": 1}
+    tree.edit_person(person_id, {"name": "Пётр", "birth_date": "1850"})
+    wait(cache)
+    assert calls == {"jobs": 1, "hashes": 1}
\ No newline at end of file
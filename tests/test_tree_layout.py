@@ -0,0 +1,114 @@
+import random
+from collections import defaultdict
+
+import pytest
+from synthetic import build_tree
+from tree_layout import TreeLayout, tidy_tree_x
+from tree_logic import FamilyTree
+
+
+def random_children(rng, size):
+    # Случайное упорядоченное дерево: каждый узел, кроме корня, — ребёнок одного из предыдущих
+    children = [[] for _ in range(size)]
+    for node in range(1, size):
+        children[rng.randrange(max(0, node - rng.choice((1, 5, node))), node)].append(node)
+    return children
+
+
+def depths(children):
+    depth = [0] * len(children)
+    for node, node_children in enumerate(children):
+        for child in node_children:
+            depth[child] = depth[node] + 1
+    return depth
+
+
+def test_tidy_tree_small():
+    assert tidy_tree_x([[]]) == [0.0]
+    assert tidy_tree_x([[1, 2, 3], [], [], []]) == [0.0, -1.0, 0.0, 1.0]
+    assert tidy_tree_x([[1, 2], [3, 4], [], [], []], distance=2.0) == [0.0, -1.0, 1.0, -2.0, 0.0]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_tidy_tree_properties(seed):
+    rng = random.Random(seed)
+    children = random_children(rng, rng.randrange(2, 300))
+    distance = rng.choice((1.0, 2.5))
+    x = tidy_tree_x(children, distance=distance)
+    levels = defaultdict(list)
+    for node, depth in enumerate(depths(children)):
+        levels[depth].append(node)
+    for nodes in levels.values():
+        # Узлы одного поколения не перекрываются, порядок братьев и сестёр сохраняется
+        ordered = sorted(x[node] for node in nodes)
+        assert all(b - a >= distance - 1e-9 for a, b in zip(ordered, ordered[1:]))
+    for node, node_children in enumerate(children):
+        assert all(x[a] < x[b] for a, b in zip(node_children, node_children[1:]))
+        if node_children:
+            # Родитель — над серединой между крайними детьми
+            assert x[node] == pytest.approx((x[node_children[0]] + x[node_children[-1]]) / 2)
+
+
+def test_tidy_tree_deep_chain():
+    size = 20000
+    x = tidy_tree_x([[node + 1] for node in range(size - 1)] + [[]])
+    assert x == [0.0] * size
+
+
+def test_layout_of_fixed_family():
+    tree = FamilyTree()
+    grandfather = tree.add_person({"name": "Пётр"})
+    father = tree.add_person({"name": "Иван"}, grandfather)
+    uncle = tree.add_person({"name": "Сергей"}, grandfather)
+    aunt = tree.add_person({"name": "Мария"}, grandfather)
+    grandchildren = [tree.add_person({"name": name}, father) for name in ("Анна", "Олег")]
+    other_root = tree.add_person({"name": "Николай"})
+    layout = TreeLayout(tree, spacing_x=200, spacing_y=100)
+    positions = layout.get_positions()
+    assert set(positions) == set(tree.people)
+    assert [positions[person_id][1] for person_id in (grandfather, father, grandchildren[0], other_root)] == \
+        [0, 100, 200, 0]
+    assert positions[grandfather][0] == pytest.approx((positions[father][0] + positions[aunt][0]) / 2)
+    assert positions[father][0] == pytest.approx(sum(positions[child][0] for child in grandchildren) / 2)
+    assert positions[uncle][0] - positions[father][0] >= 200
+    assert min(x for x, _ in positions.values()) == 0
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_layout_of_generated_tree(seed):
+    tree = build_tree(500, seed=seed)
+    layout = TreeLayout(tree)
+    positions = layout.get_positions()
+    assert set(positions) == set(tree.people)
+    rows = defaultdict(list)
+    for person_id, (x, y) in positions.items():
+        assert y == layout.levels[person_id] * layout.spacing_y
+        rows[y].append(x)
+    for xs in rows.values():
+        # spacing_x — ширина карточки персоны с промежутком
+        xs.sort()
+        assert all(b - a >= layout.spacing_x - 1e-6 for a, b in zip(xs, xs[1:]))
+
+
+def test_layout_cache_follows_structure_revision(monkeypatch):
+    tree = FamilyTree()
+    root = tree.add_person({"name": "Пётр"})
+    child = tree.add_person({"name": "Иван"}, root)
+    layout = TreeLayout(tree)
+    computed = []
+    compute = layout.compute
+    monkeypatch.setattr(layout, "compute", lambda: computed.append(1) or compute())
+    positions = layout.get_positions()
+    assert layout.get_positions() is positions
+    tree.edit_person(child, {"name": "Иван Петрович", "birth_date": "1850"})
+    assert layout.get_positions() is positions and len(computed) == 1
+    other = tree.add_person({"name": "Анна"})
+    assert other in layout.get_positions() and len(computed) == 2
+    tree.link_parent_child(root, other)
+    assert layout.get_positions()[other][1] == layout.spacing_y and len(computed) == 3
+    tree.unlink(root, other)
+    assert layout.get_positions()[other][1] == 0 and len(computed) == 4
+    tree.remove_person(other)
+    assert other not in layout.get_positions() and len(computed) == 5
+    tree.clear()
+    assert layout.get_positions() == {}
\ No newline at end of file
@@ -0,0 +1,101 @@
+import os
+import random
+import pytest
+
+pytest.importorskip("PyQt5", reason="сцена древа требует PyQt5")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QRectF  # noqa: E402
+from PyQt5.QtWidgets import QApplication, QGraphicsScene  # noqa: E402
+from tree_layout import TreeLayout  # noqa: E402
+from tree_logic import FamilyTree  # noqa: E402
+from tree_scene import CLUSTER_LOD, TreeScene  # noqa: E402
+
+SCALES = (0.05, CLUSTER_LOD, 0.25, 1.0)  # Кластеры, граница, прямоугольники, полный вид
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def scene_state(tree_scene):
+    # Всё, что видно на сцене: узлы с положением и подписью, линии, кластеры
+    nodes = {person_id: (node.pos().x(), node.pos().y(), node.caption) for person_id, node in tree_scene.nodes.items()}
+    edges = {key: (line.line().x1(), line.line().y1(), line.line().x2(), line.line().y2()) for key, line in tree_scene.edges.items()}
+    clusters = {cell: (cluster.count, cluster.boundingRect().getRect())
+                for cell, cluster in tree_scene.clusters.items()}
+    return nodes, edges, clusters
+
+
+def assert_same_as_rebuild(tree, tree_scene, viewport):
+    fresh = TreeScene(QGraphicsScene(), tree, TreeLayout(tree), thumbnails=tree_scene.thumbnails)
+    fresh.sync()
+    fresh.set_viewport(*viewport)
+    assert scene_state(tree_scene) == scene_state(fresh)
+    assert tree_scene.bounds() == fresh.bounds()
+    # Удалённые узлы, линии и кластеры не остаются на сцене
+    assert len(tree_scene.scene.items()) == \
+        len(tree_scene.nodes) + len(tree_scene.edges) + len(tree_scene.clusters)
+    tree.unsubscribe(fresh._on_tree_changed)
+
+
+def random_viewport(rng, tree_scene):
+    bounds = tree_scene.bounds()
+    scale = rng.choice(SCALES)
+    width, height = 1200 / scale, 800 / scale
+    x = bounds.left() + rng.random() * max(bounds.width() - width / 2, 0)
+    y = bounds.top() + rng.random() * max(bounds.height() - height / 2, 0)
+    return QRectF(x, y, width, height), scale
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_scene_matches_rebuild(app, seed):
+    # Правки структуры и данных вперемешку с панорамированием и сменой уровня детализации
+    rng = random.Random(seed)
+    tree = FamilyTree()
+    ids = [tree.add_person({"name": "Корень"})]
+    for number in range(150):
+        ids.append(tree.add_person({"name": f"П{number}"}, rng.choice(ids)))
+    tree_scene = TreeScene(QGraphicsScene(), tree, TreeLayout(tree))
+    tree_scene.sync()
+    viewport = random_viewport(rng, tree_scene)
+    tree_scene.set_viewport(*viewport)
+    for _ in range(120):
+        operation = rng.random()
+        if operation < 0.2:
+            ids.append(tree.add_person({"name": "Новый"}, rng.choice(ids)))
+        elif operation < 0.35:
+            tree.link_parent_child(rng.choice(ids), rng.choice(ids))
+        elif operation < 0.45:
+            child_id = rng.choice(ids)
+            parents = list(tree.people[child_id]["parents"])
+            if parents:
+                tree.unlink(rng.choice(parents), child_id)
+        elif operation < 0.6:
+            tree.edit_person(rng.choice(ids), {"surname": rng.choice(("Иванов", "Петрова"))})
+        elif operation < 0.7 and len(ids) > 2:
+            tree.remove_person(ids.pop(rng.randrange(len(ids))))
+        else:
+            viewport = random_viewport(rng, tree_scene)
+            tree_scene.set_viewport(*viewport)
+        assert not tree_scene.sync()  # Без полного перестроения
+        assert_same_as_rebuild(tree, tree_scene, viewport)
+
+
+def test_level_of_detail_switch(app):
+    # При отдалении узлы заменяются кластерами и обратно, число персон в кластерах — всё древо
+    tree = FamilyTree()
+    ids = [tree.add_person({"name": "Корень"})]
+    for number in range(300):
+        ids.append(tree.add_person({"name": f"П{number}"}, ids[number // 3]))
+    tree_scene = TreeScene(QGraphicsScene(), tree, TreeLayout(tree))
+    tree_scene.sync()
+    bounds = tree_scene.bounds()
+    tree_scene.set_viewport(bounds, CLUSTER_LOD / 2)
+    assert not tree_scene.nodes and not tree_scene.edges
+    assert sum(cluster.count for cluster in tree_scene.clusters.values()) == len(tree.people)
+    tree_scene.set_viewport(bounds, 1.0)
+    assert not tree_scene.clusters
+    assert set(tree_scene.nodes) == set(tree.people)
+    assert len(tree_scene.edges) == len(tree.people) - 1
\ No newline at end of file
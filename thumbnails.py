@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, Qt, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap, QPixmapCache
+
+THUMBNAIL_SIZES = (50, 100, 200)
+INDEX_SAVE_DELAY = 2000  # мс: индекс миниатюр записывается один раз на серию загрузок
+
+
+def file_signature(path):
+    # Признак изменения файла без чтения содержимого
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def content_hash(path):
+    # SHA-1 содержимого файла, читается блоками
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _ThumbnailSignals(QObject):
+    loaded = pyqtSignal(str, int, str, list, QImage)  # путь, размер, хэш, признак файла, миниатюра
+    failed = pyqtSignal(str, int, list)  # путь, размер, признак файла (пустой, если файл недоступен)
+
+
+class _ThumbnailJob(QRunnable):
+    # Загрузка миниатюры в фоновом потоке; при отсутствии файлы всех размеров создаются
+    # из исходника за одно декодирование. Работает только с QImage: QPixmap — объект GUI-потока.
+    def __init__(self, store_dir, image_path, size, known_hash, signals):
+        super().__init__()
+        self.store_dir = store_dir
+        self.image_path = image_path
+        self.size = size
+        self.known_hash = known_hash
+        self.signals = signals
+
+    def run(self):
+        signature = []
+        try:
+            signature = file_signature(self.image_path)
+            image_hash = self.known_hash or content_hash(self.image_path)
+            thumb_path = os.path.join(self.store_dir, f"{image_hash}_{self.size}.png")
+            thumbnail = QImage(thumb_path) if os.path.exists(thumb_path) else QImage()
+            if thumbnail.isNull():
+                source = QImage(self.image_path)
+                if source.isNull():
+                    self.signals.failed.emit(self.image_path, self.size, signature)  # Не изображение
+                    return
+                os.makedirs(self.store_dir, exist_ok=True)
+                for size in THUMBNAIL_SIZES:
+                    scaled = source.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+                    scaled.save(os.path.join(self.store_dir, f"{image_hash}_{size}.png"))
+                    if size == self.size:
+                        thumbnail = scaled
+            self.signals.loaded.emit(self.image_path, self.size, image_hash, signature, thumbnail)
+        except OSError:
+            # Файл удалён или недоступен: остаётся заглушка
+            self.signals.failed.emit(self.image_path, self.size, signature)
+
+
+class ThumbnailCache(QObject):
+    # Миниатюры изображений персон: файлы по хэшу содержимого в images/thumbs, в памяти —
+    # QPixmapCache с ограничением по объёму (LRU). get() не блокирует: при промахе
+    # возвращает None, загружает миниатюру в фоне и сообщает о готовности сигналом.
+    thumbnail_ready = pyqtSignal(str)  # путь к исходному изображению
+
+    def __init__(self, store_dir=os.path.join("images", "thumbs"), budget_bytes=64 * 1024 * 1024):
+        super().__init__()
+        self.store_dir = store_dir
+        self.index_path = os.path.join(store_dir, "index.json")
+        QPixmapCache.setCacheLimit(budget_bytes // 1024)
+        self._index = self._load_index()  # {путь: [mtime_ns, размер файла, хэш]}
+        self._checked = set()  # Пути, чей признак файла уже сверен в этом сеансе
+        self._pending = set()
+        self._failed = {}  # {путь: признак файла} неразборчивых изображений; повтор — после изменения файла
+        self._pool = QThreadPool()
+        self._pool.setMaxThreadCount(2)
+        self._signals = _ThumbnailSignals()
+        self._signals.loaded.connect(self._on_loaded)
+        self._signals.failed.connect(self._on_failed)
+        # Индекс пишется не после каждой миниатюры (при открытии древа это N перезаписей файла),
+        # а отложенно и при закрытии
+        self._index_dirty = False
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.timeout.connect(self.flush)
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def flush(self):
+        # Запись изменённого индекса
+        self._save_timer.stop()
+        if not self._index_dirty:
+            return
+        self._index_dirty = False
+        os.makedirs(self.store_dir, exist_ok=True)
+        with open(self.index_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False)
+
+    def _known_hash(self, image_path):
+        entry = self._index.get(image_path)
+        if not entry:
+            return None
+        if image_path not in self._checked:
+            try:
+                if file_signature(image_path) != entry[:2]:
+                    del self._index[image_path]
+                    return None
+            except OSError:
+                return None
+            self._checked.add(image_path)
+        return entry[2]
+
+    def get(self, image_path, size=THUMBNAIL_SIZES[0]):
+        # Миниатюра из памяти или None (тогда загрузка запускается в фоне)
+        image_hash = self._known_hash(image_path)
+        if image_hash:
+            pixmap = QPixmapCache.find(f"thumb:{image_hash}:{size}")
+            if pixmap is not None and not pixmap.isNull():
+                return pixmap
+        self._schedule(image_path, size, image_hash)
+        return None
+
+    def prefetch(self, image_path):
+        # Подготовка миниатюр для нового изображения, пока пользователь не открыл древо;
+        # уже загруженная в память миниатюра не перечитывается
+        self.get(image_path)
+
+    def invalidate(self, image_path):
+        # Содержимое файла по этому пути изменилось
+        self._index.pop(image_path, None)
+        self._checked.discard(image_path)
+        self._failed.pop(image_path, None)
+
+    def watch(self, tree):
+        # Миниатюры создаются сразу после копирования изображения в add_person/edit_person.
+        # Признак файла сверяется заново (новое изображение могло лечь по тому же пути), но хэш
+        # и декодирование нужны, только если файл действительно изменился: правка имени или дат
+        # обходится одним stat
+        def on_tree_changed(event, *args):
+            if event == "add" or event == "edit":
+                image_path = tree.people[args[0]].get("image_path", "")
+                if image_path:
+                    self._checked.discard(image_path)
+                    self.prefetch(image_path)
+        tree.subscribe(on_tree_changed)
+
+    def _schedule(self, image_path, size, image_hash):
+        if (image_path, size) in self._pending or not os.path.exists(image_path):
+            return
+        if image_path in self._failed:
+            try:
+                if file_signature(image_path) == self._failed[image_path]:
+                    return
+            except OSError:
+                return
+            del self._failed[image_path]
+        self._pending.add((image_path, size))
+        self._pool.start(_ThumbnailJob(self.store_dir, image_path, size, image_hash, self._signals))
+
+    def _on_loaded(self, image_path, size, image_hash, signature, thumbnail):
+        self._pending.discard((image_path, size))
+        if self._index.get(image_path) != signature + [image_hash]:
+            self._index[image_path] = signature + [image_hash]
+            self._checked.add(image_path)
+            self._index_dirty = True
+            if not self._save_timer.isActive():
+                self._save_timer.start(INDEX_SAVE_DELAY)
+        QPixmapCache.insert(f"thumb:{image_hash}:{size}", QPixmap.fromImage(thumbnail))
+        self.thumbnail_ready.emit(image_path)
+
+    def _on_failed(self, image_path, size, signature):
+        # Ключ загрузки освобождается; то же содержимое повторно не декодируется
+        self._pending.discard((image_path, size))
+        if signature:
+            self._failed[image_path] = signature
\ No newline at end of file
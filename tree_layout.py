@@ -0,0 +1,172 @@
+from graph_analysis import assign_levels
+from instrumentation import span
+
+
+def tidy_tree_x(children, root=0, distance=1.0):
+    # Координаты x для упорядоченного дерева за O(N): алгоритм Уокера в линейной версии
+    # Бухгейма–Юнгера–Лейперта. children — списки детей по индексам узлов.
+    # Обходы итеративные, поэтому глубина дерева не ограничена стеком Python.
+    size = len(children)
+    parent = [-1] * size
+    number = [0] * size  # Порядковый номер среди братьев и сестёр
+    for node, node_children in enumerate(children):
+        for index, child in enumerate(node_children):
+            parent[child] = node
+            number[child] = index
+    prelim = [0.0] * size
+    mod = [0.0] * size
+    change = [0.0] * size
+    shift = [0.0] * size
+    thread = [-1] * size
+    ancestor = list(range(size))
+
+    def left_sibling(v):
+        return children[parent[v]][number[v] - 1] if parent[v] >= 0 and number[v] > 0 else -1
+
+    def next_left(v):
+        return children[v][0] if children[v] else thread[v]
+
+    def next_right(v):
+        return children[v][-1] if children[v] else thread[v]
+
+    def move_subtree(wm, wp, amount):
+        subtrees = number[wp] - number[wm]
+        change[wp] -= amount / subtrees
+        shift[wp] += amount
+        change[wm] += amount / subtrees
+        prelim[wp] += amount
+        mod[wp] += amount
+
+    def apportion(v, default_ancestor):
+        w = left_sibling(v)
+        if w < 0:
+            return default_ancestor
+        vip = vop = v
+        vim = w
+        vom = children[parent[v]][0]
+        sip = mod[vip]
+        sop = mod[vop]
+        sim = mod[vim]
+        som = mod[vom]
+        while next_right(vim) >= 0 and next_left(vip) >= 0:
+            vim = next_right(vim)
+            vip = next_left(vip)
+            vom = next_left(vom)
+            vop = next_right(vop)
+            ancestor[vop] = v
+            amount = (prelim[vim] + sim) - (prelim[vip] + sip) + distance
+            if amount > 0:
+                wm = ancestor[vim] if parent[ancestor[vim]] == parent[v] else default_ancestor
+                move_subtree(wm, v, amount)
+                sip += amount
+                sop += amount
+            sim += mod[vim]
+            sip += mod[vip]
+            som += mod[vom]
+            sop += mod[vop]
+        if next_right(vim) >= 0 and next_right(vop) < 0:
+            thread[vop] = next_right(vim)
+            mod[vop] += sim - sop
+        if next_left(vip) >= 0 and next_left(vom) < 0:
+            thread[vom] = next_left(vip)
+            mod[vom] += sip - som
+            default_ancestor = v
+        return default_ancestor
+
+    def finish(v):
+        # Завершение первого обхода для узла, все поддеревья которого уже размещены
+        w = left_sibling(v)
+        if children[v]:
+            total_shift = 0.0
+            total_change = 0.0
+            for child in reversed(children[v]):
+                prelim[child] += total_shift
+                mod[child] += total_shift
+                total_change += change[child]
+                total_shift += shift[child] + total_change
+            midpoint = (prelim[children[v][0]] + prelim[children[v][-1]]) / 2
+            if w >= 0:
+                prelim[v] = prelim[w] + distance
+                mod[v] = prelim[v] - midpoint
+            else:
+                prelim[v] = midpoint
+        elif w >= 0:
+            prelim[v] = prelim[w] + distance
+
+    # Первый обход (снизу вверх); default_ancestor хранится для каждого узла на стеке
+    stack = [(root, 0, children[root][0] if children[root] else root)]
+    while stack:
+        v, index, default_ancestor = stack[-1]
+        if index < len(children[v]):
+            stack[-1] = (v, index + 1, default_ancestor)
+            child = children[v][index]
+            stack.append((child, 0, children[child][0] if children[child] else child))
+            continue
+        stack.pop()
+        finish(v)
+        if stack:
+            p, p_index, p_default = stack[-1]
+            stack[-1] = (p, p_index, apportion(v, p_default))
+
+    # Второй обход (сверху вниз): итоговые координаты
+    x = [0.0] * size
+    stack = [(root, -prelim[root])]
+    while stack:
+        v, m = stack.pop()
+        x[v] = prelim[v] + m
+        for child in children[v]:
+            stack.append((child, m + mod[v]))
+    return x
+
+
+class TreeLayout:
+    # Раскладка древа без зависимости от Qt; пересчитывается только при изменении структуры
+    def __init__(self, tree, spacing_x=180, spacing_y=120):
+        self.tree = tree
+        self.spacing_x = spacing_x
+        self.spacing_y = spacing_y
+        self._revision = None
+        self._positions = {}
+        self.levels = {}
+        self.cycle_links = []
+
+    def get_positions(self):
+        # {id: (x, y)} для всех персон древа
+        if self._revision != self.tree.structure_revision:
+            with span("layout.compute", persons=len(self.tree.people)):
+                self._positions = self.compute()
+            self._revision = self.tree.structure_revision
+        return self._positions
+
+    def compute(self):
+        people = self.tree.people
+        if not people:
+            return {}
+        self.levels, self.cycle_links = assign_levels(people)
+
+        # Остовный лес: каждая персона подвешивается к первому родителю на уровень выше,
+        # поэтому глубина в лесу совпадает с поколением. Узел 0 — общий корень над всеми корнями.
+        ids = list(people)
+        index = {person_id: i for i, person_id in enumerate(ids, 1)}
+        primary = {}
+        for person_id in ids:
+            level = self.levels[person_id]
+            if not level:
+                continue
+            for parent_id in people[person_id]["parents"]:
+                if self.levels.get(parent_id) == level - 1:
+                    primary[person_id] = parent_id
+                    break
+        children = [[] for _ in range(len(ids) + 1)]
+        for i, person_id in enumerate(ids, 1):
+            if person_id not in primary:
+                children[0].append(i)
+            children[i] = [index[child_id] for child_id in people[person_id]["children"]
+                           if primary.get(child_id) == person_id]
+
+        x = tidy_tree_x(children)
+        min_x = min(x[1:])
+        return {
+            person_id: ((x[i] - min_x) * self.spacing_x, self.levels[person_id] * self.spacing_y)
+            for i, person_id in enumerate(ids, 1)
+        }
\ No newline at end of file
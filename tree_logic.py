@@ -1,65 +1,316 @@
 import uuid
 import os
+import sys
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from dates import DATE_FIELDS, parse_date
+
+PERSON_FIELDS = ("surname", "name", "patronymic", "birth_date", "death_date", "birth_place", "death_place", "notes",
+                 "image_path")
+# Поля с часто повторяющимися значениями: храним одну копию строки на всё древо
+INTERNED_FIELDS = frozenset(("surname", "name", "patronymic", "birth_date", "death_date", "birth_place",
+                             "death_place"))
+TRASH_DIR = os.path.join("images", "trash")  # Изображения удалённых персон до конца сеанса: для отмены удаления
+
+
+def trash_path(image_path):
+    # Место изображения удалённой персоны в корзине
+    return os.path.join(TRASH_DIR, os.path.basename(image_path))
+
+
+def empty_trash():
+    # Очистка корзины изображений, когда отменять удаление уже нечего (конец сеанса)
+    if os.path.isdir(TRASH_DIR):
+        import shutil
+        shutil.rmtree(TRASH_DIR, ignore_errors=True)
+
+
+class LinkSet(dict):
+    # Упорядоченное множество ID: добавление, удаление и проверка за O(1)
+    __slots__ = ()
+
+    def add(self, person_id):
+        self[person_id] = None
+
+    def discard(self, person_id):
+        self.pop(person_id, None)
+
+    def __repr__(self):
+        return f"LinkSet({list(self)!r})"
+
+
+class Person(MutableMapping):
+    # Компактная запись персоны на __slots__ с доступом как к словарю: person["name"]
+    __slots__ = PERSON_FIELDS + ("parents", "children")
+    _keys = frozenset(__slots__)
+
+    def __init__(self, data):
+        for field in PERSON_FIELDS:
+            self[field] = data.get(field, "")
+        self.parents = LinkSet()
+        self.children = LinkSet()
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self._keys:
+            raise KeyError(key)
+        if key in INTERNED_FIELDS and value:
+            value = sys.intern(value)
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        raise TypeError("Поля персоны нельзя удалять")
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __repr__(self):
+        return f"Person({dict(self)!r})"
 
 
 class FamilyTree:
-    def __init__(self):
+    def __init__(self, compact=False, copy_images=True):
+        self.compact = compact  # Хранить персон как Person вместо словарей (для больших деревьев)
+        # Копировать изображения персон в папку images (нужно программе, но не командам, читающим файл)
+        self.copy_images = copy_images
         self.people = {}  # {id: {surname, name, patronymic, birth_date, death_date, birth_place, death_place, notes, image_path, parents, children}}
+        self.revision = 0  # Номер версии, растёт при каждом изменении
+        self.structure_revision = 0  # Растёт при изменении состава персон и связей (не при правке данных)
+        # Разобранные даты (GenDate) рядом со строками: {поле даты: {id: GenDate}}, только для разборчивых дат
+        self.dates = {field: {} for field in DATE_FIELDS}
+        self._listeners = []
+        self._batch_listeners = []
+        self._batch_depth = 0
+        self._batch_revision = 0
 
-    def add_person(self, data, parent_id=None):
-        # Добавление человека с расширенными данными
-        person_id = str(uuid.uuid4())
-        person = {
-            "surname": data.get("surname", ""),
-            "name": data.get("name", ""),
-            "patronymic": data.get("patronymic", ""),
-            "birth_date": data.get("birth_date", ""),
-            "death_date": data.get("death_date", ""),
-            "birth_place": data.get("birth_place", ""),
-            "death_place": data.get("death_place", ""),
-            "notes": data.get("notes", ""),
-            "image_path": data.get("image_path", ""),
-            "parents": [],
-            "children": []
-        }
-        self.people[person_id] = person
+    def subscribe(self, callback):
+        # Подписка на изменения: callback(event, *args), где event —
+        # "add" (id), "remove" (id, person), "edit" (id, old_data), "link"/"unlink" (parent_id, child_id), "reset" ()
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
 
-        if parent_id and parent_id in self.people:
-            person["parents"].append(parent_id)
-            self.people[parent_id]["children"].append(person_id)
+    def subscribe_batch(self, callback):
+        # Подписка на окончание пакета изменений: callback() после внешнего batch(), если древо изменилось
+        self._batch_listeners.append(callback)
 
+    def unsubscribe_batch(self, callback):
+        if callback in self._batch_listeners:
+            self._batch_listeners.remove(callback)
+
+    @property
+    def in_batch(self):
+        return self._batch_depth > 0
+
+    @contextmanager
+    def batch(self):
+        # Пакет изменений (скрипт, отмена действия, восстановление сеанса): события доставляются
+        # как обычно, но подписчики с дорогой реакцией (таблица, перерисовка) по in_batch
+        # откладывают её до окончания пакета. Пакеты могут вкладываться.
+        self._batch_depth += 1
+        if self._batch_depth == 1:
+            self._batch_revision = self.revision
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self.revision != self._batch_revision:
+                for callback in list(self._batch_listeners):
+                    callback()
+
+    def _notify(self, event, *args):
+        self.revision += 1
+        if event != "edit":
+            self.structure_revision += 1
+        for callback in list(self._listeners):
+            callback(event, *args)
+
+    def _make_person(self, data):
+        # Создание записи персоны в выбранном формате хранения
+        if self.compact:
+            return Person(data)
+        person = {field: data.get(field, "") for field in PERSON_FIELDS}
+        person["parents"] = LinkSet()
+        person["children"] = LinkSet()
+        return person
+
+    def _parse_dates(self, person_id, person):
+        # Разбор дат персоны один раз при добавлении или изменении
+        for field in DATE_FIELDS:
+            date = parse_date(person[field]) if person[field] else None
+            if date is None:
+                self.dates[field].pop(person_id, None)
+            else:
+                self.dates[field][person_id] = date
+
+    def _copy_image(self, person_id, person):
         # Копирование изображения в папку images
-        if person["image_path"] and os.path.exists(person["image_path"]):
+        if self.copy_images and person["image_path"] and os.path.exists(person["image_path"]):
             import shutil
             os.makedirs("images", exist_ok=True)
             dest_path = f"images/{person_id}{os.path.splitext(person['image_path'])[1]}"
-            shutil.copy(person["image_path"], dest_path)
+            if os.path.abspath(person["image_path"]) != os.path.abspath(dest_path):
+                shutil.copy(person["image_path"], dest_path)
             person["image_path"] = dest_path
 
+    def add_person(self, data, parent_id=None, person_id=None):
+        # Добавление человека с расширенными данными; person_id задаётся при восстановлении из журнала
+        person_id = person_id or str(uuid.uuid4())
+        person = self._make_person(data)
+        self.people[person_id] = person
+        self._parse_dates(person_id, person)
+        self._copy_image(person_id, person)
+        self._notify("add", person_id)
+
+        if parent_id:
+            self.link_parent_child(parent_id, person_id)
+
         return person_id
 
+    def edit_person(self, person_id, data):
+        # Изменение данных персоны с сохранением связей
+        person = self.people.get(person_id)
+        if not person:
+            return False
+        old_data = {field: person[field] for field in PERSON_FIELDS}
+        for field in PERSON_FIELDS:
+            if field in data:
+                person[field] = data[field]
+        if any(field in data for field in DATE_FIELDS):
+            self._parse_dates(person_id, person)
+        self._copy_image(person_id, person)
+        self._notify("edit", person_id, old_data)
+        return True
+
     def remove_person(self, person_id):
         # Удаление человека из дерева
         if person_id not in self.people:
             return
         person = self.people[person_id]
 
-        # Удаление связей с родителями
-        for parent_id in person["parents"]:
-            if parent_id in self.people:
-                self.people[parent_id]["children"].remove(person_id)
+        # Удаление связей с родителями и детьми
+        for parent_id in list(person["parents"]):
+            self.unlink(parent_id, person_id)
+        for child_id in list(person["children"]):
+            self.unlink(person_id, child_id)
 
-        # Удаление связей с детьми
-        for child_id in person["children"]:
-            if child_id in self.people:
-                self.people[child_id]["parents"].remove(person_id)
-
-        # Удаление изображения
+        # Изображение переносится в корзину: отмена удаления вернёт его на место
         if person["image_path"] and os.path.exists(person["image_path"]):
-            os.remove(person["image_path"])
+            os.makedirs(TRASH_DIR, exist_ok=True)
+            os.replace(person["image_path"], trash_path(person["image_path"]))
 
         del self.people[person_id]
+        for dates in self.dates.values():
+            dates.pop(person_id, None)
+        self._notify("remove", person_id, person)
+
+    def merge_persons(self, keep_id, drop_id):
+        # Объединение дубликата: пустые поля keep_id заполняются из drop_id, родители и дети drop_id
+        # переносятся на keep_id, затем drop_id удаляется
+        if keep_id == drop_id or keep_id not in self.people or drop_id not in self.people:
+            return False
+        keep = self.people[keep_id]
+        drop = self.people[drop_id]
+        data = {field: drop[field] for field in PERSON_FIELDS if drop[field] and not keep[field]}
+        if data:
+            self.edit_person(keep_id, data)
+        for parent_id in list(drop["parents"]):
+            self.link_parent_child(parent_id, keep_id)
+        for child_id in list(drop["children"]):
+            self.link_parent_child(keep_id, child_id)
+        self.remove_person(drop_id)
+        return True
 
     def get_person(self, person_id):
         # Получение данных о человеке
-        return self.people.get(person_id, None)
\ No newline at end of file
+        return self.people.get(person_id, None)
+
+    def _link(self, parent_id, child_id):
+        # Связь без уведомления подписчиков
+        if parent_id == child_id or parent_id not in self.people or child_id not in self.people:
+            return False
+        parents = self.people[child_id]["parents"]
+        if parent_id in parents:
+            return False
+        parents.add(parent_id)
+        self.people[parent_id]["children"].add(child_id)
+        return True
+
+    def link_parent_child(self, parent_id, child_id):
+        # Связь родитель -> ребёнок; возвращает False, если связь невозможна или уже есть
+        if not self._link(parent_id, child_id):
+            return False
+        self._notify("link", parent_id, child_id)
+        return True
+
+    def unlink(self, parent_id, child_id):
+        # Разрыв связи родитель -> ребёнок
+        child = self.people.get(child_id)
+        if not child or parent_id not in child["parents"]:
+            return False
+        child["parents"].discard(parent_id)
+        if parent_id in self.people:
+            self.people[parent_id]["children"].discard(child_id)
+        self._notify("unlink", parent_id, child_id)
+        return True
+
+    def clear(self):
+        # Очистка дерева
+        self.people.clear()
+        for dates in self.dates.values():
+            dates.clear()
+        self._notify("reset")
+
+    def to_dict(self):
+        # Представление дерева для сохранения в JSON
+        return {
+            person_id: dict(person, parents=list(person["parents"]), children=list(person["children"]))
+            for person_id, person in self.people.items()
+        }
+
+    def load_people(self, people):
+        # Загрузка дерева из словаря формата to_dict; связи восстанавливаются в обе стороны
+        self.people.clear()
+        for dates in self.dates.values():
+            dates.clear()
+        for person_id, data in people.items():
+            person = self._make_person(data)
+            self.people[person_id] = person
+            self._parse_dates(person_id, person)
+        for person_id, data in people.items():
+            for parent_id in data.get("parents", []):
+                self._link(parent_id, person_id)
+            for child_id in data.get("children", []):
+                self._link(person_id, child_id)
+        self._notify("reset")
+
+    def adopt(self, other):
+        # Замена содержимого древа персонами другого древа одним присваиванием: древо можно
+        # построить в фоновом потоке, а подменить в GUI-потоке, не трогая подписчиков
+        self.people, self.dates = other.people, other.dates
+        other.people = {}
+        other.dates = {field: {} for field in DATE_FIELDS}
+        self._notify("reset")
+
+    def load_rows(self, rows, links):
+        # Загрузка из табличного представления без промежуточного словаря древа:
+        # rows — кортежи (id, поля PERSON_FIELDS по порядку), links — пары (родитель, ребёнок)
+        self.people.clear()
+        for dates in self.dates.values():
+            dates.clear()
+        for row in rows:
+            person = self._make_person(dict(zip(PERSON_FIELDS, row[1:])))
+            self.people[row[0]] = person
+            self._parse_dates(row[0], person)
+        for parent_id, child_id in links:
+            self._link(parent_id, child_id)
+        self._notify("reset")
\ No newline at end of file
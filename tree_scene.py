@@ -0,0 +1,315 @@
+import math
+from PyQt5.QtWidgets import QGraphicsItem
+from PyQt5.QtGui import QPen, QFont, QFontMetricsF, QBrush, QColor
+from PyQt5.QtCore import Qt, QRectF
+from instrumentation import span
+from thumbnails import ThumbnailCache, THUMBNAIL_SIZES
+
+NODE_SIZE = 120
+IMAGE_SIZE = 50
+PERSON_ID_KEY = 0  # Ключ QGraphicsItem.data() с ID персоны
+
+TEXT_LOD = 0.4  # Ниже этого масштаба персона рисуется простым прямоугольником без текста
+CLUSTER_LOD = 0.12  # Ниже этого масштаба вместо персон показываются кластеры по ячейкам сетки
+CELL_WIDTH = 1800  # Размер ячейки пространственной сетки в координатах сцены
+CELL_HEIGHT = 1200
+
+
+class PersonItem(QGraphicsItem):
+    # Узел персоны одним элементом сцены; отрисовка кэшируется Qt в координатах устройства
+    def __init__(self, tree_scene, person_id):
+        super().__init__()
+        self.tree_scene = tree_scene
+        self.person_id = person_id
+        self.caption = ""
+        self.image_path = ""
+        self.pixmap = None
+        self._rect = QRectF(0, 0, IMAGE_SIZE + 5 + NODE_SIZE, IMAGE_SIZE)
+        self.setData(PERSON_ID_KEY, person_id)
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+        self.refresh()
+
+    def refresh(self):
+        # Перечитывание подписи и изображения после правки персоны или смены шрифта
+        person = self.tree_scene.tree.people[self.person_id]
+        self.caption = f"{person['surname']} {person['name']} {person['patronymic']}\nID: {self.person_id}".strip()
+        self.image_path = person.get("image_path", "")
+        self.refresh_image()
+        text_rect = QFontMetricsF(self.tree_scene.font).boundingRect(QRectF(), Qt.AlignLeft, self.caption)
+        self.prepareGeometryChange()
+        self._rect = QRectF(0, 0, max(IMAGE_SIZE + 5 + NODE_SIZE, IMAGE_SIZE + 10 + text_rect.width()),
+                            max(IMAGE_SIZE, 10 + text_rect.height()))
+        self.update()
+
+    def refresh_image(self):
+        # Миниатюра из кэша; пока она загружается в фоне, рисуется заглушка
+        self.pixmap = None
+        if self.image_path:
+            self.pixmap = self.tree_scene.thumbnails.get(self.image_path, self.tree_scene.thumbnail_size())
+        self.update()
+
+    def boundingRect(self):
+        return self._rect
+
+    def paint(self, painter, option, widget=None):
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        if lod < TEXT_LOD:
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QBrush(Qt.lightGray))
+            painter.drawRect(QRectF(0, 0, IMAGE_SIZE + 5 + NODE_SIZE, IMAGE_SIZE))
+            return
+        if self.pixmap:
+            ratio = IMAGE_SIZE / max(self.pixmap.width(), self.pixmap.height())
+            painter.drawPixmap(QRectF(0, 0, self.pixmap.width() * ratio, self.pixmap.height() * ratio),
+                               self.pixmap, QRectF(self.pixmap.rect()))
+        else:
+            painter.setPen(QPen(Qt.gray))
+            painter.setBrush(QBrush(Qt.lightGray))
+            painter.drawRect(QRectF(0, 0, IMAGE_SIZE, IMAGE_SIZE))
+        painter.setPen(QPen(Qt.black))
+        painter.setBrush(QBrush(Qt.lightGray))
+        painter.drawRect(QRectF(IMAGE_SIZE + 5, 0, NODE_SIZE, IMAGE_SIZE))
+        painter.setFont(self.tree_scene.font)
+        painter.drawText(self._rect.adjusted(IMAGE_SIZE + 10, 5, 0, 0), Qt.AlignLeft, self.caption)
+
+
+class ClusterItem(QGraphicsItem):
+    # Обобщённый значок для ячейки сетки при сильном отдалении: область персон и их число
+    def __init__(self, rect, count):
+        super().__init__()
+        self._rect = rect
+        self.count = count
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+
+    def boundingRect(self):
+        return self._rect
+
+    def paint(self, painter, option, widget=None):
+        painter.setPen(QPen(Qt.darkGray))
+        painter.setBrush(QBrush(QColor(200, 200, 220)))
+        painter.drawRoundedRect(self._rect, 40, 40)
+        font = QFont("Arial")
+        font.setPixelSize(int(min(self._rect.height(), self._rect.width()) / 3) or 1)
+        painter.setFont(font)
+        painter.setPen(QPen(Qt.black))
+        painter.drawText(self._rect, Qt.AlignCenter, str(self.count))
+
+
+class TreeScene:
+    # Реестр элементов сцены по ID персоны. Изменения древа накапливаются через подписку
+    # и применяются в sync() только к затронутым узлам и связям. Элементы создаются лишь
+    # для видимой области (set_viewport), при сильном отдалении — кластеры по сетке.
+    def __init__(self, scene, tree, layout, font_size=10, thumbnails=None):
+        self.scene = scene
+        self.tree = tree
+        self.layout = layout
+        self.font = QFont("Arial", font_size)
+        self.thumbnails = thumbnails or ThumbnailCache()
+        self.thumbnails.thumbnail_ready.connect(self._on_thumbnail_ready)
+        self.nodes = {}  # {id: PersonItem} только для видимых персон
+        self.edges = {}  # {(parent_id, child_id): QGraphicsLineItem} для связей видимых персон
+        self.clusters = {}  # {ячейка: ClusterItem}
+        self._positions = {}
+        self._grid = {}  # {(столбец, строка): [id]}
+        self._bounds = QRectF()
+        self._viewport = None  # (видимый прямоугольник сцены, масштаб)
+        self._edited = set()
+        self._links = set()
+        self._reset = True
+        tree.subscribe(self._on_tree_changed)
+
+    def _on_tree_changed(self, event, *args):
+        if event == "edit":
+            self._edited.add(args[0])
+        elif event == "link" or event == "unlink":
+            self._links.add(args)
+        elif event == "remove":
+            self._edited.discard(args[0])
+            self._remove_node(args[0])
+        elif event == "reset":
+            self._reset = True
+        # "add" не требует действий: новая персона появится вместе с новой раскладкой
+
+    def sync(self):
+        # Применение накопленных изменений; возвращает True, если сцена построена заново
+        with span("scene.sync", edited=len(self._edited), links=len(self._links)) as info:
+            if self._reset:
+                self.rebuild()
+                info.update(rebuilt=True, items=len(self.nodes))
+                return True
+
+            positions = self.layout.get_positions()
+            if positions is not self._positions:
+                # Структура изменилась: сдвигаем видимые узлы, чьё место поменялось, и их линии
+                old_positions = self._positions
+                self._set_positions(positions)
+                for person_id, node in list(self.nodes.items()):
+                    pos = positions.get(person_id)
+                    if pos is None:
+                        self._remove_node(person_id)
+                    elif old_positions.get(person_id) != pos:
+                        node.setPos(*pos)
+                for parent_id, child_id in list(self.edges):
+                    if old_positions.get(parent_id) != positions.get(parent_id) or \
+                            old_positions.get(child_id) != positions.get(child_id):
+                        self._sync_edge(parent_id, child_id)
+                self._clear_clusters()
+
+            for parent_id, child_id in self._links:
+                self._sync_edge(parent_id, child_id)
+            for person_id in self._edited:
+                if person_id in self.nodes:
+                    self.nodes[person_id].refresh()
+            self._links.clear()
+            self._edited.clear()
+            self._apply_viewport()
+            info.update(rebuilt=False, items=len(self.nodes))
+            return False
+
+    def rebuild(self):
+        # Полное построение сцены (загрузка, импорт, новое древо)
+        self.scene.clear()
+        self.nodes.clear()
+        self.edges.clear()
+        self.clusters.clear()
+        self._links.clear()
+        self._edited.clear()
+        self._reset = False
+        self._set_positions(self.layout.get_positions())
+        self._apply_viewport()
+
+    def bounds(self):
+        # Границы всего древа (элементы создаются не для всех персон, поэтому не itemsBoundingRect)
+        return self._bounds
+
+    def set_viewport(self, rect, scale):
+        # Видимая область сцены и текущий масштаб вида
+        self._viewport = (rect, scale)
+        self._apply_viewport()
+
+    def set_font_size(self, font_size):
+        self.font = QFont("Arial", font_size)
+        for node in self.nodes.values():
+            node.refresh()
+
+    def thumbnail_size(self):
+        # Размер миниатюры под текущий масштаб: при приближении нужна более чёткая
+        scale = self._viewport[1] if self._viewport else 1.0
+        return THUMBNAIL_SIZES[0] if scale < 1.0 else THUMBNAIL_SIZES[1] if scale < 2.0 else THUMBNAIL_SIZES[2]
+
+    def _on_thumbnail_ready(self, image_path):
+        for node in self.nodes.values():
+            if node.image_path == image_path:
+                node.refresh_image()
+
+    def _set_positions(self, positions):
+        # Новая раскладка: пространственная сетка для поиска видимых персон и границы древа
+        self._positions = positions
+        self._grid = {}
+        for person_id, (x, y) in positions.items():
+            self._grid.setdefault((int(x // CELL_WIDTH), int(y // CELL_HEIGHT)), []).append(person_id)
+        if positions:
+            xs = [x for x, _ in positions.values()]
+            ys = [y for _, y in positions.values()]
+            self._bounds = QRectF(min(xs), min(ys), max(xs) - min(xs) + IMAGE_SIZE + 5 + NODE_SIZE,
+                                  max(ys) - min(ys) + IMAGE_SIZE)
+        else:
+            self._bounds = QRectF()
+
+    def _cells_in(self, rect):
+        for column in range(math.floor(rect.left() / CELL_WIDTH), math.floor(rect.right() / CELL_WIDTH) + 1):
+            for row in range(math.floor(rect.top() / CELL_HEIGHT), math.floor(rect.bottom() / CELL_HEIGHT) + 1):
+                if (column, row) in self._grid:
+                    yield column, row
+
+    def _apply_viewport(self):
+        # Создание элементов для видимой области и удаление ушедших из неё
+        if self._viewport is None:
+            return
+        rect, scale = self._viewport
+        if scale < CLUSTER_LOD:
+            self._clear_nodes()
+            wanted = set(self._cells_in(rect))
+            for cell in [cell for cell in self.clusters if cell not in wanted]:
+                self.scene.removeItem(self.clusters.pop(cell))
+            for cell in wanted:
+                if cell not in self.clusters:
+                    self._create_cluster(cell)
+            return
+
+        self._clear_clusters()
+        wanted = set()
+        for cell in self._cells_in(rect.adjusted(-CELL_WIDTH / 2, -CELL_HEIGHT / 2, CELL_WIDTH / 2,
+                                                 CELL_HEIGHT / 2)):
+            wanted.update(self._grid[cell])
+        for person_id in [person_id for person_id in self.nodes if person_id not in wanted]:
+            self._remove_node(person_id)
+            self._sync_person_edges(person_id)
+        for person_id in wanted:
+            if person_id not in self.nodes:
+                self._create_node(person_id)
+
+    def _create_node(self, person_id):
+        node = PersonItem(self, person_id)
+        node.setPos(*self._positions[person_id])
+        self.scene.addItem(node)
+        self.nodes[person_id] = node
+        self._sync_person_edges(person_id)
+
+    def _remove_node(self, person_id):
+        node = self.nodes.pop(person_id, None)
+        if node:
+            self.scene.removeItem(node)
+
+    def _clear_nodes(self):
+        for node in self.nodes.values():
+            self.scene.removeItem(node)
+        for line in self.edges.values():
+            self.scene.removeItem(line)
+        self.nodes.clear()
+        self.edges.clear()
+
+    def _create_cluster(self, cell):
+        person_ids = self._grid[cell]
+        xs = [self._positions[person_id][0] for person_id in person_ids]
+        ys = [self._positions[person_id][1] for person_id in person_ids]
+        rect = QRectF(min(xs), min(ys), max(xs) - min(xs) + IMAGE_SIZE + 5 + NODE_SIZE, max(ys) - min(ys) + IMAGE_SIZE)
+        cluster = ClusterItem(rect, len(person_ids))
+        self.scene.addItem(cluster)
+        self.clusters[cell] = cluster
+
+    def _clear_clusters(self):
+        for cluster in self.clusters.values():
+            self.scene.removeItem(cluster)
+        self.clusters.clear()
+
+    def _sync_person_edges(self, person_id):
+        person = self.tree.people.get(person_id)
+        if not person:
+            return
+        for parent_id in person["parents"]:
+            self._sync_edge(parent_id, person_id)
+        for child_id in person["children"]:
+            self._sync_edge(person_id, child_id)
+
+    def _sync_edge(self, parent_id, child_id):
+        # Создание, перемещение или удаление линии родитель -> ребёнок по текущему состоянию древа.
+        # Линия нужна, пока виден хотя бы один из её концов.
+        key = (parent_id, child_id)
+        line = self.edges.get(key)
+        child = self.tree.people.get(child_id)
+        linked = child is not None and parent_id in child["parents"] and parent_id in self._positions \
+            and child_id in self._positions and (parent_id in self.nodes or child_id in self.nodes)
+        if not linked:
+            if line:
+                self.scene.removeItem(line)
+                del self.edges[key]
+            return
+        px, py = self._positions[parent_id]
+        cx, cy = self._positions[child_id]
+        if line:
+            line.setLine(px + IMAGE_SIZE / 2, py + IMAGE_SIZE, cx + IMAGE_SIZE / 2, cy)
+        else:
+            line = self.scene.addLine(px + IMAGE_SIZE / 2, py + IMAGE_SIZE, cx + IMAGE_SIZE / 2, cy, QPen(Qt.black))
+            line.setZValue(-1)
+            self.edges[key] = line
\ No newline at end of file
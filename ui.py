@@ -1,15 +1,36 @@
 from PyQt5.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QGraphicsView, QGraphicsScene, \
-    QLineEdit, QFileDialog, QMessageBox, QDialog, QFormLayout, QLabel, QTabWidget, QTableWidget, QTableWidgetItem, \
-    QTextBrowser, QComboBox, QSpinBox, QMenu, QAction
-from PyQt5.QtGui import QPen, QFont, QPixmap, QPainter
-from PyQt5.QtCore import Qt, QRectF
-from gedcom_handler import GedcomHandler
-from stats import FamilyStats
+    QLineEdit, QFileDialog, QMessageBox, QDialog, QFormLayout, QLabel, QTabWidget, QTableView, QHeaderView, \
+    QTextBrowser, QComboBox, QSpinBox, QMenu, QAction, QListWidget, QListWidgetItem, QProgressDialog, QInputDialog, \
+    QTableWidget, QTableWidgetItem, QCheckBox
+from PyQt5.QtGui import QPainter, QKeySequence
+from PyQt5.QtCore import Qt, QRectF, QSortFilterProxyModel, QTimer
+from persons_model import PersonsModel, SORT_ROLE
+from project_store import ProjectStore, PROJECT_EXTENSION
+from journal import Journal, History
+from jobs import JobRunner
+from tree_logic import FamilyTree, empty_trash
+from graph_analysis import collect_relatives
+from search_index import SearchIndex
+from dates import DateIndex
+from tree_layout import TreeLayout
+from tree_scene import TreeScene, PERSON_ID_KEY
+from thumbnails import ThumbnailCache
 from settings import SettingsManager
+from refresh_scheduler import RefreshScheduler
+from instrumentation import profiler, span, tracer
 import os
-import json
-import zipfile
-import shutil
+import re
+import time
+
+# Модули GEDCOM, архивных копий, статистики (numpy), родства и дубликатов импортируются
+# при первом использовании: запуск программы их не ждёт
+
+SEARCH_LIMIT = 50
+KINSHIP_MATRIX_LIMIT = 100
+YEARS_RE = re.compile(r"^\s*(\d{3,4})\s*[-–]\s*(\d{3,4})\s*$")  # Запрос «1850-1870» — годы рождения
+DIAGNOSTICS_DIR = "diagnostics"  # Каталог снимков профиля
+SETTLE_DELAY = 200  # мс: масштаб и шрифт применяются, когда значение счётчика перестало меняться
+DEMOGRAPHICS_INTERVAL = 2.0  # с: расширенная статистика при непрерывных правках пересчитывается не чаще
 
 
 class PersonDialog(QDialog):
@@ -77,17 +98,129 @@ class PersonDialog(QDialog):
         }
 
 
+class DiagnosticsDialog(QDialog):
+    # Скрытая панель диагностики (Ctrl+Shift+D): сводка по интервалам и последние интервалы
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Диагностика")
+        self.resize(900, 600)
+        layout = QVBoxLayout(self)
+
+        layout.addWidget(QLabel("Сводка по операциям"))
+        self.summary_table = QTableWidget(0, 5)
+        self.summary_table.setHorizontalHeaderLabels(["Операция", "Вызовов", "Всего, мс", "Макс., мс", "Последний, мс"])
+        self.summary_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.summary_table)
+
+        layout.addWidget(QLabel("Последние интервалы"))
+        self.recent_table = QTableWidget(0, 4)
+        self.recent_table.setHorizontalHeaderLabels(["Операция", "Длительность, мс", "Поток", "Счётчики"])
+        self.recent_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.recent_table)
+
+        buttons = QHBoxLayout()
+        refresh_button = QPushButton("Обновить")
+        refresh_button.clicked.connect(self.refresh)
+        buttons.addWidget(refresh_button)
+        clear_button = QPushButton("Очистить")
+        clear_button.clicked.connect(self.clear)
+        buttons.addWidget(clear_button)
+        export_button = QPushButton("Экспорт трассы")
+        export_button.clicked.connect(lambda: export_trace(self))
+        buttons.addWidget(export_button)
+        layout.addLayout(buttons)
+        self.refresh()
+
+    def refresh(self):
+        summary = sorted(tracer.summary().items(), key=lambda item: item[1]["total"], reverse=True)
+        self.summary_table.setRowCount(len(summary))
+        for row, (name, entry) in enumerate(summary):
+            values = [name, str(entry["count"]), f"{entry['total'] * 1000:.1f}", f"{entry['max'] * 1000:.1f}",
+                      f"{entry['last'] * 1000:.1f}"]
+            for column, value in enumerate(values):
+                self.summary_table.setItem(row, column, QTableWidgetItem(value))
+        recent = tracer.recent()
+        self.recent_table.setRowCount(len(recent))
+        for row, record in enumerate(recent):
+            duration = "событие" if record["duration"] is None else f"{record['duration'] * 1000:.1f}"
+            args = ", ".join(f"{key}={value}" for key, value in record["args"].items())
+            values = ["  " * record["depth"] + record["name"], duration, record["thread"], args]
+            for column, value in enumerate(values):
+                self.recent_table.setItem(row, column, QTableWidgetItem(value))
+        self.summary_table.resizeColumnsToContents()
+        self.recent_table.resizeColumnsToContents()
+
+    def clear(self):
+        tracer.clear()
+        self.refresh()
+
+
+def export_trace(parent):
+    # Выгрузка журнала интервалов: *.json — Chrome trace (chrome://tracing, Perfetto), *.jsonl — строки JSON
+    try:
+        file_name, _ = QFileDialog.getSaveFileName(parent, "Экспорт трассы", "",
+                                                   "Chrome trace (*.json);;JSON Lines (*.jsonl)")
+        if not file_name:
+            return
+        if file_name.lower().endswith(".jsonl"):
+            count = tracer.export_jsonl(file_name)
+        else:
+            if not file_name.lower().endswith(".json"):
+                file_name += ".json"
+            count = tracer.export_chrome_trace(file_name)
+        QMessageBox.information(parent, "Успех", f"Записей выгружено: {count}")
+    except Exception as e:
+        QMessageBox.critical(parent, "Ошибка экспорта", f"Не удалось выгрузить трассу: {str(e)}")
+
+
 class GenealogyApp(QMainWindow):
     def __init__(self, tree):
         super().__init__()
         self.tree = tree
-        self.gedcom_handler = GedcomHandler(self.tree)
-        self.stats = FamilyStats(self.tree)
+        self._stats = None  # FamilyStats и Kinship создаются при первом обращении
+        self._kinship = None
+        self.search_index = SearchIndex(self.tree)
+        self.date_index = DateIndex(self.tree)
+        self.project_store = None  # Открытый файл проекта: повторное сохранение пишет только изменения
+        self.history = History(self.tree)
+        self.journal = Journal()
+        self.jobs = JobRunner()
+        self.stats_jobs = JobRunner()  # Отдельная очередь: пересчёт статистики не ждёт сохранений и импорта
+        self.demographics = None  # Последний результат расширенной статистики
+        self._demographics_job = None
+        self._demographics_rows = None  # TreeRows: строки снимка для статистики, по событиям древа
+        self._demographics_started = 0.0
+        self.tree_layout = TreeLayout(self.tree, spacing_x=180, spacing_y=120)
         self.settings = SettingsManager()
         self.scale_factor = self.settings.get_setting("default_scale", 1.0)
-        self.node_to_id = {}  # Для контекстного меню: узел -> ID персоны
+        self.view = None  # Элементы вкладок, которые строятся при первом открытии
+        self.tree_scene = None
+        self.thumbnails = None
+        self.stats_text = None
+        self._tab_builders = {}  # {виджет-заготовка вкладки: функция построения}
+        # Представления обновляются не после каждого изменения, а одним проходом на такт цикла
+        # событий и только на видимой вкладке
+        self.refresh_scheduler = RefreshScheduler(self.tree)
         self.init_ui()
+        self.register_views()
         self.load_styles()
+        self.recover_session()
+        # Последний проект открывается в фоне, когда окно уже показано
+        QTimer.singleShot(0, self.open_last_project)
+
+    @property
+    def stats(self):
+        if self._stats is None:
+            from stats import FamilyStats
+            self._stats = FamilyStats(self.tree)
+        return self._stats
+
+    @property
+    def kinship(self):
+        if self._kinship is None:
+            from kinship import Kinship
+            self._kinship = Kinship(self.tree)
+        return self._kinship
 
     def init_ui(self):
         # Установка заголовка окна
@@ -123,20 +256,107 @@ class GenealogyApp(QMainWindow):
         remove_button.clicked.connect(self.remove_person)
         persons_control_layout.addWidget(remove_button)
 
+        kinship_button = QPushButton("Матрица родства")
+        kinship_button.clicked.connect(self.show_kinship_matrix)
+        persons_control_layout.addWidget(kinship_button)
+
+        # Отмена и повтор (Ctrl+Z / Ctrl+Y)
+        undo_action = QAction("Отменить", self)
+        undo_action.setShortcut(QKeySequence.Undo)
+        undo_action.triggered.connect(self.undo)
+        self.addAction(undo_action)
+        redo_action = QAction("Повторить", self)
+        redo_action.setShortcut(QKeySequence.Redo)
+        redo_action.triggered.connect(self.redo)
+        self.addAction(redo_action)
+
+        # Скрытая панель диагностики
+        diagnostics_action = QAction("Диагностика", self)
+        diagnostics_action.setShortcut(QKeySequence("Ctrl+Shift+D"))
+        diagnostics_action.triggered.connect(self.show_diagnostics)
+        self.addAction(diagnostics_action)
+
+        undo_button = QPushButton("Отменить")
+        undo_button.clicked.connect(self.undo)
+        persons_control_layout.addWidget(undo_button)
+
+        redo_button = QPushButton("Повторить")
+        redo_button.clicked.connect(self.redo)
+        persons_control_layout.addWidget(redo_button)
+
         persons_layout.addWidget(persons_control)
 
-        # Таблица персон
-        self.persons_table = QTableWidget()
-        self.persons_table.setColumnCount(9)
-        self.persons_table.setHorizontalHeaderLabels(
-            ["ID", "Фамилия", "Имя", "Отчество", "Дата рождения", "Дата смерти", "Место рождения", "Место смерти",
-             "Заметки"])
-        self.persons_table.horizontalHeader().setStretchLastSection(True)
+        # Поиск по мере ввода: ФИО, места, заметки; допускает опечатки и латиницу
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Поиск: фамилия, имя, отчество, место, заметки или годы рождения 1850-1870")
+        self.search_input.textChanged.connect(self.search_persons)
+        persons_layout.addWidget(self.search_input)
+        self.search_results = QListWidget()
+        self.search_results.setMaximumHeight(160)
+        self.search_results.itemActivated.connect(self.select_search_result)
+        self.search_results.hide()
+        persons_layout.addWidget(self.search_results)
+
+        # Фильтр таблицы
+        self.persons_filter = QLineEdit()
+        self.persons_filter.setPlaceholderText("Фильтр по всем столбцам")
+        persons_layout.addWidget(self.persons_filter)
+
+        # Таблица персон: модель читает данные прямо из древа, строки создаются только для видимой области
+        self.persons_model = PersonsModel(self.tree)
+        self.persons_proxy = QSortFilterProxyModel()
+        self.persons_proxy.setSourceModel(self.persons_model)
+        self.persons_proxy.setSortRole(SORT_ROLE)  # Даты сортируются по разобранному значению, а не как строки
+        self.persons_proxy.setFilterKeyColumn(-1)
+        self.persons_proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.persons_filter.textChanged.connect(self.persons_proxy.setFilterFixedString)
+        self.persons_table = QTableView()
+        self.persons_table.setModel(self.persons_proxy)
+        # Одинаковая высота строк: представлению не нужно измерять каждую строку
+        self.persons_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        header = self.persons_table.horizontalHeader()
+        header.setStretchLastSection(True)
+        header.setResizeContentsPrecision(200)  # Ширина столбцов по первым строкам, а не по всем ячейкам
+        header.setSortIndicator(-1, Qt.AscendingOrder)  # Без сортировки при открытии: порядок добавления
+        self.persons_table.setSortingEnabled(True)
         persons_layout.addWidget(self.persons_table)
         self.tabs.addTab(persons_widget, "Персоны")
-
+        self.persons_tab = persons_widget
+
+        # Остальные вкладки строятся при первом открытии
+        self.tree_tab = self.add_lazy_tab("Древо", self.build_tree_tab)
+        self.stats_tab = self.add_lazy_tab("Статистика", self.build_stats_tab)
+        self.add_lazy_tab("Настройки", self.build_settings_tab)
+        self.add_lazy_tab("О программе", self.build_about_tab)
+        self.tabs.currentChanged.connect(self.ensure_tab)
+        # Изменения, накопленные, пока вкладка была скрыта, применяются при её открытии
+        self.tabs.currentChanged.connect(lambda index: self.refresh_scheduler.flush())
+
+    def register_views(self):
+        # Порядок обновления: шрифт и сцена древа, затем масштаб, таблица и статистика
+        def showing(tab):
+            return lambda: self.tabs.currentWidget() is tab
+
+        self.refresh_scheduler.register("font", self.apply_font_size, showing(self.tree_tab), tree_view=False)
+        self.refresh_scheduler.register("tree", self.update_tree_view, showing(self.tree_tab))
+        self.refresh_scheduler.register("scale", self.apply_scale, showing(self.tree_tab), tree_view=False)
+        self.refresh_scheduler.register("table", self.update_persons_table, showing(self.persons_tab))
+        self.refresh_scheduler.register("stats", self.update_stats, showing(self.stats_tab))
+
+    def add_lazy_tab(self, title, build):
+        placeholder = QWidget()
+        self._tab_builders[placeholder] = build
+        self.tabs.addTab(placeholder, title)
+        return placeholder
+
+    def ensure_tab(self, index):
+        # Построение вкладки при первом открытии
+        build = self._tab_builders.pop(self.tabs.widget(index), None)
+        if build:
+            build(self.tabs.widget(index))
+
+    def build_tree_tab(self, tree_widget):
         # Вкладка "Древо"
-        tree_widget = QWidget()
         tree_layout = QHBoxLayout(tree_widget)
 
         # Панель управления
@@ -147,8 +367,12 @@ class GenealogyApp(QMainWindow):
         import_button.clicked.connect(self.import_gedcom)
         control_layout.addWidget(import_button)
 
+        merge_import_button = QPushButton("Добавить из GEDCOM")
+        merge_import_button.clicked.connect(self.merge_gedcom)
+        control_layout.addWidget(merge_import_button)
+
         export_button = QPushButton("Экспортировать GEDCOM")
-        export_button.clicked.connect(self.export_gedcom)
+        export_button.clicked.connect(lambda: self.export_gedcom())
         control_layout.addWidget(export_button)
 
         save_tree_button = QPushButton("Сохранить древо")
@@ -163,6 +387,10 @@ class GenealogyApp(QMainWindow):
         backup_button.clicked.connect(self.create_backup)
         control_layout.addWidget(backup_button)
 
+        restore_button = QPushButton("Восстановить из копии")
+        restore_button.clicked.connect(self.restore_backup)
+        control_layout.addWidget(restore_button)
+
         new_tree_button = QPushButton("Создать новое древо")
         new_tree_button.clicked.connect(self.create_new_tree)
         control_layout.addWidget(new_tree_button)
@@ -181,6 +409,10 @@ class GenealogyApp(QMainWindow):
 
         # Графическое представление дерева
         self.scene = QGraphicsScene()
+        self.thumbnails = ThumbnailCache()
+        self.thumbnails.watch(self.tree)
+        self.tree_scene = TreeScene(self.scene, self.tree, self.tree_layout, self.settings.get_setting("font_size", 10),
+                                    self.thumbnails)
         self.view = QGraphicsView(self.scene)
         self.view.setRenderHint(QPainter.Antialiasing)
         self.view.setOptimizationFlag(QGraphicsView.DontAdjustForAntialiasing, True)
@@ -188,11 +420,13 @@ class GenealogyApp(QMainWindow):
         self.view.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
         self.view.setContextMenuPolicy(Qt.CustomContextMenu)
         self.view.customContextMenuRequested.connect(self.show_context_menu)
+        self.view.horizontalScrollBar().valueChanged.connect(self.update_viewport)
+        self.view.verticalScrollBar().valueChanged.connect(self.update_viewport)
         tree_layout.addWidget(self.view, 4)
-        self.tabs.addTab(tree_widget, "Древо")
+        self.refresh_scheduler.mark("tree")
 
+    def build_stats_tab(self, stats_widget):
         # Вкладка "Статистика"
-        stats_widget = QWidget()
         stats_layout = QVBoxLayout(stats_widget)
         self.stats_text = QTextBrowser()
         self.stats_text.setReadOnly(True)
@@ -200,10 +434,10 @@ class GenealogyApp(QMainWindow):
         update_stats_button = QPushButton("Обновить статистику")
         update_stats_button.clicked.connect(self.update_stats)
         stats_layout.addWidget(update_stats_button)
-        self.tabs.addTab(stats_widget, "Статистика")
+        self.refresh_scheduler.mark("stats")
 
+    def build_settings_tab(self, settings_widget):
         # Вкладка "Настройки"
-        settings_widget = QWidget()
         settings_layout = QFormLayout(settings_widget)
 
         self.theme_combo = QComboBox()
@@ -229,10 +463,18 @@ class GenealogyApp(QMainWindow):
         save_settings_button.clicked.connect(self.save_settings)
         settings_layout.addRow(save_settings_button)
 
-        self.tabs.addTab(settings_widget, "Настройки")
+        # Диагностика: снимок профиля (cProfile и tracemalloc) и выгрузка журнала интервалов
+        self.profile_check = QCheckBox("Записывать профиль (cProfile и память)")
+        self.profile_check.setChecked(profiler.active)
+        self.profile_check.toggled.connect(self.toggle_profiling)
+        settings_layout.addRow("Профилирование:", self.profile_check)
+
+        export_trace_button = QPushButton("Экспорт трассы")
+        export_trace_button.clicked.connect(lambda: export_trace(self))
+        settings_layout.addRow(export_trace_button)
 
+    def build_about_tab(self, about_widget):
         # Вкладка "О программе"
-        about_widget = QWidget()
         about_layout = QVBoxLayout(about_widget)
         about_text = QTextBrowser()
         about_text.setReadOnly(True)
@@ -241,15 +483,10 @@ class GenealogyApp(QMainWindow):
         <h2>MatsDrevo</h2>
         <p>Версия: 1.0</p>
         <p>Автор: xAI</p>
-        <p>Описание: Программа для создания и управления генеалогическими деревьями. Поддерживает добавление до 1500 человек, импорт/экспорт GEDCOM, изображения, зум и расширенные данные о персонах.</p>
+        <p>Описание: Программа для создания и управления генеалогическими деревьями. Поддерживает большие древа (сотни тысяч человек), импорт/экспорт GEDCOM, изображения, зум и расширенные данные о персонах.</p>
         <p>Канал студии: <a href="https://t.me/MatsStudio">https://t.me/MatsStudio</a></p>
         """)
         about_layout.addWidget(about_text)
-        self.tabs.addTab(about_widget, "О программе")
-
-        self.update_tree_view()
-        self.update_persons_table()
-        self.update_stats()
 
     def load_styles(self):
         # Загрузка стилей
@@ -259,7 +496,7 @@ class GenealogyApp(QMainWindow):
             if os.path.exists(style_file):
                 with open(style_file, "r", encoding="utf-8") as f:
                     self.setStyleSheet(f.read())
-            self.update_tree_view()  # Перерисовка для применения шрифта
+            self.refresh_scheduler.mark("tree")  # Перерисовка для применения шрифта
         except Exception as e:
             QMessageBox.critical(self, "Ошибка стилей", f"Не удалось загрузить стили: {str(e)}")
 
@@ -270,10 +507,8 @@ class GenealogyApp(QMainWindow):
             if dialog.exec_():
                 data = dialog.get_data()
                 parent_id = self.parent_input.text().strip()
-                self.tree.add_person(data, parent_id if parent_id and parent_id in self.tree.people else None)
-                self.update_tree_view()
-                self.update_persons_table()
-                self.update_stats()
+                with self.history.action():
+                    self.tree.add_person(data, parent_id if parent_id and parent_id in self.tree.people else None)
                 self.parent_input.clear()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка добавления", f"Не удалось добавить человека: {str(e)}")
@@ -283,136 +518,146 @@ class GenealogyApp(QMainWindow):
         try:
             person_id = self.parent_input.text().strip()
             if person_id and person_id in self.tree.people:
-                self.tree.remove_person(person_id)
-                self.update_tree_view()
-                self.update_persons_table()
-                self.update_stats()
+                with self.history.action():
+                    self.tree.remove_person(person_id)
             else:
                 QMessageBox.warning(self, "Ошибка ввода", "Неверный ID человека")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка удаления", f"Не удалось удалить человека: {str(e)}")
 
+    def search_persons(self, text):
+        # Результаты поиска обновляются при каждом изменении строки запроса
+        try:
+            self.search_results.clear()
+            if len(text.strip()) < 2:
+                self.search_results.hide()
+                return
+            years = YEARS_RE.match(text)
+            if years:
+                # Диапазон лет: персоны, родившиеся в эти годы, по возрастанию даты рождения
+                found = self.date_index.between(int(years.group(1)), int(years.group(2)), limit=SEARCH_LIMIT)
+            else:
+                found = self.search_index.search(text, SEARCH_LIMIT)
+            for person_id in found:
+                item = QListWidgetItem(self.search_index.describe(person_id))
+                item.setData(Qt.UserRole, person_id)
+                self.search_results.addItem(item)
+            self.search_results.setVisible(self.search_results.count() > 0)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка поиска", f"Не удалось выполнить поиск: {str(e)}")
+
+    def select_search_result(self, item):
+        # Выбор найденной персоны: строка в таблице и ID в поле родителя
+        person_id = item.data(Qt.UserRole)
+        if person_id not in self.tree.people:
+            return
+        self.parent_input.setText(person_id)
+        index = self.persons_proxy.mapFromSource(self.persons_model.index(self.persons_model.row_of(person_id), 0))
+        if index.isValid():
+            self.persons_table.selectRow(index.row())
+            self.persons_table.scrollTo(index)
+
+    def undo(self):
+        # Отмена последнего действия
+        try:
+            self.history.undo()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка отмены", f"Не удалось отменить действие: {str(e)}")
+
+    def redo(self):
+        # Повтор отменённого действия
+        try:
+            self.history.redo()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка повтора", f"Не удалось повторить действие: {str(e)}")
+
+    def recover_session(self):
+        # Восстановление изменений прошлого сеанса, завершившегося аварийно, и запуск журнала
+        try:
+            if self.journal.has_unfinished_session():
+                if QMessageBox.question(self, "Восстановление",
+                                        "Программа была закрыта аварийно. Восстановить несохранённые изменения?") \
+                        == QMessageBox.Yes:
+                    self.journal.recover(self.tree)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка восстановления", f"Не удалось восстановить сеанс: {str(e)}")
+            self.journal.discard()
+        try:
+            self.journal.start(self.tree)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка автосохранения", f"Не удалось запустить автосохранение: {str(e)}")
+
+    def closeEvent(self, event):
+        # Штатное завершение: фоновые задачи с файлами завершаются или отменяются по выбору
+        # пользователя, журнал автосохранения больше не нужен
+        if self.jobs.is_busy():
+            answer = QMessageBox.question(
+                self, "Фоновые задачи", "Фоновая задача ещё выполняется. Дождаться её завершения?\n"
+                "«Нет» — отменить задачу и закрыть программу.",
+                QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel, QMessageBox.Yes)
+            if answer == QMessageBox.Cancel:
+                event.ignore()
+                return
+            if answer == QMessageBox.No:
+                self.jobs.cancel_all()
+        self.stats_jobs.cancel_all()
+        self.jobs.wait()
+        self.stats_jobs.wait()
+        if profiler.active:
+            profiler.stop(DIAGNOSTICS_DIR)  # Незавершённый снимок профиля не теряется
+        self.journal.close()
+        if self.thumbnails is not None:
+            self.thumbnails.flush()
+        empty_trash()  # Отмена удаления с изображением возможна только в пределах сеанса
+        super().closeEvent(event)
+
     def update_persons_table(self):
-        # Обновление таблицы персон
-        try:
-            self.persons_table.setRowCount(len(self.tree.people))
-            row = 0
-            for pid, person in sorted(self.tree.people.items()):
-                self.persons_table.setItem(row, 0, QTableWidgetItem(pid))
-                self.persons_table.setItem(row, 1, QTableWidgetItem(person["surname"]))
-                self.persons_table.setItem(row, 2, QTableWidgetItem(person["name"]))
-                self.persons_table.setItem(row, 3, QTableWidgetItem(person["patronymic"]))
-                self.persons_table.setItem(row, 4, QTableWidgetItem(person["birth_date"]))
-                self.persons_table.setItem(row, 5, QTableWidgetItem(person["death_date"]))
-                self.persons_table.setItem(row, 6, QTableWidgetItem(person["birth_place"]))
-                self.persons_table.setItem(row, 7, QTableWidgetItem(person["death_place"]))
-                self.persons_table.setItem(row, 8, QTableWidgetItem(person["notes"]))
-                row += 1
-            self.persons_table.resizeColumnsToContents()
+        # Строки таблицы обновляет модель по событиям древа; здесь только подгоняется ширина столбцов
+        try:
+            with span("ui.update_persons_table", persons=len(self.tree.people)):
+                self.persons_table.resizeColumnsToContents()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка таблицы", f"Не удалось обновить таблицу: {str(e)}")
 
     def update_tree_view(self):
-        # Обновление графического представления дерева
+        # Обновление графического представления дерева: применяются только накопленные изменения
+        if self.tree_scene is None:
+            return  # Вкладка ещё не открывалась: сцена построится с нуля при открытии
         try:
-            self.scene.clear()
-            self.node_to_id.clear()
-            if not self.tree.people:
-                return
-
-            positions = {}
-            node_size = 120
-            image_size = 50
-            spacing_x = 180
-            spacing_y = 120
-            visited = set()
-
-            def get_level(person_id, memo={}):
-                if person_id in memo:
-                    return memo[person_id]
-                if person_id not in self.tree.people:
-                    return 0
-                person = self.tree.people[person_id]
-                parent_levels = [get_level(parent_id, memo) + 1 for parent_id in person.get("parents", []) if
-                                 parent_id in self.tree.people]
-                level = max(parent_levels, default=0)
-                memo[person_id] = level
-                return level
-
-            def assign_positions(person_id, x=0, level=0):
-                if person_id in visited or person_id not in self.tree.people:
-                    return x
-                visited.add(person_id)
-                person = self.tree.people[person_id]
-                current_level = get_level(person_id)
-                if level != current_level:
-                    return x  # Пропускаем, если уровень не соответствует
-                positions[person_id] = (x, level * spacing_y)
-                children = person.get("children", [])
-                num_children = len(children)
-                next_x = x
-                for i, child_id in enumerate(children):
-                    if child_id in self.tree.people:
-                        child_x = assign_positions(child_id, next_x, level + 1)
-                        next_x = child_x + spacing_x
-                return next_x
-
-            # Поиск корневых узлов
-            root_ids = [pid for pid, p in self.tree.people.items() if not p.get("parents")]
-            if not root_ids:  # Если нет корневых, берём всех
-                root_ids = list(self.tree.people.keys())
-
-            x_offset = 0
-            for root_id in root_ids:
-                x_offset = assign_positions(root_id, x_offset, 0)
-
-            # Отрисовка узлов и связей
-            font_size = self.settings.get_setting("font_size", 10)
-            for pid, (x, y) in positions.items():
-                person = self.tree.people.get(pid)
-                if not person:
-                    continue
-                # Отрисовка изображения
-                image_path = person.get("image_path", "")
-                if image_path and os.path.exists(image_path):
-                    pixmap = QPixmap(image_path).scaled(image_size, image_size, Qt.KeepAspectRatio)
-                    image_item = self.scene.addPixmap(pixmap)
-                    image_item.setPos(x, y)
-                    self.node_to_id[id(image_item)] = pid
-                else:
-                    rect_item = self.scene.addRect(x, y, image_size, image_size, QPen(Qt.gray), Qt.lightGray)
-                    self.node_to_id[id(rect_item)] = pid
-
-                # Отрисовка текста
-                text = f"{person['surname']} {person['name']} {person['patronymic']}\nID: {pid}".strip()
-                rect = self.scene.addRect(x + image_size + 5, y, node_size, image_size, QPen(Qt.black), Qt.lightGray)
-                text_item = self.scene.addText(text)
-                text_item.setFont(QFont("Arial", font_size))
-                text_item.setPos(x + image_size + 10, y + 10)
-                self.node_to_id[id(text_item)] = pid
-                self.node_to_id[id(rect)] = pid
-
-                # Отрисовка связей
-                for child_id in person.get("children", []):
-                    if child_id in positions:
-                        cx, cy = positions[child_id]
-                        self.scene.addLine(x + image_size / 2, y + image_size, cx + image_size / 2, cy, QPen(Qt.black))
-
-            # Оптимизация отображения
-            if positions:
-                self.view.setSceneRect(self.scene.itemsBoundingRect())
-                self.view.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
-                self.view.scale(self.scale_factor, self.scale_factor)
+            # Внутри — интервалы раскладки (layout.compute) и построения сцены (scene.sync)
+            with span("ui.update_tree_view", persons=len(self.tree.people)) as info:
+                rebuilt = self.tree_scene.sync()
+                if self.tree.people:
+                    self.view.setSceneRect(self.tree_scene.bounds())
+                    if rebuilt:
+                        self.fit_view()
+                self.update_viewport()
+                info["items"] = len(self.tree_scene.nodes)
         except Exception as e:
             QMessageBox.critical(self, "Ошибка отображения", f"Не удалось обновить дерево: {str(e)}")
 
+    def fit_view(self):
+        # Вписывание древа в окно с учётом масштаба из настроек
+        if self.view is None:
+            return
+        self.view.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
+        self.view.scale(self.scale_factor, self.scale_factor)
+        self.update_viewport()
+
+    def update_viewport(self):
+        # Создание элементов древа только для видимой области и с учётом масштаба
+        if self.view is None:
+            return
+        rect = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+        self.tree_scene.set_viewport(rect, self.view.transform().m11())
+
     def show_context_menu(self, pos):
         # Контекстное меню для древа
         try:
             item = self.view.itemAt(pos)
-            if not item or id(item) not in self.node_to_id:
+            person_id = item.data(PERSON_ID_KEY) if item else None
+            if not person_id:
                 return
-            person_id = self.node_to_id[id(item)]
             person = self.tree.get_person(person_id)
             if not person:
                 return
@@ -458,36 +703,97 @@ class GenealogyApp(QMainWindow):
             delete_action.triggered.connect(lambda: self.delete_person(person_id))
             menu.addAction(delete_action)
 
+            export_menu = QMenu("Экспорт GEDCOM", self)
+            descendants_action = QAction("Потомки", self)
+            descendants_action.triggered.connect(lambda: self.export_gedcom(collect_relatives(self.tree.people, person_id)))
+            export_menu.addAction(descendants_action)
+            ancestors_action = QAction("Предки", self)
+            ancestors_action.triggered.connect(lambda: self.export_gedcom(
+                collect_relatives(self.tree.people, person_id, descendants=False, ancestors=True)))
+            export_menu.addAction(ancestors_action)
+            menu.addMenu(export_menu)
+
+            kinship_action = QAction("Кем приходится…", self)
+            kinship_action.triggered.connect(lambda: self.show_relationship(person_id))
+            menu.addAction(kinship_action)
+
             menu.exec_(self.view.mapToGlobal(pos))
         except Exception as e:
             QMessageBox.critical(self, "Ошибка меню", f"Не удалось открыть контекстное меню: {str(e)}")
 
+    def show_relationship(self, person_id):
+        # Родство выбранной персоны с другой (ID по умолчанию — из поля родителя, куда его ставит поиск)
+        try:
+            other_id, ok = QInputDialog.getText(self, "Родство", "ID второй персоны:", text=self.parent_input.text())
+            other_id = other_id.strip()
+            if not ok or not other_id:
+                return
+            if other_id not in self.tree.people:
+                QMessageBox.warning(self, "Ошибка ввода", "Неверный ID человека")
+                return
+            result = self.kinship.relationship(person_id, other_id)
+            text = (f"{self.search_index.describe(other_id)}\n— {result['name']} для\n"
+                    f"{self.search_index.describe(person_id)}")
+            if result["ancestors"]:
+                text += "\n\nБлижайшие общие предки:\n" + "\n".join(
+                    self.search_index.describe(ancestor_id) for ancestor_id in result["ancestors"])
+            QMessageBox.information(self, "Родство", text)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка родства", f"Не удалось определить родство: {str(e)}")
+
+    def show_kinship_matrix(self):
+        # Матрица родства для персон, выделенных в таблице: в ячейке — кем персона столбца
+        # приходится персоне строки
+        try:
+            rows = sorted({self.persons_proxy.mapToSource(index).row()
+                           for index in self.persons_table.selectionModel().selectedIndexes()})
+            person_ids = [self.persons_model.person_id(row) for row in rows]
+            if len(person_ids) < 2:
+                QMessageBox.warning(self, "Матрица родства", "Выделите в таблице хотя бы две персоны")
+                return
+            if len(person_ids) > KINSHIP_MATRIX_LIMIT:
+                QMessageBox.warning(self, "Матрица родства",
+                                    f"Матрица строится не больше чем для {KINSHIP_MATRIX_LIMIT} персон")
+                return
+            matrix = self.kinship.matrix(person_ids)
+            titles = [self.search_index.describe(person_id).split(" · ")[0] for person_id in person_ids]
+            dialog = QDialog(self)
+            dialog.setWindowTitle("Матрица родства")
+            layout = QVBoxLayout(dialog)
+            table = QTableWidget(len(person_ids), len(person_ids))
+            table.setHorizontalHeaderLabels(titles)
+            table.setVerticalHeaderLabels(titles)
+            for i, row in enumerate(matrix):
+                for j, result in enumerate(row):
+                    table.setItem(i, j, QTableWidgetItem("" if i == j else result["name"]))
+            table.resizeColumnsToContents()
+            layout.addWidget(table)
+            dialog.resize(900, 500)
+            dialog.exec_()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка родства", f"Не удалось построить матрицу родства: {str(e)}")
+
     def create_relative(self, person_id, relation):
         # Создание родственника
         try:
             dialog = PersonDialog(self)
             if dialog.exec_():
                 data = dialog.get_data()
-                new_person_id = self.tree.add_person(data)
-                person = self.tree.get_person(person_id)
-
-                if relation == "spouse":
-                    # Супруг не требует прямой связи в дереве
-                    pass
-                elif relation == "mother" or relation == "father":
-                    self.tree.people[new_person_id]["children"].append(person_id)
-                    self.tree.people[person_id]["parents"].append(new_person_id)
-                elif relation == "son" or relation == "daughter":
-                    self.tree.people[person_id]["children"].append(new_person_id)
-                    self.tree.people[new_person_id]["parents"].append(person_id)
-                elif relation == "brother" or relation == "sister":
-                    for parent_id in person.get("parents", []):
-                        self.tree.people[parent_id]["children"].append(new_person_id)
-                        self.tree.people[new_person_id]["parents"].append(parent_id)
-
-                self.update_tree_view()
-                self.update_persons_table()
-                self.update_stats()
+                with self.history.action():
+                    new_person_id = self.tree.add_person(data)
+                    person = self.tree.get_person(person_id)
+
+                    if relation == "spouse":
+                        # Супруг не требует прямой связи в дереве
+                        pass
+                    elif relation == "mother" or relation == "father":
+                        self.tree.link_parent_child(new_person_id, person_id)
+                    elif relation == "son" or relation == "daughter":
+                        self.tree.link_parent_child(person_id, new_person_id)
+                    elif relation == "brother" or relation == "sister":
+                        for parent_id in person.get("parents", []):
+                            self.tree.link_parent_child(parent_id, new_person_id)
+
         except Exception as e:
             QMessageBox.critical(self, "Ошибка создания", f"Не удалось создать родственника: {str(e)}")
 
@@ -497,29 +803,8 @@ class GenealogyApp(QMainWindow):
             person = self.tree.get_person(person_id)
             dialog = PersonDialog(self, person)
             if dialog.exec_():
-                new_data = dialog.get_data()
-                # Обновляем данные, сохраняя связи
-                self.tree.people[person_id].update({
-                    "surname": new_data["surname"],
-                    "name": new_data["name"],
-                    "patronymic": new_data["patronymic"],
-                    "birth_date": new_data["birth_date"],
-                    "death_date": new_data["death_date"],
-                    "birth_place": new_data["birth_place"],
-                    "death_place": new_data["death_place"],
-                    "notes": new_data["notes"],
-                    "image_path": new_data["image_path"]
-                })
-                # Копирование нового изображения
-                if new_data["image_path"] and os.path.exists(new_data["image_path"]):
-                    import shutil
-                    os.makedirs("images", exist_ok=True)
-                    dest_path = f"images/{person_id}{os.path.splitext(new_data['image_path'])[1]}"
-                    shutil.copy(new_data["image_path"], dest_path)
-                    self.tree.people[person_id]["image_path"] = dest_path
-                self.update_tree_view()
-                self.update_persons_table()
-                self.update_stats()
+                # Обновляем данные, сохраняя связи; новое изображение копируется в images
+                self.tree.edit_person(person_id, dialog.get_data())
         except Exception as e:
             QMessageBox.critical(self, "Ошибка редактирования", f"Не удалось изменить персону: {str(e)}")
 
@@ -528,15 +813,15 @@ class GenealogyApp(QMainWindow):
         try:
             if QMessageBox.question(self, "Подтверждение",
                                     "Вы уверены, что хотите удалить эту персону?") == QMessageBox.Yes:
-                self.tree.remove_person(person_id)
-                self.update_tree_view()
-                self.update_persons_table()
-                self.update_stats()
+                with self.history.action():
+                    self.tree.remove_person(person_id)
         except Exception as e:
             QMessageBox.critical(self, "Ошибка удаления", f"Не удалось удалить персону: {str(e)}")
 
     def wheelEvent(self, event):
         # Обработка зума колесиком мыши
+        if self.view is None:
+            return
         try:
             zoom_in_factor = 1.25
             zoom_out_factor = 1 / zoom_in_factor
@@ -554,6 +839,7 @@ class GenealogyApp(QMainWindow):
             new_pos = self.view.mapToScene(event.pos())
             delta = new_pos - old_pos
             self.view.translate(delta.x(), delta.y())
+            self.update_viewport()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка зума", f"Не удалось изменить масштаб: {str(e)}")
 
@@ -564,6 +850,7 @@ class GenealogyApp(QMainWindow):
             if self.scale_factor > 5.0:
                 self.scale_factor = 5.0
             self.view.scale(1.25, 1.25)
+            self.update_viewport()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка зума", f"Не удалось увеличить масштаб: {str(e)}")
 
@@ -574,96 +861,349 @@ class GenealogyApp(QMainWindow):
             if self.scale_factor < 0.2:
                 self.scale_factor = 0.2
             self.view.scale(0.8, 0.8)
+            self.update_viewport()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка зума", f"Не удалось уменьшить масштаб: {str(e)}")
 
+    def run_job(self, title, func, on_finished, error_title):
+        # Запуск задачи в фоновом потоке с окном прогресса. Окно модальное: пока задача читает
+        # древо, пользователь не может его изменить, но интерфейс перерисовывается и отвечает.
+        progress = QProgressDialog(title, "Отмена", 0, 0, self)
+        progress.setWindowTitle("MatsDrevo")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+
+        def on_progress(done, total, stage):
+            if total:
+                progress.setRange(0, 1000)
+                progress.setValue(min(1000, done * 1000 // total))
+            else:
+                progress.setRange(0, 0)
+            progress.setLabelText(f"{title}: {stage}" if stage else title)
+
+        def finished(result):
+            progress.close()
+            try:
+                on_finished(result)
+            except Exception as e:
+                QMessageBox.critical(self, error_title, str(e))
+
+        def failed(message):
+            progress.close()
+            QMessageBox.critical(self, error_title, message)
+
+        job = self.jobs.submit(title, func, finished, failed, on_progress, progress.close)
+        progress.canceled.connect(job.cancel)
+        progress.show()
+        return job
+
+    def replace_tree(self, new_tree):
+        # Подмена содержимого древа результатом фоновой задачи; представления обновит
+        # планировщик по событию reset
+        self.tree.adopt(new_tree)
+
     def save_tree(self):
-        # Сохранение дерева в JSON-файл
+        # Сохранение дерева в файл проекта (SQLite) или в JSON-файл в фоновом потоке
         try:
-            file_name, _ = QFileDialog.getSaveFileName(self, "Сохранить древо", "", "JSON Files (*.json)")
-            if file_name:
-                with open(file_name, "w", encoding="utf-8") as f:
-                    json.dump(self.tree.people, f, ensure_ascii=False, indent=2)
+            current = self.project_store.path if self.project_store else ""
+            file_name, _ = QFileDialog.getSaveFileName(self, "Сохранить древо", current,
+                                                       f"Проект MatsDrevo (*{PROJECT_EXTENSION});;JSON Files (*.json)")
+            if not file_name:
+                return
+            # Копия данных снимается здесь: фоновая задача не обращается к живому древу
+            if file_name.lower().endswith(".json"):
+                import json
+                store = None
+                people = self.tree.to_dict()
+
+                def save(job):
+                    job.report(0, 0, "запись JSON")
+                    temp_name = file_name + ".tmp"
+                    with span("json.save", file=file_name, persons=len(people)), \
+                            open(temp_name, "w", encoding="utf-8") as f:
+                        json.dump(people, f, ensure_ascii=False)
+                    job.check()
+                    os.replace(temp_name, file_name)
+            else:
+                if not file_name.endswith(PROJECT_EXTENSION):
+                    file_name += PROJECT_EXTENSION
+                if self.project_store is None or self.project_store.path != file_name:
+                    if self.project_store:
+                        self.project_store.detach()
+                    self.project_store = ProjectStore(file_name)
+                    self.project_store.attach(self.tree)
+                store = self.project_store
+                changes = store.changes()
+
+                def save(job):
+                    job.report(0, 0, "запись проекта")
+                    store.write(changes)
+
+            def saved(result):
+                self.remember_project(file_name)
                 QMessageBox.information(self, "Успех", "Древо успешно сохранено")
+
+            job = self.run_job("Сохранение древа", save, saved, "Ошибка сохранения")
+            if store:
+                # Несохранённые изменения не теряются: следующее сохранение запишет проект целиком
+                job.signals.failed.connect(lambda message: store.mark_modified())
+                job.signals.cancelled.connect(store.mark_modified)
         except Exception as e:
             QMessageBox.critical(self, "Ошибка сохранения", f"Не удалось сохранить древо: {str(e)}")
 
     def load_tree(self):
-        # Загрузка дерева из JSON-файла
-        try:
-            file_name, _ = QFileDialog.getOpenFileName(self, "Загрузить древо", "", "JSON Files (*.json)")
-            if file_name:
-                with open(file_name, "r", encoding="utf-8") as f:
-                    self.tree.people = json.load(f)
-                self.update_tree_view()
-                self.update_persons_table()
-                self.update_stats()
-                QMessageBox.information(self, "Успех", "Древо успешно загружено")
+        # Выбор файла проекта или JSON-файла для загрузки
+        try:
+            file_name, _ = QFileDialog.getOpenFileName(self, "Загрузить древо", "",
+                                                       f"Проект MatsDrevo (*{PROJECT_EXTENSION});;JSON Files (*.json)")
+            if not file_name:
+                return
+            self.open_project(file_name)
         except Exception as e:
             QMessageBox.critical(self, "Ошибка загрузки", f"Не удалось загрузить древо: {str(e)}")
 
+    def open_project(self, file_name, notify=True):
+        # Загрузка дерева из файла проекта или JSON-файла: новое древо строится в фоновом потоке
+        store = None if file_name.lower().endswith(".json") else ProjectStore(file_name)
+        journal = self.journal
+        compact = self.tree.compact
+
+        def load(job):
+            new_tree = FamilyTree(compact=compact)
+            job.report(0, 0, "чтение файла")
+            if store:
+                store.read(new_tree)
+            else:
+                import json
+                with span("json.load", file=file_name) as info, open(file_name, "r", encoding="utf-8") as f:
+                    new_tree.load_people(json.load(f))
+                    info["persons"] = len(new_tree.people)
+            job.report(0, 0, "автосохранение")
+            journal.prepare_snapshot(new_tree)
+            return new_tree
+
+        def loaded(new_tree):
+            if self.project_store:
+                self.project_store.detach()
+            self.project_store = store
+            self.replace_tree(new_tree)
+            if store:
+                store.attach(self.tree)
+                store.mark_clean()
+            self.remember_project(file_name)
+            if notify:
+                QMessageBox.information(self, "Успех", "Древо успешно загружено")
+
+        self.run_job("Загрузка древа", load, loaded, "Ошибка загрузки")
+
+    def open_last_project(self):
+        # Открытие последнего проекта при запуске. После восстановления аварийного сеанса
+        # древо уже не пустое, и его изменения новее файла — тогда проект не открывается.
+        try:
+            file_name = self.settings.get_setting("last_project")
+            if file_name and not self.tree.people and os.path.exists(file_name):
+                self.open_project(file_name, notify=False)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка загрузки", f"Не удалось открыть последний проект: {str(e)}")
+
+    def remember_project(self, file_name):
+        # Последний сохранённый или открытый файл открывается при следующем запуске
+        if self.settings.get_setting("last_project") != file_name:
+            self.settings.set_setting("last_project", file_name)
+            self.settings.save_settings()
+
     def create_backup(self):
-        # Создание архивной копии (ZIP)
-        try:
-            file_name, _ = QFileDialog.getSaveFileName(self, "Создать архивную копию", "", "ZIP Files (*.zip)")
-            if file_name:
-                with zipfile.ZipFile(file_name, "w", zipfile.ZIP_DEFLATED) as zf:
-                    # Сохранение дерева в временный JSON
-                    temp_json = "temp_tree.json"
-                    with open(temp_json, "w", encoding="utf-8") as f:
-                        json.dump(self.tree.people, f, ensure_ascii=False, indent=2)
-                    zf.write(temp_json, "tree.json")
-                    os.remove(temp_json)
-                    # Добавление изображений
-                    if os.path.exists("images"):
-                        for img in os.listdir("images"):
-                            zf.write(os.path.join("images", img), os.path.join("images", img))
-                QMessageBox.information(self, "Успех", "Архивная копия успешно создана")
+        # Создание архивной копии в каталоге хранилища в фоновом потоке: изображения хранятся
+        # по содержимому один раз на все копии, древо — разностью с предыдущей копией
+        try:
+            directory = QFileDialog.getExistingDirectory(self, "Каталог архивных копий")
+            if not directory:
+                return
+            from backup_store import BackupStore
+            people = self.tree.to_dict()  # Копия снимается здесь: задача не обращается к живому древу
+            compact = self.tree.compact
+
+            def backup(job):
+                tree = FamilyTree(compact=compact)
+                tree.load_people(people)
+                job.report(0, 0, "изображения")
+                return BackupStore(directory).create(
+                    tree, lambda done, total: job.report(done, total, "изображения"))
+
+            def created(result):
+                name, summary = result
+                QMessageBox.information(
+                    self, "Успех",
+                    f"Архивная копия {name} создана: новых изображений {summary['new_images']}, "
+                    f"без изменений {summary['reused_images']}, записано {summary['written_bytes'] // 1024} КБ")
+
+            self.run_job("Создание архивной копии", backup, created, "Ошибка архивации")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка архивации", f"Не удалось создать архив: {str(e)}")
 
+    def restore_backup(self):
+        # Восстановление последней архивной копии из каталога хранилища; текущее древо
+        # заменяется после успешного восстановления
+        try:
+            directory = QFileDialog.getExistingDirectory(self, "Каталог архивных копий")
+            if not directory:
+                return
+            if QMessageBox.question(self, "Подтверждение",
+                                    "Текущее древо будет заменено архивной копией. Продолжить?") != QMessageBox.Yes:
+                return
+            from backup_store import BackupStore
+            journal = self.journal
+            compact = self.tree.compact
+
+            def restore(job):
+                people = BackupStore(directory).restore(
+                    progress=lambda done, total: job.report(done, total, "изображения"))
+                new_tree = FamilyTree(compact=compact)
+                job.report(0, 0, "древо")
+                new_tree.load_people(people)
+                job.report(0, 0, "автосохранение")
+                journal.prepare_snapshot(new_tree)
+                return new_tree
+
+            def restored(new_tree):
+                self.replace_tree(new_tree)
+                QMessageBox.information(self, "Успех", "Древо восстановлено из архивной копии")
+
+            self.run_job("Восстановление из копии", restore, restored, "Ошибка восстановления")
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка восстановления", f"Не удалось восстановить копию: {str(e)}")
+
     def create_new_tree(self):
         # Создание нового дерева
         try:
             if QMessageBox.question(self, "Подтверждение",
                                     "Вы уверены, что хотите создать новое древо? Все несохранённые данные будут потеряны.") == QMessageBox.Yes:
-                self.tree.people.clear()
+                import shutil
+                self.tree.clear()
                 if os.path.exists("images"):
                     shutil.rmtree("images")
                 os.makedirs("images", exist_ok=True)
-                self.update_tree_view()
-                self.update_persons_table()
-                self.update_stats()
                 QMessageBox.information(self, "Успех", "Новое древо создано")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка создания", f"Не удалось создать новое древо: {str(e)}")
 
     def import_gedcom(self):
-        # Импорт GEDCOM-файла
-        try:
-            file_name, _ = QFileDialog.getOpenFileName(self, "Импортировать GEDCOM", "", "GEDCOM Files (*.ged)")
-            if file_name:
-                self.gedcom_handler.import_gedcom(file_name)
-                self.update_tree_view()
-                self.update_persons_table()
-                self.update_stats()
+        # Импорт GEDCOM-файла в фоновом потоке; текущее древо заменяется после успешного импорта
+        try:
+            file_name, _ = QFileDialog.getOpenFileName(self, "Импортировать GEDCOM", "",
+                                                       "GEDCOM Files (*.ged *.ged.gz)")
+            if not file_name:
+                return
+            from gedcom_handler import GedcomHandler
+            journal = self.journal
+            compact = self.tree.compact
+
+            def import_file(job):
+                new_tree = FamilyTree(compact=compact)
+                GedcomHandler(new_tree).import_gedcom(
+                    file_name, lambda done, total: job.report(done, total, "чтение GEDCOM"))
+                job.report(0, 0, "автосохранение")
+                journal.prepare_snapshot(new_tree)
+                return new_tree
+
+            def imported(new_tree):
+                self.replace_tree(new_tree)
                 QMessageBox.information(self, "Успех", "GEDCOM-файл успешно импортирован")
+
+            self.run_job("Импорт GEDCOM", import_file, imported, "Ошибка импорта")
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка импорта", f"Не удалось импортировать GEDCOM: {str(e)}")
+
+    def merge_gedcom(self):
+        # Добавление GEDCOM-файла к текущему древу с поиском дубликатов. Копия древа, импорт и поиск
+        # идут в фоновом потоке; после подтверждения дубликаты объединяются и копия заменяет древо.
+        try:
+            file_name, _ = QFileDialog.getOpenFileName(self, "Добавить из GEDCOM", "",
+                                                       "GEDCOM Files (*.ged *.ged.gz)")
+            if not file_name:
+                return
+            from gedcom_handler import GedcomHandler
+            from duplicates import find_duplicates, merge_duplicates
+            journal = self.journal
+            people = self.tree.to_dict()  # Копия снимается здесь: задача не обращается к живому древу
+            compact = self.tree.compact
+
+            def import_file(job):
+                new_tree = FamilyTree(compact=compact)
+                job.report(0, 0, "копирование древа")
+                new_tree.load_people(people)
+                new_ids = GedcomHandler(new_tree).import_gedcom(
+                    file_name, lambda done, total: job.report(done, total, "чтение GEDCOM"), merge=True)
+                pairs = find_duplicates(new_tree, new_ids,
+                                        progress=lambda done, total: job.report(done, total, "поиск дубликатов"))
+                return new_tree, new_ids, pairs
+
+            def imported(result):
+                new_tree, new_ids, pairs = result
+                merge = False
+                if pairs:
+                    def title(person_id):
+                        person = new_tree.people[person_id]
+                        name = " ".join(person[field] for field in ("surname", "name", "patronymic") if person[field])
+                        return f"{name} ({person['birth_date'] or '?'})"
+                    examples = "\n".join(f"{title(new_id)} = {title(existing_id)} ({value:.0%})"
+                                          for new_id, existing_id, value in pairs[:10])
+                    merge = QMessageBox.question(
+                        self, "Дубликаты",
+                        f"Импортировано персон: {len(new_ids)}. Найдено вероятных дубликатов: {len(pairs)}.\n\n"
+                        f"{examples}\n\nОбъединить дубликаты с персонами древа?") == QMessageBox.Yes
+
+                def finish(job):
+                    merged = 0
+                    if merge:
+                        merged = merge_duplicates(new_tree, pairs,
+                                                  lambda done, total: job.report(done, total, "объединение"))
+                    job.report(0, 0, "автосохранение")
+                    journal.prepare_snapshot(new_tree)
+                    return merged
+
+                def finished(merged):
+                    self.replace_tree(new_tree)
+                    QMessageBox.information(self, "Успех", f"Добавлено персон: {len(new_ids) - merged}, "
+                                                           f"объединено с существующими: {merged}")
+
+                self.run_job("Добавление из GEDCOM", finish, finished, "Ошибка импорта")
+
+            self.run_job("Добавление из GEDCOM", import_file, imported, "Ошибка импорта")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка импорта", f"Не удалось импортировать GEDCOM: {str(e)}")
 
-    def export_gedcom(self):
-        # Экспорт в GEDCOM-файл
+    def export_gedcom(self, person_ids=None):
+        # Экспорт в GEDCOM-файл (всего древа или набора персон) в фоновом потоке
         try:
-            file_name, _ = QFileDialog.getSaveFileName(self, "Экспортировать GEDCOM", "", "GEDCOM Files (*.ged)")
-            if file_name:
-                self.gedcom_handler.export_gedcom(file_name)
-                QMessageBox.information(self, "Успех", "GEDCOM-файл успешно экспортирован")
+            file_name, _ = QFileDialog.getSaveFileName(self, "Экспортировать GEDCOM", "",
+                                                       "GEDCOM Files (*.ged);;GEDCOM gzip (*.ged.gz)")
+            if not file_name:
+                return
+            from gedcom_handler import GedcomHandler
+            people = self.tree.to_dict()  # Копия снимается здесь: задача не обращается к живому древу
+            compact = self.tree.compact
+
+            def export(job):
+                tree = FamilyTree(compact=compact)
+                tree.load_people(people)
+                GedcomHandler(tree).export_gedcom(file_name, person_ids,
+                                                  lambda done, total: job.report(done, total, "запись GEDCOM"))
+
+            self.run_job("Экспорт GEDCOM", export,
+                         lambda result: QMessageBox.information(self, "Успех", "GEDCOM-файл успешно экспортирован"),
+                         "Ошибка экспорта")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка экспорта", f"Не удалось экспортировать GEDCOM: {str(e)}")
 
     def update_stats(self):
-        # Обновление статистики
+        # Обновление статистики: счётчики FamilyStats — сразу, расширенная статистика — в фоне
+        if self.stats_text is None:
+            return  # Вкладка ещё не открывалась
         try:
+            from demographics import np as numpy
             stats = self.stats.get_statistics()
             stats_html = f"""
             <h2>Статистика семьи</h2>
@@ -672,10 +1212,86 @@ class GenealogyApp(QMainWindow):
             <p><b>Количество поколений:</b> {stats['generations']}</p>
             <p><b>Средний возраст:</b> {stats['average_age']:.1f} лет</p>
             """
+            if stats["cycle_links"]:
+                stats_html += f"<p><b>Циклических связей родитель-ребёнок:</b> {stats['cycle_links']}</p>"
+            if numpy is None:
+                stats_html += "<p><i>Для расширенной статистики установите пакет numpy.</i></p>"
+            else:
+                if self.demographics is None or self.demographics["revision"] != self.tree.revision:
+                    self.refresh_demographics()
+                    stats_html += "<p><i>Расширенная статистика пересчитывается…</i></p>"
+                if self.demographics is not None:
+                    stats_html += self.demographics_html(self.demographics)
             self.stats_text.setHtml(stats_html)
         except Exception as e:
             QMessageBox.critical(self, "Ошибка статистики", f"Не удалось обновить статистику: {str(e)}")
 
+    def refresh_demographics(self):
+        # Снимок данных древа берётся из строк, поддерживаемых по событиям, проекция в массивы и
+        # расчёт — в фоновом потоке. Древо тем временем может меняться: результат помечен номером
+        # версии, устаревший пересчитывается не чаще раза в DEMOGRAPHICS_INTERVAL.
+        if self._demographics_job is not None:
+            return
+        if self.demographics is not None and self.demographics["revision"] == self.tree.revision:
+            return
+        wait = self._demographics_started + DEMOGRAPHICS_INTERVAL - time.monotonic()
+        if wait > 0:
+            self.refresh_scheduler.mark("stats", delay=int(wait * 1000) + 1)
+            return
+        from demographics import TreeArrays, TreeRows, compute as compute_demographics
+        if self._demographics_rows is None:
+            self._demographics_rows = TreeRows(self.tree)
+        data = self._demographics_rows.snapshot(self.stats.levels())
+        self._demographics_started = time.monotonic()
+
+        def compute(job):
+            return compute_demographics(TreeArrays(data))
+
+        def finished(result):
+            self._demographics_job = None
+            self.demographics = result
+            self.refresh_scheduler.mark("stats")  # Показ результата; устаревший будет пересчитан
+
+        def failed(message):
+            self._demographics_job = None
+            QMessageBox.critical(self, "Ошибка статистики", f"Не удалось рассчитать статистику: {message}")
+
+        self._demographics_job = self.stats_jobs.submit("Статистика", compute, finished, failed)
+
+    def demographics_html(self, result):
+        # Таблицы расширенной статистики
+        from html import escape
+
+        def table(headers, rows):
+            head = "".join(f"<th>{header}</th>" for header in headers)
+            body = "".join("<tr>" + "".join(f"<td>{value}</td>" for value in row) + "</tr>" for row in rows)
+            return f"<table border='1' cellspacing='0' cellpadding='3'><tr>{head}</tr>{body}</table>"
+
+        fertility = result["fertility"]
+        intervals = result["generation_intervals"]
+        html = "<h3>Продолжительность жизни по десятилетиям рождения</h3>"
+        html += table(("Десятилетие", "Персон", "Средняя", "Медиана", "Умерли до 5 лет"),
+                      [(row["decade"], row["count"], f"{row['mean']:.1f}", f"{row['median']:.1f}",
+                        f"{row['child_deaths']:.0%}") for row in result["lifespans"]])
+        html += "<h3>Рождаемость</h3>"
+        html += (f"<p><b>Родителей:</b> {fertility['count']}, <b>детей в среднем:</b> {fertility['mean']:.2f}, "
+                 f"<b>медиана:</b> {fertility['median']:.0f}</p>")
+        histogram = fertility["histogram"]
+        html += table(("Детей", "Персон"), [(f"{count}+" if count == len(histogram) - 1 else count, number)
+                                            for count, number in enumerate(histogram) if number])
+        html += "<h3>Интервал поколений</h3>"
+        html += (f"<p><b>Связей с датами:</b> {intervals['count']}, <b>средний возраст родителя:</b> "
+                 f"{intervals['mean']:.1f}, <b>медиана:</b> {intervals['median']:.1f}</p>")
+        html += table(("Возраст родителя", "Рождений"),
+                      [(f"{age}–{age + 4}", number) for age, number in intervals["histogram"]])
+        html += "<h3>Персон по поколениям</h3>"
+        html += table(("Поколение", "Персон"), [(level + 1, number) for level, number in enumerate(result["generations"])])
+        for title, key in (("Частые фамилии", "surnames"), ("Места рождения", "birth_places"),
+                           ("Места смерти", "death_places")):
+            html += f"<h3>{title}</h3>"
+            html += table(("Значение", "Персон"), [(escape(value), number) for value, number in result[key]])
+        return html
+
     def change_theme(self, theme):
         # Изменение темы
         try:
@@ -689,7 +1305,15 @@ class GenealogyApp(QMainWindow):
         try:
             self.scale_factor = value / 100.0
             self.settings.set_setting("default_scale", self.scale_factor)
-            self.update_tree_view()
+            self.refresh_scheduler.mark("scale", delay=SETTLE_DELAY)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка масштаба", f"Не удалось изменить масштаб: {str(e)}")
+
+    def apply_scale(self):
+        # Вписывание древа с новым масштабом (по планировщику, один раз на серию изменений)
+        try:
+            if self.tree.people:
+                self.fit_view()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка масштаба", f"Не удалось изменить масштаб: {str(e)}")
 
@@ -697,7 +1321,15 @@ class GenealogyApp(QMainWindow):
         # Изменение размера шрифта
         try:
             self.settings.set_setting("font_size", size)
-            self.update_tree_view()
+            self.refresh_scheduler.mark("font", delay=SETTLE_DELAY)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка шрифта", f"Не удалось изменить размер шрифта: {str(e)}")
+
+    def apply_font_size(self):
+        # Новый размер шрифта для узлов древа (по планировщику, один раз на серию изменений)
+        try:
+            if self.tree_scene is not None:
+                self.tree_scene.set_font_size(self.settings.get_setting("font_size", 10))
         except Exception as e:
             QMessageBox.critical(self, "Ошибка шрифта", f"Не удалось изменить размер шрифта: {str(e)}")
 
@@ -708,4 +1340,20 @@ class GenealogyApp(QMainWindow):
             self.load_styles()
             QMessageBox.information(self, "Успех", "Настройки сохранены")
         except Exception as e:
-            QMessageBox.critical(self, "Ошибка сохранения", f"Не удалось сохранить настройки: {str(e)}")
\ No newline at end of file
+            QMessageBox.critical(self, "Ошибка сохранения", f"Не удалось сохранить настройки: {str(e)}")
+
+    def toggle_profiling(self, enabled):
+        # Запуск снимка профиля; при остановке результаты записываются в каталог diagnostics
+        try:
+            if enabled:
+                profiler.start()
+                return
+            paths = profiler.stop(DIAGNOSTICS_DIR)
+            if paths:
+                QMessageBox.information(self, "Профилирование", "Профиль записан:\n" + "\n".join(paths))
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка профилирования", f"Не удалось записать профиль: {str(e)}")
+
+    def show_diagnostics(self):
+        # Панель диагностики по Ctrl+Shift+D
+        DiagnosticsDialog(self).exec_()
\ No newline at end of file